@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Actuals store - APAC Revenue Projections Model
+Append-only columnar store of monthly transaction actuals keyed by country x
+segment x month. Each column is a flat binary file that only ever grows:
+
+    series.json  [[country, segment], ...]  (series ids, append-only)
+    series.i4    series id per row
+    month.i4     months since year 0 (year * 12 + month - 1) per row
+    volume.f8    actual volume per row
+
+Loading new actuals appends rows; a restated month is simply appended
+again and the latest row wins. Readers that only need what arrived since
+their last visit read from a row offset, so downstream stages (variance,
+calibration) stay incremental. A partially written append is ignored: the
+row count is that of the shortest column.
+
+    python actuals_store.py import ACTUALS.csv [...]
+    python actuals_store.py status
+"""
+
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+from fx_rates import month_key
+from project_paths import project_path
+
+STORE_DIR = project_path('actuals', 'store')
+
+COLUMNS = {'series': np.int32, 'month': np.int32, 'volume': np.float64}
+COLUMN_FILES = {'series': 'series.i4', 'month': 'month.i4', 'volume': 'volume.f8'}
+SERIES_FILE = 'series.json'
+
+
+def month_code(month):
+    """'YYYY-MM' (or a date) to months since year 0"""
+    month = month_key(month)
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def month_label(code):
+    """Inverse of month_code()"""
+    return f'{int(code) // 12:04d}-{int(code) % 12 + 1:02d}'
+
+
+class ActualsStore:
+    """country x segment x month actuals in append-only column files"""
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, SERIES_FILE), 'r') as f:
+                self.series = [tuple(key) for key in json.load(f)]
+        except FileNotFoundError:
+            self.series = []
+        self.series_ids = {key: i for i, key in enumerate(self.series)}
+
+    def path(self, column):
+        return os.path.join(self.directory, COLUMN_FILES[column])
+
+    @property
+    def rows(self):
+        """Complete rows in the store"""
+        sizes = []
+        for column, dtype in COLUMNS.items():
+            path = self.path(column)
+            sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def append(self, records):
+        """Append (country, segment, month, volume) records; returns (first row, count)"""
+        first = self.rows
+        series, months, volumes = [], [], []
+        new_series = False
+        for country, segment, month, volume in records:
+            key = (str(country).strip(), str(segment).strip())
+            if key not in self.series_ids:
+                self.series_ids[key] = len(self.series)
+                self.series.append(key)
+                new_series = True
+            series.append(self.series_ids[key])
+            months.append(month_code(month))
+            volumes.append(float(volume or 0))
+        if not series:
+            return first, 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        if new_series:
+            scratch = os.path.join(self.directory, SERIES_FILE + '.tmp')
+            with open(scratch, 'w') as f:
+                json.dump([list(key) for key in self.series], f, ensure_ascii=False)
+            os.replace(scratch, os.path.join(self.directory, SERIES_FILE))
+
+        # Drop any torn tail from an interrupted append before extending
+        for column in COLUMNS:
+            path = self.path(column)
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(first * np.dtype(COLUMNS[column]).itemsize)
+        for column, values in (('series', series), ('month', months), ('volume', volumes)):
+            with open(self.path(column), 'ab') as f:
+                f.write(np.asarray(values, dtype=COLUMNS[column]).tobytes())
+        return first, len(series)
+
+    def import_csv(self, path):
+        """Append every row of an actuals CSV (country, segment, month, volume)"""
+        with open(path, 'r', newline='') as f:
+            records = [(r['country'], r['segment'], r['month'], r['volume']) for r in csv.DictReader(f)]
+        return self.append(records)
+
+    def columns(self, start=0, stop=None):
+        """Rows [start, stop) as a dict of column arrays"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        start = min(start, stop)
+        result = {}
+        for column, dtype in COLUMNS.items():
+            path = self.path(column)
+            if not os.path.exists(path):
+                result[column] = np.empty(0, dtype=dtype)
+                continue
+            itemsize = np.dtype(dtype).itemsize
+            with open(path, 'rb') as f:
+                f.seek(start * itemsize)
+                result[column] = np.fromfile(f, dtype=dtype, count=stop - start)
+        return result
+
+    def latest(self, start=0, stop=None):
+        """Columns of the last row per (series, month) within rows [start, stop)"""
+        columns = self.columns(start, stop)
+        if not len(columns['series']):
+            return columns
+        key = columns['series'].astype(np.int64) * 100000 + columns['month']
+        # Last occurrence of each key: unique on the reversed rows
+        _, reversed_first = np.unique(key[::-1], return_index=True)
+        keep = np.sort(len(key) - 1 - reversed_first)
+        return {column: values[keep] for column, values in columns.items()}
+
+    def actuals(self):
+        """{(country, segment): {month: volume}}, the shape calibration.read_actuals() returns"""
+        columns = self.latest()
+        result = {}
+        for s, m, v in zip(columns['series'], columns['month'], columns['volume']):
+            result.setdefault(self.series[s], {})[month_label(m)] = float(v)
+        return result
+
+
+def main(argv=None):
+    """import ACTUALS.csv [...] | status"""
+    args = sys.argv[1:] if argv is None else argv
+    if not args or args[0] not in ('import', 'status'):
+        print(main.__doc__)
+        return False
+
+    store = ActualsStore()
+    if args[0] == 'import':
+        for path in args[1:]:
+            first, count = store.import_csv(path)
+            print(f"✅ Appended {count:,} rows from {path} (rows {first:,}-{first + count - 1:,})")
+        return True
+
+    columns = store.latest()
+    months = columns['month']
+    print(f"📊 Actuals store: {store.directory}")
+    print(f"   {store.rows:,} rows, {len(store.series):,} series, {len(months):,} series-months")
+    if len(months):
+        print(f"   Months {month_label(months.min())} to {month_label(months.max())}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Authentication-method allocation - APAC Revenue Projections Model
+Splits each demographic region's authentication demand across methods (OTP
+SMS, fingerprint, iris, ...) with a region x method share matrix and projects
+the result in one tensor operation, instead of expanding every state into
+hand-maintained "<State> - <Method>" SKUs.
+
+The default split is the saved pension model's: OTP SMS 55%, OTP SMS Pension
+Auth 15%, Fingerprint 20%, Iris 5%, General 5%. Shares can be replaced per
+economicTier and are tilted by each region's digitalAdoption (phone-based
+methods gain share in digital regions, biometrics in the others), then
+renormalized so every region's shares sum to 1. model-config.json may
+override both under "authAllocation": {"methods": [...], "tierShares": {...}}.
+"""
+
+import os
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+
+import demographic_volumes
+import projection_engine as engine
+import xlsx_parts
+from partial_workbook import PartialWorkbook
+from segment_query import DEFAULT_PRICE, DEFAULT_TIER, TIER_PRICES
+
+# share: % of a region's demand at the reference adoption
+# channel: how the share responds to digital adoption (ADOPTION_ELASTICITY)
+# priceFactor: multiple of the region's per-transaction price
+AUTH_METHODS = [
+    {'name': 'OTP SMS', 'share': 55, 'channel': 'mobile', 'priceFactor': 1.0},
+    {'name': 'OTP SMS Pension Auth', 'share': 15, 'channel': 'mobile', 'priceFactor': 1.0},
+    {'name': 'Fingerprint Biometric', 'share': 20, 'channel': 'biometric', 'priceFactor': 1.0},
+    {'name': 'Iris Biometric', 'share': 5, 'channel': 'biometric', 'priceFactor': 1.0},
+    {'name': 'General Authentication', 'share': 5, 'channel': 'general', 'priceFactor': 1.0}
+]
+
+# Optional per-tier share lists (same order as the methods); tiers without
+# an entry use the methods' own shares
+TIER_SHARES = {}
+
+# Shares scale with (digitalAdoption / REFERENCE_ADOPTION) ** elasticity
+REFERENCE_ADOPTION = 60.0
+ADOPTION_ELASTICITY = {'mobile': 0.5, 'biometric': -0.5, 'general': 0.0}
+
+# Cost per transaction by economic tier, as in the pension model loader
+TIER_COSTS = {'high': 0.05, 'low': 0.03}
+DEFAULT_COST = 0.04
+
+
+def allocation_settings(config):
+    """(methods, tier shares) from config['authAllocation'] or the defaults"""
+    settings = config.get('authAllocation', {})
+    return settings.get('methods') or AUTH_METHODS, settings.get('tierShares') or TIER_SHARES
+
+
+def region_profiles(arrays, regional_data):
+    """Economic tier and digital adoption in region_arrays() layout, (countries, regions)"""
+    shape = arrays['mask'].shape
+    tiers = np.full(shape, DEFAULT_TIER, dtype=object)
+    adoption = np.zeros(shape)
+    for c, code in enumerate(arrays['countries']):
+        for r, segment in enumerate(regional_data[code]['demographicSegments']):
+            tiers[c, r] = segment.get('economicTier') or DEFAULT_TIER
+            adoption[c, r] = float(segment.get('digitalAdoption') or 0)
+    return tiers, adoption
+
+
+def share_matrix(tiers, adoption, methods, tier_shares=None):
+    """Method shares per region, shape (countries, regions, methods), rows summing to 1"""
+    tier_shares = tier_shares or {}
+    base = np.array([m['share'] for m in methods], dtype=float)
+    shares = np.broadcast_to(base, tiers.shape + base.shape).copy()
+    for tier, values in tier_shares.items():
+        shares[tiers == tier] = np.asarray(values, dtype=float)
+
+    elasticity = np.array([ADOPTION_ELASTICITY.get(m.get('channel'), 0.0) for m in methods])
+    relative = np.maximum(adoption, 1.0) / REFERENCE_ADOPTION
+    shares = shares * np.power(relative[..., None], elasticity)
+    total = shares.sum(axis=-1, keepdims=True)
+    return np.divide(shares, total, out=np.zeros_like(shares), where=total > 0)
+
+
+def region_prices(tiers, adoption):
+    """Per-transaction (price, cost) per region, the pricing of the demographic SKUs"""
+    price = np.vectorize(lambda tier: TIER_PRICES.get(tier, DEFAULT_PRICE), otypes=[float])(tiers)
+    cost = np.vectorize(lambda tier: TIER_COSTS.get(tier, DEFAULT_COST), otypes=[float])(tiers)
+    price = price * np.where(adoption >= 80, 1.2, np.where(adoption <= 50, 0.9, 1.0))
+    return price, cost
+
+
+def allocate(config, regional_data, periods=12, driver='pension', daily=False):
+    """Region x method x period volumes and revenues for every configured country
+
+    driver picks the demand being split (demographic_volumes.DRIVERS).
+    Returns volume, revenue and cogs of shape (countries, regions, methods,
+    periods), the share matrix, month-one prices, country totals from
+    engine.finalize_totals() and the labels.
+    """
+    methods, tier_shares = allocation_settings(config)
+    regional_data = {code: data for code, data in regional_data.items() if code in config.get('countries', {})}
+    arrays = demographic_volumes.region_arrays(regional_data)
+    countries = arrays['countries']
+    tiers, adoption = region_profiles(arrays, regional_data)
+
+    demand = demographic_volumes.driver_volumes(arrays)[..., demographic_volumes.DRIVERS.index(driver)]
+    shares = share_matrix(tiers, adoption, methods, tier_shares) * arrays['mask'][..., None]
+    factors = np.array([m.get('priceFactor', 1.0) for m in methods], dtype=float)
+    price, cost = region_prices(tiers, adoption)
+    price = price[..., None] * factors
+    cost = cost[..., None] * factors
+
+    params_list = [engine.get_base_params(config, code) for code in countries]
+    multipliers = np.array([
+        engine.get_seasonality(config, p.get('seasonality', 'none')) for p in params_list
+    ]).reshape(len(countries), 12)
+    seasonal = engine.seasonality_curve(multipliers, periods, daily)  # (C, T)
+    growth = demographic_volumes.monthly_growth(arrays['authGrowthRate']) * arrays['mask']
+
+    # One pass over the (countries, regions, methods) tensor
+    base = demand[..., None] * shares
+    volume = engine.segment_volumes(base, np.broadcast_to(growth[..., None], base.shape),
+                                    seasonal[:, None, :], periods, daily)
+    revenue = volume * price[..., None]
+    cogs = volume * cost[..., None]
+
+    totals = engine.finalize_totals(
+        revenue.sum(axis=(1, 2)), cogs.sum(axis=(1, 2)), volume.sum(axis=(1, 2)),
+        engine.stack_base_params(params_list), daily
+    )
+    return {
+        'countries': countries,
+        'regions': arrays['regions'],
+        'methods': [m['name'] for m in methods],
+        'tiers': tiers,
+        'shares': shares,
+        'price': price,
+        'volume': volume,
+        'revenue': revenue,
+        'cogs': cogs,
+        'totals': totals
+    }
+
+
+def create_method_allocation_sheet(wb, allocation, countries_config):
+    """Write region x method shares, volumes and revenues into a MethodAllocation sheet"""
+    sheet_name = 'MethodAllocation'
+    if sheet_name in wb.sheetnames:
+        wb.remove(wb[sheet_name])
+    ws = wb.create_sheet(sheet_name)
+
+    headers = ['Country', 'Region', 'Economic Tier', 'Method', 'Share (%)', 'Price', 'Month 1 Volume',
+               'Horizon Volume', 'Horizon Revenue (Local)']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+
+    horizon_volume = allocation['volume'].sum(axis=-1)
+    horizon_revenue = allocation['revenue'].sum(axis=-1)
+    row = 2
+    for c, code in enumerate(allocation['countries']):
+        country_name = countries_config.get(code, {}).get('name', code.title())
+        for r, region in enumerate(allocation['regions'][c]):
+            for m, method in enumerate(allocation['methods']):
+                values = [country_name, region, allocation['tiers'][c, r], method,
+                          float(allocation['shares'][c, r, m] * 100), float(allocation['price'][c, r, m]),
+                          float(allocation['volume'][c, r, m, 0]), float(horizon_volume[c, r, m]),
+                          float(horizon_revenue[c, r, m])]
+                for col, value in enumerate(values, 1):
+                    cell = ws.cell(row=row, column=col, value=value)
+                    if col == 5:
+                        cell.number_format = '0.0'
+                    elif col == 6:
+                        cell.number_format = '0.000'
+                    elif col >= 7:
+                        cell.number_format = '#,##0'
+                row += 1
+
+    ws.column_dimensions['A'].width = 14
+    ws.column_dimensions['B'].width = 26
+    ws.column_dimensions['C'].width = 14
+    ws.column_dimensions['D'].width = 24
+    for col in 'EFGHI':
+        ws.column_dimensions[col].width = 18
+
+    print(f"✅ Created MethodAllocation sheet ({row - 2} region/method rows)")
+    return ws
+
+
+def enhance_excel_model_with_auth_allocation(periods=12, streaming=False):
+    """Allocate regional demand across authentication methods in the Enhanced model"""
+    file_path = os.path.join(engine.PROJECT_DIR, 'APAC_Revenue_Projections_Enhanced_Model.xlsx')
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        config = engine.load_model_config()
+        allocation = allocate(config, demographic_volumes.load_regional_data(), periods)
+
+        partial = PartialWorkbook(file_path, ()) if streaming else None
+        wb = partial.wb if partial else openpyxl.load_workbook(file_path)
+        create_method_allocation_sheet(wb, allocation, config.get('countries', {}))
+        if partial:
+            partial.save(file_path)
+        else:
+            xlsx_parts.save_workbook(wb, file_path)
+
+        print(f"📄 Method allocation saved: {file_path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error allocating authentication methods: {str(e)}")
+        return False
+
+
+def main():
+    """Print month-one volume and horizon revenue per method for every country"""
+    config = engine.load_model_config()
+    allocation = allocate(config, demographic_volumes.load_regional_data())
+    for c, code in enumerate(allocation['countries']):
+        name = config['countries'].get(code, {}).get('name', code.title())
+        print(f"📊 {name}")
+        volume = allocation['volume'][c].sum(axis=0)
+        revenue = allocation['revenue'][c].sum(axis=(0, 2))
+        for m, method in enumerate(allocation['methods']):
+            print(f"   {method:<24} {volume[m, 0]:>16,.0f} /month  {revenue[m]:>16,.0f} revenue")
+
+
+if __name__ == "__main__":
+    main()
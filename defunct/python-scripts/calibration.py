@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Parameter calibration from actuals - APAC Revenue Projections Model
+Fits a compound monthly growth rate and 12 calendar-month seasonal indices
+to every segment's monthly transaction actuals, all series at once:
+
+    log(volume[t]) = level + growth * t + season[calendar month of t]
+
+is solved as one batched weighted least-squares problem (missing months
+carry zero weight; the seasonal terms are sum-to-zero and lightly ridged so
+series shorter than a year still fit a growth rate). The fitted growth
+rates become the segments' volumeGrowth in the segment libraries and each
+country gets a volume-weighted "fitted_<country>" seasonality profile that
+its baseParams.seasonality points at. Seasonality profiles are read by
+projection period (the engine's t % 12, the workbook's MOD(month-1,12)), so
+the calendar-month indices are rotated to start at the projection's first
+month (--start, default the current month as in build) and the profile
+records that month as startMonth. The calibrated config is written to
+model-config.calibrated.json for review; --in-place writes it over
+model-config.json instead (keeping the previous file as
+model-config.json.bak) so every generator picks the fits up.
+Per-segment diagnostics go to a CSV.
+
+Actuals CSV columns: country, segment, month (YYYY-MM), volume. A repeated
+country/segment/month keeps its last row, as in the actuals store. Without
+an actuals/actuals.csv the actuals store (actuals_store.py) is used instead.
+
+    python calibration.py [ACTUALS.csv | STORE_DIR] [--out CONFIG.json | --in-place]
+                          [--start YYYY-MM] [--diagnostics PATH]
+"""
+
+import copy
+import csv
+import json
+import os
+import shutil
+import sys
+from datetime import date
+
+import numpy as np
+
+import projection_engine as engine
+from actuals_store import STORE_DIR, ActualsStore
+from fx_rates import month_key
+from project_paths import CONFIG_PATH, project_path
+
+ACTUALS_DIR = project_path('actuals')
+ACTUALS_FILE = os.path.join(ACTUALS_DIR, 'actuals.csv')
+DIAGNOSTICS_FILE = os.path.join(ACTUALS_DIR, 'calibration_diagnostics.csv')
+CALIBRATED_CONFIG_FILE = project_path('model-config.calibrated.json')
+
+MIN_OBSERVATIONS = 3
+SEASONAL_RIDGE = 0.05
+FITTED_PROFILE = 'fitted_{country}'
+
+DIAGNOSTIC_HEADERS = ['country', 'segment', 'observations', 'firstMonth', 'lastMonth', 'growthPct',
+                      'growthStdErr', 'r2', 'rmseLog', 'seasonalAmplitude', 'inConfig', 'status']
+
+
+def read_actuals(path=ACTUALS_FILE):
+    """{(country, segment): {month: volume}} from an actuals CSV; a repeated month keeps its last row"""
+    actuals = {}
+    with open(path, 'r', newline='') as f:
+        for record in csv.DictReader(f):
+            key = (record['country'].strip(), record['segment'].strip())
+            actuals.setdefault(key, {})[month_key(record['month'])] = float(record['volume'] or 0)
+    return actuals
+
+
+def month_range(first, last):
+    """Every 'YYYY-MM' from first to last inclusive"""
+    year, month = int(first[:4]), int(first[5:7])
+    months = []
+    while f'{year:04d}-{month:02d}' <= last:
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def series_matrix(actuals):
+    """(keys, months, volumes) with volumes shaped (series, months), NaN where missing"""
+    keys = sorted(actuals)
+    observed = sorted({month for series in actuals.values() for month in series})
+    months = month_range(observed[0], observed[-1]) if observed else []
+    column = {month: t for t, month in enumerate(months)}
+    volumes = np.full((len(keys), len(months)), np.nan)
+    for n, key in enumerate(keys):
+        for month, value in actuals[key].items():
+            volumes[n, column[month]] = value
+    return keys, months, volumes
+
+
+def design_matrix(months):
+    """(months, 13) regressors: level, trend and 11 sum-to-zero calendar-month effects"""
+    calendar = np.array([int(month[5:7]) - 1 for month in months], dtype=int)
+    X = np.zeros((len(months), 13))
+    X[:, 0] = 1.0
+    X[:, 1] = np.arange(len(months))
+    for t, m in enumerate(calendar):
+        if m < 11:
+            X[t, 2 + m] = 1.0
+        else:
+            X[t, 2:] = -1.0
+    return X
+
+
+def fit_series(volumes, months, ridge=SEASONAL_RIDGE):
+    """Batched log-linear fit of every row of volumes
+
+    Returns per-series growthPct (compound % per month), growthStdErr,
+    seasonal (series, 12) calendar multipliers averaging 1, observations,
+    r2 and rmseLog, plus the fitted log level at the first month.
+    """
+    weights = (np.isfinite(volumes) & (volumes > 0)).astype(float)
+    log_volume = np.log(np.where(weights > 0, volumes, 1.0))
+    X = design_matrix(months)
+
+    penalty = np.diag([1e-9, 1e-9] + [ridge] * 11)
+    XtWX = np.einsum('nt,ti,tj->nij', weights, X, X) + penalty
+    XtWy = np.einsum('nt,ti,nt->ni', weights, X, log_volume)
+    beta = np.linalg.solve(XtWX, XtWy[..., None])[..., 0]  # (series, 13)
+
+    observations = weights.sum(axis=1)
+    residual = (log_volume - beta @ X.T) * weights
+    sse = (residual ** 2).sum(axis=1)
+    mean = (log_volume * weights).sum(axis=1) / np.maximum(observations, 1)
+    sst = (((log_volume - mean[:, None]) * weights) ** 2).sum(axis=1)
+    seasonal_terms = np.where(observations >= 24, 11, 0)
+    dof = np.maximum(observations - 2 - seasonal_terms, 1)
+    covariance = np.linalg.inv(XtWX)
+    growth_se = np.sqrt(sse / dof * covariance[:, 1, 1])
+
+    season = np.concatenate([beta[:, 2:], -beta[:, 2:].sum(axis=1, keepdims=True)], axis=1)
+    seasonal = np.exp(season)
+    seasonal = seasonal / seasonal.mean(axis=1, keepdims=True)
+
+    return {
+        'growthPct': (np.exp(beta[:, 1]) - 1) * 100,
+        'growthStdErr': growth_se * 100,
+        'seasonal': seasonal,
+        'level': beta[:, 0],
+        'observations': observations.astype(int),
+        'r2': np.where(sst > 0, 1 - sse / np.where(sst > 0, sst, 1), 1.0),
+        'rmseLog': np.sqrt(sse / np.maximum(observations, 1))
+    }
+
+
+def country_profiles(keys, volumes, fit, usable):
+    """{country: 12 multipliers}, the volume-weighted geometric mean of its segments' indices"""
+    scale = np.nanmean(np.where(volumes > 0, volumes, np.nan), axis=1)
+    profiles = {}
+    for country in dict.fromkeys(country for country, _ in keys):
+        rows = [n for n, key in enumerate(keys) if key[0] == country and usable[n]]
+        if not rows:
+            continue
+        weights = scale[rows] / scale[rows].sum()
+        multipliers = np.exp(weights @ np.log(fit['seasonal'][rows]))
+        profiles[country] = multipliers / multipliers.mean()
+    return profiles
+
+
+def period_order(multipliers, start_date):
+    """Rotate January-first calendar multipliers so index 0 is start_date's month"""
+    return np.roll(np.asarray(multipliers, dtype=float), -(start_date.month - 1))
+
+
+def calibrate(config, actuals, min_observations=MIN_OBSERVATIONS, start_date=None):
+    """Fit every series and return (calibrated config copy, diagnostics rows)
+
+    The fitted seasonality profiles are in period order for projections
+    starting in start_date's month (default: the current month).
+    """
+    start_date = engine.month_start(start_date)
+    keys, months, volumes = series_matrix(actuals)
+    fit = fit_series(volumes, months)
+    usable = fit['observations'] >= min_observations
+
+    config = copy.deepcopy(config)
+    libraries = config.setdefault('segmentLibraries', {})
+    segment_lookup = {
+        (country, segment.get('name')): segment
+        for country, segments in libraries.items() for segment in segments
+    }
+
+    diagnostics = []
+    for n, key in enumerate(keys):
+        observed = [months[t] for t in np.flatnonzero(np.isfinite(volumes[n]) & (volumes[n] > 0))]
+        segment = segment_lookup.get(key)
+        if usable[n] and segment is not None:
+            segment['volumeGrowth'] = round(float(fit['growthPct'][n]), 2)
+        diagnostics.append([
+            key[0], key[1], int(fit['observations'][n]), observed[0] if observed else '',
+            observed[-1] if observed else '', round(float(fit['growthPct'][n]), 3),
+            round(float(fit['growthStdErr'][n]), 3), round(float(fit['r2'][n]), 4),
+            round(float(fit['rmseLog'][n]), 4),
+            round(float(fit['seasonal'][n].max() - fit['seasonal'][n].min()), 4),
+            segment is not None, 'fitted' if usable[n] else 'too few observations'
+        ])
+
+    factors = config.setdefault('seasonalityFactors', dict(engine.DEFAULT_SEASONALITY))
+    for country, multipliers in country_profiles(keys, volumes, fit, usable).items():
+        if country not in config.get('countries', {}):
+            continue
+        profile = FITTED_PROFILE.format(country=country)
+        factors[profile] = {
+            'multipliers': [round(float(m), 4) for m in period_order(multipliers, start_date)],
+            'startMonth': month_key(start_date)
+        }
+        model = config['countries'][country].setdefault('defaultModel', {})
+        model.setdefault('baseParams', {})['seasonality'] = profile
+
+    return config, diagnostics
+
+
+def write_diagnostics(diagnostics, path=DIAGNOSTICS_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DIAGNOSTIC_HEADERS)
+        writer.writerows(diagnostics)
+
+
+def write_config(config, path, backup=False):
+    """Write config to path via a scratch file, optionally keeping the old file as <path>.bak"""
+    scratch = path + '.tmp'
+    with open(scratch, 'w') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    if backup and os.path.exists(path):
+        shutil.copy2(path, path + '.bak')
+    os.replace(scratch, path)
+
+
+def main(argv=None):
+    """[ACTUALS.csv | STORE_DIR] [--out CONFIG.json | --in-place] [--start YYYY-MM] [--diagnostics PATH]"""
+    options = {'--out': CALIBRATED_CONFIG_FILE, '--start': None, '--diagnostics': DIAGNOSTICS_FILE}
+    in_place = False
+    paths = []
+    args = iter(sys.argv[1:] if argv is None else argv)
+    for arg in args:
+        if arg == '--in-place':
+            in_place = True
+        elif arg in options:
+            options[arg] = next(args, options[arg])
+        else:
+            paths.append(arg)
+    if in_place:
+        options['--out'] = CONFIG_PATH
+    actuals_path = paths[0] if paths else ACTUALS_FILE
+    if not paths and not os.path.exists(actuals_path):
+        actuals_path = STORE_DIR
+
+    if not os.path.exists(actuals_path):
+        print(f"❌ Actuals file not found: {actuals_path}")
+        return False
+
+    actuals = ActualsStore(actuals_path).actuals() if os.path.isdir(actuals_path) else read_actuals(actuals_path)
+    start_date = date.fromisoformat(f"{options['--start'][:7]}-01") if options['--start'] else None
+    config, diagnostics = calibrate(engine.load_model_config(), actuals, start_date=start_date)
+    write_config(config, options['--out'], backup=in_place)
+    write_diagnostics(diagnostics, options['--diagnostics'])
+
+    fitted = [row for row in diagnostics if row[-1] == 'fitted']
+    applied = [row for row in fitted if row[-2]]
+    print(f"✅ Fitted {len(fitted)} of {len(diagnostics)} series "
+          f"({len(applied)} matched segment library entries)")
+    if len(fitted) < len(diagnostics):
+        print(f"⚠️  {len(diagnostics) - len(fitted)} series have fewer than {MIN_OBSERVATIONS} observations")
+    print(f"📄 Calibrated config: {options['--out']}")
+    if in_place:
+        print(f"📄 Previous config: {CONFIG_PATH}.bak")
+    print(f"📄 Diagnostics: {options['--diagnostics']}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Chart data series for the Excel model.
+Charts are fed with cached values computed by the projection engine rather than
+formulas linking back into Projections, so they render immediately on open.
+Long daily horizons are downsampled with Largest-Triangle-Three-Buckets (LTTB).
+"""
+
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+
+MAX_CHART_POINTS = 500
+
+
+def lttb_indices(y, threshold, x=None):
+    """Indices of the points LTTB keeps when reducing y to threshold points
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[bucket + 1] = a
+
+    return kept
+
+
+def downsample(labels, series, max_points=MAX_CHART_POINTS):
+    """Reduce labels and every series to at most max_points aligned points
+
+    The bucket selection follows the first series so all series share one
+    category axis.
+    """
+    if not series:
+        return list(labels), series
+    primary = next(iter(series.values()))
+    indices = lttb_indices(primary, max_points)
+    labels = [labels[i] for i in indices]
+    return labels, {name: np.asarray(values)[indices] for name, values in series.items()}
+
+
+def chart_rows(labels, series, max_points=MAX_CHART_POINTS):
+    """Header plus downsampled (label, value, ...) rows for a chart data block"""
+    labels, series = downsample(labels, series, max_points)
+    headers = ['Period'] + list(series.keys())
+    columns = [np.asarray(values, dtype=float).tolist() for values in series.values()]
+    return headers, [[label] + [column[i] for column in columns] for i, label in enumerate(labels)]
+
+
+def write_chart_series(ws, labels, series, start_row=1, start_col=1, number_format='#,##0',
+                       max_points=MAX_CHART_POINTS):
+    """Write a label column plus one value column per series as cached values
+
+    Returns the last data row so callers can build chart References.
+    """
+    headers, rows = chart_rows(labels, series, max_points)
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+    for offset, header in enumerate(headers):
+        cell = ws.cell(row=start_row, column=start_col + offset, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+
+    for i, values in enumerate(rows, start_row + 1):
+        ws.cell(row=i, column=start_col, value=values[0])
+        for offset, value in enumerate(values[1:], 1):
+            cell = ws.cell(row=i, column=start_col + offset, value=value)
+            cell.number_format = number_format
+
+    return start_row + len(rows)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Command line entry point - APAC Revenue Projections Model
+
+    python cli.py build [--template] [--start YYYY-MM] [--formula-mode dynamic] [--fx-scenario NAME]
+                        [--max-sheet-seconds N | --no-verify]
+    python cli.py enhance [--fx-scenario NAME] [--demographics] [--regional-volumes] [--auth-methods]
+                          [--streaming] [--max-sheet-seconds N | --no-verify]
+    python cli.py verify [WORKBOOK.xlsx ...] [--max-sheet-seconds N]
+    python cli.py demographics-extract
+    python cli.py index
+    python cli.py fix
+    python cli.py export [EXPORT.json ...] [--out DIR] [--workers N]
+    python cli.py simulate [--country CODE] [--delta 0.10] [--goal-seek]
+                           [--monte-carlo SAMPLES [--seed N] [--chunk-size N] [--workers N]]
+    python cli.py diff OLD NEW
+    python cli.py segments [TIER [MIN_ADOPTION [MIN_URBANIZATION]]]
+    python cli.py rollups
+    python cli.py methods
+    python cli.py calibrate [ACTUALS.csv | STORE_DIR] [--out CONFIG.json | --in-place] [--start YYYY-MM]
+                            [--diagnostics PATH]
+    python cli.py actuals import ACTUALS.csv [...] | status
+    python cli.py variance [ACTUALS.csv ...] [--streaming]
+    python cli.py serve [--port N]
+    python cli.py sizes WORKBOOK.xlsx
+
+Global options: --zip-level 0-9 (0 stores parts uncompressed, for
+intermediate files) and --part-sizes (write <file>.parts.json on save).
+
+Each subcommand imports its modules when it runs, so light commands such as
+rebuilding the demographics index never load numpy, openpyxl or the engine.
+build and enhance finish by evaluating the saved workbook (formula_evaluator)
+and exit non-zero on formula errors, engine mismatches or slow sheets.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+from project_paths import ENHANCED_MODEL_FILE, MASTER_MODEL_FILE, project_path
+
+
+def month_arg(value):
+    """argparse type for YYYY-MM start months"""
+    try:
+        return date.fromisoformat(f'{value[:7]}-01')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+class LazyChoices:
+    """argparse choices loaded on first use, so building the parser stays light"""
+
+    def __init__(self, load):
+        self.load = load
+        self.names = None
+
+    def values(self):
+        if self.names is None:
+            self.names = sorted(self.load())
+        return self.names
+
+    def __contains__(self, value):
+        return value in self.values()
+
+    def __iter__(self):
+        return iter(self.values())
+
+
+def fx_scenario_names():
+    import fx_rates
+    import projection_engine
+
+    return fx_rates.fx_scenarios(projection_engine.load_model_config())
+
+
+def verify_outputs(args, paths):
+    """Evaluate freshly written workbooks unless --no-verify was given"""
+    if args.no_verify:
+        return True
+    from formula_evaluator import verify_files
+
+    return verify_files(paths, args.max_sheet_seconds)
+
+
+def cmd_build(args):
+    from create_excel_model import ExcelRevenueModel
+
+    model = ExcelRevenueModel(args.start, args.rolling_start, args.formula_mode, args.fx_scenario)
+    if args.template:
+        from workbook_template import build_from_template
+        filepath = build_from_template(model, project_path(MASTER_MODEL_FILE))
+    else:
+        model.create_complete_model()
+        filepath = model.save_workbook(MASTER_MODEL_FILE)
+    return filepath is not None and verify_outputs(args, [project_path(MASTER_MODEL_FILE)])
+
+
+def cmd_enhance(args):
+    from enhance_excel_model import AdvancedExcelModel
+
+    model = AdvancedExcelModel(project_path(MASTER_MODEL_FILE), args.start, streaming=args.streaming,
+                               fx_scenario=args.fx_scenario)
+    model.create_enhanced_model()
+    ok = model.save_enhanced_model(ENHANCED_MODEL_FILE) is not None
+    if ok and args.demographics:
+        from enhance_excel_demographics import enhance_excel_model_with_demographics
+        ok = enhance_excel_model_with_demographics(streaming=args.streaming)
+    if ok and args.regional_volumes:
+        from demographic_volumes import enhance_excel_model_with_regional_volumes
+        ok = enhance_excel_model_with_regional_volumes(streaming=args.streaming)
+    if ok and args.auth_methods:
+        from auth_allocation import enhance_excel_model_with_auth_allocation
+        ok = enhance_excel_model_with_auth_allocation(streaming=args.streaming)
+    return ok and verify_outputs(args, [project_path(ENHANCED_MODEL_FILE)])
+
+
+def cmd_verify(args):
+    from formula_evaluator import verify_files
+
+    defaults = (project_path(MASTER_MODEL_FILE), project_path(ENHANCED_MODEL_FILE))
+    paths = args.workbooks or [path for path in defaults if os.path.exists(path)]
+    return verify_files(paths, args.max_sheet_seconds)
+
+
+def cmd_demographics_extract(args):
+    import extract_demographics
+
+    extract_demographics.main()
+    return True
+
+
+def cmd_index(args):
+    from extract_demographics import create_demographics_index
+
+    create_demographics_index()
+    return True
+
+
+def cmd_fix(args):
+    from fix_excel_formulas import fix_excel_model
+
+    return fix_excel_model()
+
+
+def cmd_export(args):
+    from model_import import OUTPUT_DIR, build_saved_models
+
+    build_saved_models(args.paths or None, args.out or OUTPUT_DIR, args.workers)
+    return True
+
+
+def cmd_simulate(args):
+    from sensitivity import enhance_excel_model_with_sensitivity
+
+    ok = enhance_excel_model_with_sensitivity(args.country, args.delta)
+    if ok and args.goal_seek:
+        from goal_seek import enhance_excel_model_with_goal_seek
+        ok = enhance_excel_model_with_goal_seek()
+    if ok and args.monte_carlo:
+        from monte_carlo import CHUNK_SIZE, enhance_excel_model_with_monte_carlo
+        ok = enhance_excel_model_with_monte_carlo(args.monte_carlo, args.seed, args.chunk_size or CHUNK_SIZE,
+                                                  args.workers)
+    return ok
+
+
+def cmd_diff(args):
+    import model_diff
+
+    model_diff.main([args.old, args.new])
+    return True
+
+
+def cmd_segments(args):
+    import segment_query
+
+    segment_query.main(args.filters)
+    return True
+
+
+def cmd_rollups(args):
+    import geo_rollups
+
+    geo_rollups.main()
+    return True
+
+
+def cmd_methods(args):
+    import auth_allocation
+
+    auth_allocation.main()
+    return True
+
+
+def cmd_calibrate(args):
+    import calibration
+
+    argv = [args.actuals] if args.actuals else []
+    if args.out:
+        argv += ['--out', args.out]
+    if args.in_place:
+        argv += ['--in-place']
+    if args.start:
+        argv += ['--start', args.start.isoformat()]
+    if args.diagnostics:
+        argv += ['--diagnostics', args.diagnostics]
+    return calibration.main(argv)
+
+
+def cmd_actuals(args):
+    import actuals_store
+
+    return actuals_store.main([args.action] + args.paths)
+
+
+def cmd_variance(args):
+    from variance_tracking import enhance_excel_model_with_variance
+
+    return enhance_excel_model_with_variance(args.paths, streaming=args.streaming)
+
+
+def cmd_serve(args):
+    import asyncio
+    from workbook_service import WorkbookService
+
+    service = WorkbookService(workers=args.workers) if args.workers else WorkbookService()
+    try:
+        asyncio.run(service.serve(port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return True
+
+
+def cmd_sizes(args):
+    from xlsx_parts import part_sizes, print_part_sizes
+
+    records = part_sizes(args.workbook)
+    print(f"📦 {args.workbook}: {sum(r['compressed'] for r in records):,} bytes in {len(records)} parts")
+    print_part_sizes(records, args.top)
+    return True
+
+
+def add_verify_arguments(command, optional=True):
+    command.add_argument('--max-sheet-seconds', type=float, metavar='N',
+                         help='fail verification if any sheet takes longer than N seconds to evaluate')
+    if optional:
+        command.add_argument('--no-verify', action='store_true', help='skip evaluating the saved workbook')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='APAC Revenue Projections Model tools')
+    parser.add_argument('--zip-level', type=int, choices=range(10), metavar='0-9',
+                        help='deflate level for saved workbooks (0 = store only)')
+    parser.add_argument('--part-sizes', action='store_true', help='record per-part sizes next to saved workbooks')
+    commands = parser.add_subparsers(dest='command', required=True)
+    fx_scenarios = LazyChoices(fx_scenario_names)
+
+    build = commands.add_parser('build', help='Create the Master workbook')
+    build.add_argument('--template', action='store_true', help='assemble from the cached skeleton')
+    build.add_argument('--start', type=month_arg, help='first projection month (YYYY-MM)')
+    build.add_argument('--rolling-start', action='store_true', help='add the TODAY()-based rolling start block')
+    build.add_argument('--formula-mode', choices=('classic', 'dynamic'), default='classic')
+    build.add_argument('--fx-scenario', default='base', choices=fx_scenarios, metavar='NAME',
+                       help='FX drift scenario for the USD columns')
+    add_verify_arguments(build)
+    build.set_defaults(handler=cmd_build)
+
+    enhance = commands.add_parser('enhance', help='Create the Enhanced workbook from the Master')
+    enhance.add_argument('--start', type=month_arg, help='first projection month (default: the Master\'s)')
+    enhance.add_argument('--fx-scenario', choices=fx_scenarios, metavar='NAME',
+                         help='rebuild FXRates with this FX scenario (default: keep the Master\'s)')
+    enhance.add_argument('--demographics', action='store_true', help='add the demographic sheets')
+    enhance.add_argument('--regional-volumes', action='store_true', help='add the RegionalVolumes sheet')
+    enhance.add_argument('--auth-methods', action='store_true', help='add the MethodAllocation sheet')
+    enhance.add_argument('--streaming', action='store_true',
+                         help='parse only the sheets being enhanced and copy the rest through')
+    add_verify_arguments(enhance)
+    enhance.set_defaults(handler=cmd_enhance)
+
+    verify = commands.add_parser('verify', help='Evaluate workbook formulas and check them against the engine')
+    verify.add_argument('workbooks', nargs='*', help='workbooks to check (default: the Master and Enhanced models)')
+    add_verify_arguments(verify, optional=False)
+    verify.set_defaults(handler=cmd_verify)
+
+    extract = commands.add_parser('demographics-extract', help='Split regionalData into demographics/*.json')
+    extract.set_defaults(handler=cmd_demographics_extract)
+
+    index = commands.add_parser('index', help='Rebuild demographics/index.json')
+    index.set_defaults(handler=cmd_index)
+
+    fix = commands.add_parser('fix', help='Repair formulas in the Enhanced workbook')
+    fix.set_defaults(handler=cmd_fix)
+
+    export = commands.add_parser('export', help='One workbook per saved web-tool model')
+    export.add_argument('paths', nargs='*', help='revenue_models_*.json exports (default: all)')
+    export.add_argument('--out', help='output directory')
+    export.add_argument('--workers', type=int)
+    export.set_defaults(handler=cmd_export)
+
+    simulate = commands.add_parser('simulate', help='Sensitivity (and goal seek) on the Enhanced workbook')
+    simulate.add_argument('--country')
+    simulate.add_argument('--delta', type=float, default=0.10, help='relative perturbation')
+    simulate.add_argument('--goal-seek', action='store_true', help='also add the goal-seek solutions')
+    simulate.add_argument('--monte-carlo', type=int, metavar='SAMPLES',
+                          help='also run (or resume) a checkpointed Monte Carlo simulation')
+    simulate.add_argument('--seed', type=int, default=0)
+    simulate.add_argument('--chunk-size', type=int, help='samples per checkpointed chunk')
+    simulate.add_argument('--workers', type=int)
+    simulate.set_defaults(handler=cmd_simulate)
+
+    diff = commands.add_parser('diff', help='Compare two workbooks or saved-model exports')
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.set_defaults(handler=cmd_diff)
+
+    segments = commands.add_parser('segments', help='Preset summaries or a filtered list of demographic segments')
+    segments.add_argument('filters', nargs='*', help='economic tier (or all), min digital adoption, min urbanization')
+    segments.set_defaults(handler=cmd_segments)
+
+    rollups = commands.add_parser('rollups', help='APAC, sub-region and country totals of the demographic volumes')
+    rollups.set_defaults(handler=cmd_rollups)
+
+    methods = commands.add_parser('methods', help='Demographic demand split across authentication methods')
+    methods.set_defaults(handler=cmd_methods)
+
+    calibrate = commands.add_parser('calibrate', help='Fit segment growth and seasonality from monthly actuals')
+    calibrate.add_argument('actuals', nargs='?', help='actuals CSV or store (default: actuals/actuals.csv)')
+    target = calibrate.add_mutually_exclusive_group()
+    target.add_argument('--out', help='calibrated config to write (default: model-config.calibrated.json)')
+    target.add_argument('--in-place', action='store_true',
+                        help='overwrite model-config.json, keeping a .bak copy')
+    calibrate.add_argument('--start', type=month_arg,
+                           help='projection start the fitted seasonality is aligned to (default: this month)')
+    calibrate.add_argument('--diagnostics', help='per-series fit diagnostics CSV')
+    calibrate.set_defaults(handler=cmd_calibrate)
+
+    actuals = commands.add_parser('actuals', help='Append actuals CSVs to the actuals store or show its status')
+    actuals.add_argument('action', choices=('import', 'status'))
+    actuals.add_argument('paths', nargs='*')
+    actuals.set_defaults(handler=cmd_actuals)
+
+    variance = commands.add_parser('variance', help='Append actuals and refresh the Variance sheet')
+    variance.add_argument('paths', nargs='*', help='actuals CSVs to append first')
+    variance.add_argument('--streaming', action='store_true', help='parse only the Variance sheet')
+    variance.set_defaults(handler=cmd_variance)
+
+    serve = commands.add_parser('serve', help='Run the local workbook generation service')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--workers', type=int)
+    serve.set_defaults(handler=cmd_serve)
+
+    sizes = commands.add_parser('sizes', help='Show the largest parts of a workbook')
+    sizes.add_argument('workbook')
+    sizes.add_argument('--top', type=int, default=15)
+    sizes.set_defaults(handler=cmd_sizes)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.zip_level is not None or args.part_sizes:
+        import xlsx_parts
+        xlsx_parts.configure(args.zip_level, args.part_sizes or None)
+    return 0 if args.handler(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Age-cohort population projection - APAC Revenue Projections Model
+Ages the ageGroups of every region in demographics/*.json forward year by year
+with a cohort-component transition matrix, applied to all regions of all
+countries in one batched matrix product per year, and turns the projected age
+structure into cohort-weighted authentication and pension volumes.
+"""
+
+import json
+import os
+
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+
+import demographic_volumes
+
+AGE_BANDS = ('0-14', '15-24', '25-34', '35-44', '45-54', '55-64', '65+')
+
+# Years spent in each band; the open 65+ band only loses people to mortality
+BAND_WIDTHS = np.array([15, 10, 10, 10, 10, 10, np.inf])
+
+# Annual mortality per band (APAC averages)
+MORTALITY = np.array([0.001, 0.0007, 0.001, 0.0018, 0.004, 0.010, 0.045])
+
+# Relative authentication frequency per band (1.0 = working-age average) and
+# share of each band that draws a pension
+AUTH_WEIGHTS = np.array([0.1, 0.9, 1.2, 1.2, 1.0, 0.9, 0.7])
+PENSION_WEIGHTS = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.2, 1.0])
+
+
+def transition_matrix(mortality=MORTALITY, fertility=1.0):
+    """(bands, bands) matrix taking one year's cohort vector to the next
+
+    Survivors either stay in their band or, for 1/width of them, move up one
+    band. Births replenish the youngest band at fertility times its current
+    replacement rate (1.0 keeps the 0-14 inflow equal to its outflow).
+    """
+    mortality = np.asarray(mortality, dtype=float)
+    survival = 1 - mortality
+    advance = np.where(np.isfinite(BAND_WIDTHS), 1 / BAND_WIDTHS, 0.0)
+
+    bands = len(AGE_BANDS)
+    matrix = np.zeros(np.shape(fertility) + (bands, bands))
+    index = np.arange(bands)
+    matrix[..., index, index] = survival * (1 - advance)
+    matrix[..., index[1:], index[:-1]] = (survival * advance)[:-1]
+    matrix[..., 0, 0] += survival[0] * advance[0] * np.asarray(fertility, dtype=float)
+    return matrix
+
+
+def age_shares(age_groups):
+    """Band shares (sum 1) from an ageGroups dict, or None if it is missing"""
+    if not age_groups:
+        return None
+    counts = np.array([
+        float(age_groups.get(band, {}).get('count') or age_groups.get(band, {}).get('population') or 0)
+        for band in AGE_BANDS
+    ])
+    total = counts.sum()
+    return counts / total if total > 0 else None
+
+
+def load_country_age_groups(regional_data, demographics_dir=demographic_volumes.DEMOGRAPHICS_DIR):
+    """Country-level ageGroups, falling back to the *_demographics_enhanced.json files"""
+    age_groups = {}
+    for code, data in regional_data.items():
+        groups = data.get('country', {}).get('ageGroups')
+        enhanced_path = os.path.join(demographics_dir, f'{code}_demographics_enhanced.json')
+        if not groups and os.path.exists(enhanced_path):
+            with open(enhanced_path, 'r') as f:
+                groups = json.load(f).get('country', {}).get('ageGroups')
+        age_groups[code] = groups
+    return age_groups
+
+
+def cohort_arrays(regional_data, country_age_groups=None):
+    """Initial cohort populations per region, shape (countries, regions, bands)
+
+    Regions without their own ageGroups take their country's age structure
+    (or a flat split if the country has none either) scaled to the region's
+    population.
+    """
+    country_age_groups = country_age_groups or {}
+    arrays = demographic_volumes.region_arrays(regional_data)
+    countries = arrays['countries']
+    flat = np.full(len(AGE_BANDS), 1 / len(AGE_BANDS))
+
+    shares = np.zeros(arrays['population'].shape + (len(AGE_BANDS),))
+    for c, code in enumerate(countries):
+        country_share = age_shares(country_age_groups.get(code))
+        country_share = flat if country_share is None else country_share
+        for r, segment in enumerate(regional_data[code]['demographicSegments']):
+            region_share = age_shares(segment.get('ageGroups'))
+            shares[c, r] = country_share if region_share is None else region_share
+
+    arrays['cohorts'] = shares * (arrays['population'] * 1e6 * arrays['mask'])[..., None]
+    return arrays
+
+
+def project_cohorts(cohorts, years=20, matrix=None):
+    """Cohort populations for years 0..years, shape (years + 1, ..., bands)
+
+    matrix is (bands, bands) or broadcastable to (..., bands, bands); every
+    step is one batched matrix-vector product over all regions.
+    """
+    matrix = transition_matrix() if matrix is None else matrix
+    path = np.empty((years + 1,) + cohorts.shape)
+    path[0] = cohorts
+    for year in range(years):
+        path[year + 1] = np.einsum('...ij,...j->...i', matrix, path[year])
+    return path
+
+
+def cohort_volumes(regional_data, years=20, country_age_groups=None, matrix=None):
+    """Cohort-weighted monthly authentication and pension volumes per region and year
+
+    Today's volumes follow demographic_volumes.driver_volumes(); each year
+    they are scaled by the change in the AUTH_WEIGHTS / PENSION_WEIGHTS
+    weighted cohort totals. Returns arrays of shape (countries, regions,
+    years + 1) plus the population path and labels.
+    """
+    arrays = cohort_arrays(regional_data, country_age_groups)
+    path = project_cohorts(arrays['cohorts'], years, matrix)  # (Y, C, R, B)
+
+    base = demographic_volumes.driver_volumes(arrays)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        auth_index = np.nan_to_num(path @ AUTH_WEIGHTS / (path[0] @ AUTH_WEIGHTS))
+        pension_index = np.nan_to_num(path @ PENSION_WEIGHTS / (path[0] @ PENSION_WEIGHTS))
+
+    return {
+        'countries': arrays['countries'],
+        'regions': arrays['regions'],
+        'population': np.moveaxis(path.sum(axis=-1), 0, -1),
+        'cohorts': np.moveaxis(path, 0, -2),  # (C, R, Y, B)
+        'authVolume': np.moveaxis(auth_index * base[..., 0], 0, -1),
+        'pensionVolume': np.moveaxis(pension_index * base[..., 1], 0, -1)
+    }
+
+
+def add_cohort_volumes_to_demographic_sheets(wb, result, countries, years=(5, 10, 20)):
+    """Append cohort-weighted volume columns to the {Country}_Demographics sheets"""
+    years = [year for year in years if year < result['authVolume'].shape[-1]]
+    if not years:
+        return
+    headers = [f'Cohort Auth Volume Y{year}' for year in years] + \
+              [f'Cohort Pension Volume Y{year}' for year in years] + \
+              [f'Population Y{years[-1]} (M)']
+
+    for c, code in enumerate(result['countries']):
+        country_name = countries.get(code, {}).get('name', code.title())
+        sheet_name = f'{country_name}_Demographics'
+        if sheet_name not in wb.sheetnames:
+            continue
+        ws = wb[sheet_name]
+
+        # Columns after the existing Revenue Potential column
+        first_col = 11
+        for offset, header in enumerate(headers):
+            cell = ws.cell(row=1, column=first_col + offset, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+
+        region_rows = {
+            ws.cell(row=row, column=1).value: row for row in range(2, ws.max_row + 1)
+        }
+        for r, region in enumerate(result['regions'][c]):
+            row = region_rows.get(region)
+            if row is None:
+                continue
+            values = [float(result['authVolume'][c, r, year]) for year in years] + \
+                     [float(result['pensionVolume'][c, r, year]) for year in years] + \
+                     [float(result['population'][c, r, years[-1]]) / 1e6]
+            for offset, value in enumerate(values):
+                cell = ws.cell(row=row, column=first_col + offset, value=value)
+                cell.number_format = '#,##0.0' if offset == len(values) - 1 else '#,##0'
+
+        for offset in range(len(headers)):
+            ws.column_dimensions[ws.cell(row=1, column=first_col + offset).column_letter].width = 24
+
+    print(f"✅ Added cohort-weighted volumes ({len(result['countries'])} countries)")
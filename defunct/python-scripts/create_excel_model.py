@@ -4,22 +4,180 @@ Create a comprehensive Excel revenue projection model that contains all the logi
 from the web-based tool, supporting all APAC countries and calculation methods.
 """
 
-import pandas as pd
 import json
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.chart import LineChart, Reference
+from openpyxl.utils import get_column_letter
+from openpyxl.workbook.defined_name import DefinedName
 from openpyxl.worksheet.datavalidation import DataValidation
-import math
-from datetime import datetime, timedelta
+from openpyxl.worksheet.formula import ArrayFormula
+import re
 import os
 
+from project_paths import CONFIG_PATH, project_path
+import projection_engine
+import projection_cache
+import fx_rates
+import xlsx_parts
+from chart_data import write_chart_series
+
+COUNTRY_DATA_HEADERS = ['CountryCode', 'CountryName', 'CurrencySymbol', 'ExchangeRate', 'Population']
+
+SEGMENT_LIBRARY_HEADERS = [
+    'Country', 'SegmentName', 'Category', 'Market', 
+    'PricePerTransaction', 'CostPerTransaction', 
+    'MonthlyVolume', 'VolumeGrowth', 'Description'
+]
+
+PROJECTION_HEADERS = [
+    'Month', 'Period', 'Country', 'Revenue_Local', 'Revenue_USD',
+    'COGS_Local', 'COGS_USD', 'NetProfit_Local', 'NetProfit_USD',
+    'ProfitMargin', 'TransactionVolume',
+    'PeriodStart', 'Year', 'Quarter', 'MonthOfYear'
+]
+
+# Number formats by Projections column: local currency, USD, percentage, volume
+PROJECTION_FORMATS = {
+    4: '#,##0', 6: '#,##0', 8: '#,##0',
+    5: '$#,##0', 7: '$#,##0', 9: '$#,##0',
+    10: '0.0%',
+    11: '#,##0',
+    12: 'yyyy-mm-dd'
+}
+
+PROJECTION_MONTHS = 120  # 10 years max
+
+# Rows of SegmentLibrary scanned by the Projections formulas (bounded ranges
+# keep the header row out of the array arithmetic)
+SEGMENT_LIBRARY_ROWS = 1000
+
+# Segments written for countries without a segment library in the config
+SAMPLE_SEGMENTS = [
+    {
+        'name': 'Basic Authentication',
+        'category': 'authentication',
+        'market': 'General',
+        'price': 0.15,
+        'cost': 0.05,
+        'volume': 10000000,
+        'volumeGrowth': 8,
+        'description': 'Basic authentication service for general verification'
+    },
+    {
+        'name': 'eKYC Service',
+        'category': 'kyc',
+        'market': 'Financial Services',
+        'price': 2.50,
+        'cost': 0.75,
+        'volume': 5000000,
+        'volumeGrowth': 12,
+        'description': 'Electronic KYC service for financial institutions'
+    },
+    {
+        'name': 'Biometric Auth',
+        'category': 'biometric',
+        'market': 'Government',
+        'price': 0.25,
+        'cost': 0.08,
+        'volume': 25000000,
+        'volumeGrowth': 5,
+        'description': 'Biometric authentication for government services'
+    }
+]
+
+# Base parameters on the Parameters sheet (rows 4-11): engine key, label and
+# the defined name the formulas read the value through
+BASE_PARAMETERS = [
+    ('startRevenue', 'Start Revenue', 'StartRevenue'),
+    ('growthRate', 'Growth Rate (%)', 'GrowthRate'),
+    ('projectionMonths', 'Projection Months', 'ProjectionMonths'),
+    ('costPercentage', 'Cost Percentage (%)', 'CostPercentage'),
+    ('operatingExpenses', 'Operating Expenses', 'OperatingExpenses'),
+    ('operatingExpenseType', 'Operating Expense Type', 'OperatingExpenseType'),
+    ('operatingExpensePercentage', 'Operating Expense Percentage (%)', 'OperatingExpensePercentage'),
+    ('seasonality', 'Seasonality Profile', 'SeasonalityProfile')
+]
+
+# Seasonality table on the Parameters sheet (rows 14-25, one column per
+# profile); the selected profile's column is added or refreshed from the config
+SEASONALITY_TABLE = {
+    'None': [1.0] * 12,
+    'Retail': [0.9, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.05, 1.0, 1.1, 1.2, 1.3],
+    'Summer': [0.8, 0.85, 0.9, 1.0, 1.1, 1.2, 1.3, 1.2, 1.0, 0.9, 0.85, 0.8]
+}
+
+# Defined name for the 12 monthly multipliers the Projections formulas apply
+SEASONALITY_NAME = 'Seasonality'
+
+# Excel 365 functions that must carry the _xlfn. prefix in the file format
+FUTURE_FUNCTIONS = ('LET', 'LAMBDA', 'SEQUENCE')
+
+
+def future_formula(formula, names=()):
+    """Add the file-format prefixes Excel expects for LET/LAMBDA formulas
+
+    Functions in FUTURE_FUNCTIONS become _xlfn.NAME and every LET/LAMBDA
+    parameter in names becomes _xlpm.name.
+    """
+    formula = re.sub(r'\b(%s)\(' % '|'.join(FUTURE_FUNCTIONS), r'_xlfn.\1(', formula)
+    for name in names:
+        formula = re.sub(r'(?<![.!$\w])%s\b' % re.escape(name), f'_xlpm.{name}', formula)
+    return formula
+
+
+def segment_formula(row, weight=None):
+    """One month's sum over the selected country's SegmentLibrary rows
+
+    Volume grows per segment; weight is the price or cost column (volume
+    when None) and the month's seasonality multiplier scales the total.
+    """
+    library = lambda col: f'SegmentLibrary!${col}$2:${col}${SEGMENT_LIBRARY_ROWS}'
+    weighted = f',{library(weight)}' if weight else ''
+    return (f'=SUMPRODUCT(--({library("A")}=C{row}),'
+            f'{library("G")}*POWER(1+{library("H")}/100,A{row}-1){weighted})'
+            f'*INDEX({SEASONALITY_NAME},MOD(A{row}-1,12)+1)')
+
+
+def start_revenue_formula(month):
+    """Start Revenue compounding at Growth Rate, for a month number reference"""
+    return f'StartRevenue*POWER(1+GrowthRate/100,{month}-1)'
+
+
+def operating_expense_formula(revenue):
+    """Operating expenses of the selected type for a revenue reference"""
+    return (f'IF(OR(OperatingExpenseType="fixed",OperatingExpenseType="hybrid"),OperatingExpenses,0)'
+            f'+IF(OR(OperatingExpenseType="percentage",OperatingExpenseType="hybrid"),'
+            f'{revenue}*OperatingExpensePercentage/100,0)')
+
+
+def segment_library_arrays(rows, country):
+    """Engine segment arrays for one country's rows in SEGMENT_LIBRARY_HEADERS layout"""
+    return projection_engine.segment_arrays([
+        dict(zip(('price', 'cost', 'volume', 'volumeGrowth'), row[4:8]))
+        for row in rows if row[0] == country
+    ])
+
+
 class ExcelRevenueModel:
-    def __init__(self):
+    def __init__(self, start_date=None, rolling_start=False, formula_mode='classic', fx_scenario='base'):
         self.wb = Workbook()
         self.wb.remove(self.wb.active)  # Remove default sheet
         
+        # Period labels are written as values from an explicit start date so
+        # the projection grid does not depend on the volatile TODAY()
+        self.start_date = projection_engine.month_start(start_date)
+        self.rolling_start = rolling_start
+        
+        # 'classic' writes one formula per cell; 'dynamic' writes one LET/LAMBDA
+        # array formula per Projections column for Excel 365
+        if formula_mode not in ('classic', 'dynamic'):
+            raise ValueError(f"Unknown formula mode: {formula_mode}")
+        self.formula_mode = formula_mode
+        
+        # USD columns convert with the monthly FX path of this scenario
+        self.fx_scenario = fx_scenario
+        
         # Load configuration data
         self.load_config_data()
         
@@ -36,7 +194,7 @@ class ExcelRevenueModel:
         
     def load_config_data(self):
         """Load configuration data from model-config.json"""
-        config_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/model-config.json'
+        config_path = CONFIG_PATH
         try:
             with open(config_path, 'r') as f:
                 self.config = json.load(f)
@@ -72,7 +230,7 @@ class ExcelRevenueModel:
         
         # Country selector
         ws['A3'] = 'Country:'
-        ws['B3'] = 'india'  # Default
+        ws['B3'] = self.default_country()
         ws['A3'].font = Font(bold=True)
         
         # Create country dropdown validation
@@ -109,9 +267,9 @@ class ExcelRevenueModel:
         # Metric cards
         metrics = [
             ('Total Revenue (Local)', f'=SUM(Projections!D:D)'),
-            ('Total Revenue (USD)', f'=SUM(Projections!D:D)/B5'),
+            ('Total Revenue (USD)', f'=SUM(Projections!E:E)'),
             ('Total Net Profit (Local)', f'=SUM(Projections!H:H)'),
-            ('Total Net Profit (USD)', f'=SUM(Projections!H:H)/B5'),
+            ('Total Net Profit (USD)', f'=SUM(Projections!I:I)'),
             ('Avg Profit Margin', f'=AVERAGE(Projections!I:I)'),
             ('Total Transaction Volume', f'=SUM(Projections!J:J)')
         ]
@@ -122,33 +280,59 @@ class ExcelRevenueModel:
             ws[f'B{row}'] = formula
             ws[f'A{row}'].font = Font(bold=True)
             ws[f'B{row}'].number_format = '#,##0'
-        
+
+        # Opt-in rolling start: the only cells that use TODAY(), kept apart
+        # from the projection grid so edits elsewhere don't recalculate it
+        if self.rolling_start:
+            rolling_row = metrics_row + 2 + len(metrics) + 1
+            ws[f'A{rolling_row}'] = 'Rolling Start'
+            ws[f'A{rolling_row}'].font = Font(size=14, bold=True)
+            rolling = [
+                ('Projection Start', self.start_date, 'yyyy-mm-dd'),
+                ('Current Month', '=DATE(YEAR(TODAY()),MONTH(TODAY()),1)', 'yyyy-mm-dd'),
+                ('Months Elapsed', f'=(YEAR(B{rolling_row + 2})-YEAR(B{rolling_row + 1}))*12'
+                                   f'+MONTH(B{rolling_row + 2})-MONTH(B{rolling_row + 1})', '0'),
+                ('Current Period', f'=IFERROR(INDEX(Projections!B:B,B{rolling_row + 3}+2),"Beyond horizon")', 'General')
+            ]
+            for i, (label, formula, number_format) in enumerate(rolling, 1):
+                ws[f'A{rolling_row + i}'] = label
+                ws[f'B{rolling_row + i}'] = formula
+                ws[f'A{rolling_row + i}'].font = Font(bold=True)
+                ws[f'B{rolling_row + i}'].number_format = number_format
+
         # Auto-size columns
         for col in ['A', 'B']:
             ws.column_dimensions[col].width = 20
             
         return ws
 
+    def country_data_rows(self):
+        """Rows for the CountryData sheet"""
+        rows = []
+        for code, data in self.config['countries'].items():
+            rows.append([
+                code,
+                data.get('name', code.title()),
+                data.get('currencySymbol', '$'),
+                data.get('exchangeRate', 1),
+                data.get('population', 0)
+            ])
+        return rows
+
     def create_country_data_sheet(self):
         """Create the country configuration data sheet"""
         ws = self.wb.create_sheet(title="CountryData")
         
         # Headers
-        headers = ['CountryCode', 'CountryName', 'CurrencySymbol', 'ExchangeRate', 'Population']
-        for col, header in enumerate(headers, 1):
+        for col, header in enumerate(COUNTRY_DATA_HEADERS, 1):
             cell = ws.cell(row=1, column=col, value=header)
             cell.font = self.header_font
             cell.fill = self.header_fill
         
         # Country data
-        row = 2
-        for code, data in self.config['countries'].items():
-            ws.cell(row=row, column=1, value=code)
-            ws.cell(row=row, column=2, value=data.get('name', code.title()))
-            ws.cell(row=row, column=3, value=data.get('currencySymbol', '$'))
-            ws.cell(row=row, column=4, value=data.get('exchangeRate', 1))
-            ws.cell(row=row, column=5, value=data.get('population', 0))
-            row += 1
+        for row, values in enumerate(self.country_data_rows(), 2):
+            for col, value in enumerate(values, 1):
+                ws.cell(row=row, column=col, value=value)
         
         # Auto-size columns
         for col in ws.columns:
@@ -165,6 +349,17 @@ class ExcelRevenueModel:
             
         return ws
 
+    def fx_rate_rows(self):
+        """Rows for the FXRates sheet: one rate per country and projection month"""
+        return fx_rates.fx_rate_rows(
+            self.config, list(self.config['countries'].keys()), self.start_date, PROJECTION_MONTHS,
+            scenario=fx_rates.get_fx_scenario(self.config, self.fx_scenario)
+        )
+
+    def create_fx_rates_sheet(self):
+        """Create the monthly FX rate path sheet used by the USD columns"""
+        return fx_rates.create_fx_rates_sheet(self.wb, self.fx_rate_rows())
+
     def create_parameters_sheet(self):
         """Create the input parameters sheet"""
         ws = self.wb.create_sheet(title="Parameters")
@@ -177,37 +372,21 @@ class ExcelRevenueModel:
         ws['A3'] = 'Base Parameters'
         ws['A3'].font = Font(size=12, bold=True)
         
-        params = [
-            ('Start Revenue', 0),
-            ('Growth Rate (%)', 4),
-            ('Projection Months', 12),
-            ('Cost Percentage (%)', 35),
-            ('Operating Expenses', 0),
-            ('Operating Expense Type', 'fixed'),
-            ('Operating Expense Percentage (%)', 15)
-        ]
-        
-        row = 4
-        for param, default_value in params:
-            ws[f'A{row}'] = param
-            ws[f'B{row}'] = default_value
+        # The default country's baseParams, each behind a defined name
+        base_params = self.base_params()
+        for row, (key, label, name) in enumerate(BASE_PARAMETERS, 4):
+            ws[f'A{row}'] = label
+            ws[f'B{row}'] = base_params[key]
             ws[f'A{row}'].font = Font(bold=True)
-            row += 1
+            self.wb.defined_names[name] = DefinedName(name, attr_text=f'Parameters!$B${row}')
         
         # Seasonality section
         ws['A12'] = 'Seasonality Multipliers'
         ws['A12'].font = Font(size=12, bold=True)
         
-        # Seasonality data
-        seasonality_data = {
-            'Month': list(range(1, 13)),
-            'None': [1.0] * 12,
-            'Retail': [0.9, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.05, 1.0, 1.1, 1.2, 1.3],
-            'Summer': [0.8, 0.85, 0.9, 1.0, 1.1, 1.2, 1.3, 1.2, 1.0, 0.9, 0.85, 0.8]
-        }
-        
         # Headers for seasonality table
-        headers = ['Month', 'None', 'Retail', 'Summer']
+        table, selected = self.seasonality_table()
+        headers = ['Month'] + list(table)
         for col, header in enumerate(headers, 1):
             cell = ws.cell(row=13, column=col, value=header)
             cell.font = self.header_font
@@ -216,82 +395,68 @@ class ExcelRevenueModel:
         # Seasonality values
         for month in range(12):
             ws.cell(row=14 + month, column=1, value=month + 1)
-            ws.cell(row=14 + month, column=2, value=seasonality_data['None'][month])
-            ws.cell(row=14 + month, column=3, value=seasonality_data['Retail'][month])
-            ws.cell(row=14 + month, column=4, value=seasonality_data['Summer'][month])
+            for col, multipliers in enumerate(table.values(), 2):
+                ws.cell(row=14 + month, column=col, value=multipliers[month])
+        
+        # Projections formulas read the selected profile through a defined name
+        column = get_column_letter(2 + list(table).index(selected))
+        self.wb.defined_names[SEASONALITY_NAME] = DefinedName(
+            SEASONALITY_NAME, attr_text=f'Parameters!${column}$14:${column}$25'
+        )
         
         return ws
 
+    def default_country(self):
+        """Country selected on the Dashboard and plotted on the Charts sheet"""
+        return self.config.get('defaultCountry', 'india')
+
+    def base_params(self):
+        """The default country's baseParams, as written to the Parameters sheet"""
+        return projection_engine.get_base_params(self.config, self.default_country())
+
+    def seasonality_multipliers(self):
+        """The 12 multipliers behind SEASONALITY_NAME: the baseParams seasonality profile"""
+        return projection_engine.get_seasonality(self.config, self.base_params().get('seasonality', 'none'))
+
+    def seasonality_table(self):
+        """(Parameters seasonality columns, title of the selected profile's column)"""
+        profile = str(self.base_params().get('seasonality') or 'none')
+        table = dict(SEASONALITY_TABLE)
+        selected = next((title for title in table if title.lower() == profile.lower()), profile)
+        table[selected] = [float(m) for m in self.seasonality_multipliers()]
+        return table, selected
+
+    def segment_library_rows(self):
+        """Rows for the SegmentLibrary sheet
+
+        Each country's segment library from the config, or the sample
+        segments for countries without one.
+        """
+        libraries = self.config.get('segmentLibraries', {})
+        rows = []
+        for country_code in self.config['countries'].keys():
+            for segment in libraries.get(country_code) or SAMPLE_SEGMENTS:
+                rows.append([
+                    country_code, segment.get('name'), segment.get('category'), segment.get('market'),
+                    segment.get('price'), segment.get('cost'), segment.get('volume'),
+                    segment.get('volumeGrowth'), segment.get('description', '')
+                ])
+        return rows
+
     def create_segments_sheet(self):
         """Create the segment library sheet"""
         ws = self.wb.create_sheet(title="SegmentLibrary")
         
         # Headers
-        headers = [
-            'Country', 'SegmentName', 'Category', 'Market', 
-            'PricePerTransaction', 'CostPerTransaction', 
-            'MonthlyVolume', 'VolumeGrowth', 'Description'
-        ]
-        
-        for col, header in enumerate(headers, 1):
+        for col, header in enumerate(SEGMENT_LIBRARY_HEADERS, 1):
             cell = ws.cell(row=1, column=col, value=header)
             cell.font = self.header_font
             cell.fill = self.header_fill
         
-        # Sample segment data for each country
-        segments_data = []
-        
-        for country_code in self.config['countries'].keys():
-            country_segments = [
-                {
-                    'country': country_code,
-                    'name': 'Basic Authentication',
-                    'category': 'authentication',
-                    'market': 'General',
-                    'price': 0.15,
-                    'cost': 0.05,
-                    'volume': 10000000,
-                    'growth': 8,
-                    'description': 'Basic authentication service for general verification'
-                },
-                {
-                    'country': country_code,
-                    'name': 'eKYC Service',
-                    'category': 'kyc',
-                    'market': 'Financial Services',
-                    'price': 2.50,
-                    'cost': 0.75,
-                    'volume': 5000000,
-                    'growth': 12,
-                    'description': 'Electronic KYC service for financial institutions'
-                },
-                {
-                    'country': country_code,
-                    'name': 'Biometric Auth',
-                    'category': 'biometric',
-                    'market': 'Government',
-                    'price': 0.25,
-                    'cost': 0.08,
-                    'volume': 25000000,
-                    'growth': 5,
-                    'description': 'Biometric authentication for government services'
-                }
-            ]
-            segments_data.extend(country_segments)
-        
         # Add segment data to sheet
-        row = 2
-        for segment in segments_data:
-            ws.cell(row=row, column=1, value=segment['country'])
-            ws.cell(row=row, column=2, value=segment['name'])
-            ws.cell(row=row, column=3, value=segment['category'])
-            ws.cell(row=row, column=4, value=segment['market'])
-            ws.cell(row=row, column=5, value=segment['price'])
-            ws.cell(row=row, column=6, value=segment['cost'])
-            ws.cell(row=row, column=7, value=segment['volume'])
-            ws.cell(row=row, column=8, value=segment['growth'])
-            ws.cell(row=row, column=9, value=segment['description'])
-            row += 1
+        for row, values in enumerate(self.segment_library_rows(), 2):
+            for col, value in enumerate(values, 1):
+                ws.cell(row=row, column=col, value=value)
         
         # Auto-size columns
         for col in ws.columns:
@@ -308,91 +473,127 @@ class ExcelRevenueModel:
             
         return ws
 
-    def create_projections_sheet(self):
-        """Create the main projections calculation sheet"""
-        ws = self.wb.create_sheet(title="Projections")
-        
-        # Headers
-        headers = [
-            'Month', 'Period', 'Country', 'Revenue_Local', 'Revenue_USD',
-            'COGS_Local', 'COGS_USD', 'NetProfit_Local', 'NetProfit_USD',
-            'ProfitMargin', 'TransactionVolume'
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = self.header_font
-            cell.fill = self.header_fill
+    def projection_rows(self):
+        """Formula rows for the Projections sheet"""
+        if self.formula_mode == 'dynamic':
+            return self.dynamic_projection_rows()
         
         # Create formulas for 120 months (10 years max)
-        for month in range(1, 121):
+        calendar = projection_engine.period_calendar(PROJECTION_MONTHS, self.start_date)
+        countries = list(self.config['countries'].keys())
+        rows = []
+        for month in range(1, PROJECTION_MONTHS + 1):
             row = month + 1
             
+            period = calendar[month - 1]
+            
             # Month number
-            ws.cell(row=row, column=1, value=month)
+            values = [month]
             
-            # Period calculation based on dashboard selection
-            period_formula = f'=IF(Dashboard!B4="1M",TEXT(DATE(YEAR(TODAY()),MONTH(TODAY())+{month-1},1),"mmm dd"),' \
-                           f'TEXT(DATE(YEAR(TODAY()),MONTH(TODAY())+{month-1},1),"yyyy mmm"))'
-            ws.cell(row=row, column=2, value=period_formula)
+            # Period label based on dashboard selection (static labels, no TODAY())
+            day_label = period['periodStart'].strftime('%b %d')
+            values.append(f'=IF(Dashboard!B4="1M","{day_label}","{period["monthLabel"]}")')
             
             # Country reference
-            ws.cell(row=row, column=3, value='=Dashboard!B3')
+            values.append('=Dashboard!B3')
             
-            # Revenue calculation (sum of all segments for this country/month)
-            revenue_formula = f'=SUMPRODUCT(' \
-                            f'(SegmentLibrary!A:A=C{row}),' \
-                            f'SegmentLibrary!G:G*POWER(1+SegmentLibrary!H:H/100,A{row}-1),' \
-                            f'SegmentLibrary!E:E,' \
-                            f'INDEX(Parameters!B:D,MOD(A{row}-1,12)+1,2))'
-            ws.cell(row=row, column=4, value=revenue_formula)
+            # Revenue calculation (sum of all segments for this country/month
+            # plus the start revenue stream)
+            values.append(segment_formula(row, 'E') + f'+{start_revenue_formula(f"A{row}")}')
             
             # Revenue USD
-            ws.cell(row=row, column=5, value=f'=D{row}/Dashboard!B5')
+            values.append(f'=D{row}/{fx_rates.fx_rate_reference(row, f"C{row}", countries)}')
             
             # COGS calculation
-            cogs_formula = f'=SUMPRODUCT(' \
-                         f'(SegmentLibrary!A:A=C{row}),' \
-                         f'SegmentLibrary!G:G*POWER(1+SegmentLibrary!H:H/100,A{row}-1),' \
-                         f'SegmentLibrary!F:F,' \
-                         f'INDEX(Parameters!B:D,MOD(A{row}-1,12)+1,2))'
-            ws.cell(row=row, column=6, value=cogs_formula)
+            values.append(segment_formula(row, 'F') + f'+{start_revenue_formula(f"A{row}")}*CostPercentage/100')
             
             # COGS USD
-            ws.cell(row=row, column=7, value=f'=F{row}/Dashboard!B5')
+            values.append(f'=F{row}/{fx_rates.fx_rate_reference(row, f"C{row}", countries)}')
             
             # Net Profit (Revenue - COGS - Operating Expenses)
-            ws.cell(row=row, column=8, value=f'=D{row}-F{row}-Parameters!B6')
+            values.append(f'=D{row}-F{row}-({operating_expense_formula(f"D{row}")})')
             
             # Net Profit USD
-            ws.cell(row=row, column=9, value=f'=H{row}/Dashboard!B5')
+            values.append(f'=H{row}/{fx_rates.fx_rate_reference(row, f"C{row}", countries)}')
             
             # Profit Margin
-            ws.cell(row=row, column=10, value=f'=IF(D{row}>0,H{row}/D{row}*100,0)')
+            values.append(f'=IF(D{row}>0,H{row}/D{row}*100,0)')
             
             # Transaction Volume
-            volume_formula = f'=SUMPRODUCT(' \
-                           f'(SegmentLibrary!A:A=C{row}),' \
-                           f'SegmentLibrary!G:G*POWER(1+SegmentLibrary!H:H/100,A{row}-1),' \
-                           f'INDEX(Parameters!B:D,MOD(A{row}-1,12)+1,2))'
-            ws.cell(row=row, column=11, value=volume_formula)
+            values.append(segment_formula(row))
+            
+            # Calendar attributes
+            values.extend([period['periodStart'], period['year'], period['quarter'], period['month']])
+            rows.append(values)
+        
+        return rows
+
+    def dynamic_projection_rows(self):
+        """Projections rows as one array formula per column (Excel 365)
+
+        Each computed column is a single LET/LAMBDA formula over the bounded
+        SegmentLibrary block, entered as an array over all projection months;
+        the rows below the first only carry the static calendar values.
+        """
+        last = PROJECTION_MONTHS + 1
+        seg_last = SEGMENT_LIBRARY_ROWS
+        block = lambda col: f'{col}2:{col}{last}'
+        library = lambda col: f'SegmentLibrary!{col}2:{col}{seg_last}'
+        array = lambda col, formula, names=(): ArrayFormula(block(col), future_formula(formula, names))
+        
+        # Segment x month grid shared by revenue, COGS and volume: weight is the
+        # per-segment price/cost column (1 for volume), summed over segments
+        # with MMULT and scaled by the seasonality multiplier of each month
+        def segment_total(weight, extra=''):
+            formula = (
+                f'=LET(month,A2:A{last},'
+                f'selected,--({library("A")}=Dashboard!B3),'
+                f'growth,POWER(1+{library("H")}/100,TRANSPOSE(month-1)),'
+                f'seasonal,INDEX({SEASONALITY_NAME},MOD(month-1,12)+1),'
+                f'total,LAMBDA(weight,TRANSPOSE(MMULT(TRANSPOSE(selected*{library("G")}*weight),growth))*seasonal),'
+                f'total({weight})){extra}'
+            )
+            return formula, ('month', 'selected', 'growth', 'seasonal', 'total', 'weight')
+        
+        calendar = projection_engine.period_calendar(PROJECTION_MONTHS, self.start_date)
+        fx_last = get_column_letter(len(self.config['countries']) + 1)
+        fx_path = f'INDEX(FXRates!$B$2:${fx_last}${last},0,MATCH(Dashboard!B3,FXRates!$B$1:${fx_last}$1,0))'
+        first = [
+            array('A', f'=SEQUENCE({PROJECTION_MONTHS})'),
+            array('B', f'=IF(Dashboard!B4="1M",TEXT({block("L")},"mmm dd"),TEXT({block("L")},"yyyy mmm"))'),
+            array('C', f'=IF({block("A")}>0,Dashboard!B3)'),
+            array('D', *segment_total(library('E'), f'+{start_revenue_formula(block("A"))}')),
+            array('E', f'={block("D")}/{fx_path}'),
+            array('F', *segment_total(library('F'), f'+{start_revenue_formula(block("A"))}*CostPercentage/100')),
+            array('G', f'={block("F")}/{fx_path}'),
+            array('H', f'={block("D")}-{block("F")}-({operating_expense_formula(block("D"))})'),
+            array('I', f'={block("H")}/{fx_path}'),
+            array('J', f'=IF({block("D")}>0,{block("H")}/{block("D")}*100,0)'),
+            array('K', *segment_total('1'))
+        ]
         
-        # Format currency columns
-        for col in [4, 6, 8]:  # Local currency columns
-            for row in range(2, 122):
-                ws.cell(row=row, column=col).number_format = '#,##0'
+        rows = []
+        for month, period in enumerate(calendar, 1):
+            values = first if month == 1 else [None] * len(first)
+            rows.append(list(values) + [period['periodStart'], period['year'], period['quarter'], period['month']])
         
-        for col in [5, 7, 9]:  # USD columns
-            for row in range(2, 122):
-                ws.cell(row=row, column=col).number_format = '$#,##0'
+        return rows
+
+    def create_projections_sheet(self):
+        """Create the main projections calculation sheet"""
+        ws = self.wb.create_sheet(title="Projections")
         
-        for col in [10]:  # Percentage columns
-            for row in range(2, 122):
-                ws.cell(row=row, column=col).number_format = '0.0%'
+        # Headers
+        for col, header in enumerate(PROJECTION_HEADERS, 1):
+            cell = ws.cell(row=1, column=col, value=header)
+            cell.font = self.header_font
+            cell.fill = self.header_fill
         
-        for col in [11]:  # Volume columns
-            for row in range(2, 122):
-                ws.cell(row=row, column=col).number_format = '#,##0'
+        for row, values in enumerate(self.projection_rows(), 2):
+            for col, value in enumerate(values, 1):
+                cell = ws.cell(row=row, column=col, value=value)
+                if col in PROJECTION_FORMATS:
+                    cell.number_format = PROJECTION_FORMATS[col]
         
         return ws
 
@@ -444,24 +645,46 @@ class ExcelRevenueModel:
             revenue_formula = f'=SUMPRODUCT(Projections!D:D)*{vol_mult}*{price_mult}'
             ws.cell(row=row, column=2, value=revenue_formula)
             
-            # Total Profit with scenario adjustments
+            # Total Profit with scenario adjustments; operating expenses are
+            # the Projections total (revenue - COGS - net profit)
             profit_formula = f'=(SUMPRODUCT(Projections!D:D)*{vol_mult}*{price_mult})' \
                            f'-(SUMPRODUCT(Projections!F:F)*{vol_mult}*{cost_mult})' \
-                           f'-(Parameters!B6*{opex_mult}*Parameters!B3)'
+                           f'-((SUMPRODUCT(Projections!D:D)-SUMPRODUCT(Projections!F:F)' \
+                           f'-SUMPRODUCT(Projections!H:H))*{opex_mult})'
             ws.cell(row=row, column=3, value=profit_formula)
             
             # Profit Margin
             ws.cell(row=row, column=4, value=f'=IF(B{row}>0,C{row}/B{row}*100,0)')
             
             # Average Monthly Revenue
-            ws.cell(row=row, column=5, value=f'=B{row}/Parameters!B3')
+            ws.cell(row=row, column=5, value=f'=B{row}/COUNT(Projections!A:A)')
         
         return ws
 
-    def create_charts_sheet(self):
+    def chart_series(self, country=None, periods=120, daily=False):
+        """Period labels and revenue series for the Charts sheet
+
+        Projected from the SegmentLibrary rows and seasonality multipliers the
+        Projections formulas read, so the chart matches the sheet.
+        """
+        country = country or self.default_country()
+        if daily:
+            periods = periods * projection_engine.DAYS_PER_MONTH
+        arrays = segment_library_arrays(self.segment_library_rows(), country)
+        result = projection_cache.project(arrays, self.base_params(), self.seasonality_multipliers(),
+                                         periods, daily=daily)
+        labels = projection_engine.period_labels(periods, self.start_date, daily=daily)
+        return labels, {'Revenue_Local': result['revenue']}
+
+    def create_charts_sheet(self, country=None, periods=120, daily=False):
         """Create charts and visualizations sheet"""
         ws = self.wb.create_sheet(title="Charts")
         
+        # Chart series are cached values from the projection engine so the
+        # chart renders without waiting for a workbook recalculation
+        labels, series = self.chart_series(country, periods, daily)
+        last_row = write_chart_series(ws, labels, series)
+        
         # Revenue projection chart
         chart = LineChart()
         chart.title = "Revenue Projections"
@@ -469,14 +692,13 @@ class ExcelRevenueModel:
         chart.x_axis.title = 'Month'
         chart.y_axis.title = 'Revenue'
         
-        # Data for chart (first 12 months)
-        data = Reference(ws, min_col=4, min_row=1, max_row=13, max_col=4)
-        cats = Reference(ws, min_col=2, min_row=2, max_row=13)
+        data = Reference(ws, min_col=2, min_row=1, max_row=last_row, max_col=2)
+        cats = Reference(ws, min_col=1, min_row=2, max_row=last_row)
         
         chart.add_data(data, titles_from_data=True)
         chart.set_categories(cats)
         
-        ws.add_chart(chart, "A1")
+        ws.add_chart(chart, "D2")
         
         return ws
 
@@ -496,8 +718,8 @@ class ExcelRevenueModel:
     def save_workbook(self, filename):
         """Save the workbook to file"""
         try:
-            filepath = f'/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/{filename}'
-            self.wb.save(filepath)
+            filepath = project_path(filename)
+            xlsx_parts.save_workbook(self.wb, filepath)
             print(f"Excel model saved successfully: {filepath}")
             return filepath
         except Exception as e:
@@ -510,6 +732,7 @@ class ExcelRevenueModel:
         
         # Create all sheets
         self.create_country_data_sheet()
+        self.create_fx_rates_sheet()
         self.create_parameters_sheet()
         self.create_segments_sheet()
         self.create_projections_sheet()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Demographics-driven segment volume synthesis - APAC Revenue Projections Model
+Derives monthly transaction volumes per region and product from the fields in
+demographics/*_demographics.json (population, authPct, pensionPct, authFreq,
+smartphone penetration, authGrowthRate) and projects them with the engine,
+giving region x product x month forecasts for every country at once.
+"""
+
+import json
+import os
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+
+import fx_rates
+import projection_engine as engine
+import xlsx_parts
+from partial_workbook import PartialWorkbook
+
+DEMOGRAPHICS_DIR = os.path.join(engine.PROJECT_DIR, 'demographics')
+
+# Same fallbacks as calculateMonthlyVolume() in js/demographics.js, applied
+# the way its `parseFloat(x) || default` does: missing, empty, unparseable
+# and zero values all take the default
+REGION_DEFAULTS = {
+    'population': 0.0,
+    'authPct': 10.0,
+    'pensionPct': 8.0,
+    'authFreq': 1.0
+}
+
+# Growth follows the segment loader: authGrowthRate || volumeGrowth || 8
+GROWTH_FIELDS = ('authGrowthRate', 'volumeGrowth')
+DEFAULT_GROWTH = 8.0
+
+# Per-region monthly demand drivers, in transactions:
+#   auth     - authenticating population x authFreq (general authentication)
+#   pension  - pension population x authFreq (pension life certificates)
+#   digital  - authentications made on a smartphone
+DRIVERS = ('auth', 'pension', 'digital')
+
+# Share of each driver that lands in a product category. KYC checks are
+# modelled as a tenth of digital authentications (onboarding, re-KYC).
+CATEGORY_DRIVERS = {
+    'authentication': (1.0, 0.0, 0.0),
+    'biometric': (0.0, 1.0, 0.0),
+    'mobile': (0.0, 0.0, 1.0),
+    'tokenization': (0.0, 0.0, 1.0),
+    'kyc': (0.0, 0.0, 0.1)
+}
+
+
+def load_regional_data(demographics_dir=DEMOGRAPHICS_DIR):
+    """Demographic segments per country, following demographics/index.json"""
+    index_path = os.path.join(demographics_dir, 'index.json')
+    try:
+        with open(index_path, 'r') as f:
+            index_data = json.load(f)
+    except FileNotFoundError:
+        return {}
+
+    regional_data = {}
+    for country_info in index_data.get('countries', []):
+        file_path = os.path.join(demographics_dir, country_info['fileName'])
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r') as f:
+            country_data = json.load(f)
+        regional_data[country_info['countryKey']] = {
+            'country': country_data.get('country', {}),
+            'demographicSegments': country_data.get('demographicSegments', [])
+        }
+    return regional_data
+
+
+def js_number(value, default):
+    """float(value), or default where JavaScript's `parseFloat(value) || default` would take it"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number if number and not np.isnan(number) else default
+
+
+def region_growth(segment):
+    """Annual volume growth (%) of a region, as the JS segment loader picks it"""
+    growth = DEFAULT_GROWTH
+    for field in reversed(GROWTH_FIELDS):
+        growth = js_number(segment.get(field), growth)
+    return growth
+
+
+def smartphone_rate(segment):
+    """Smartphone penetration (%), falling back to digital adoption"""
+    rate = segment.get('digitalProfile', {}).get('smartphonePenetration', {}).get('rate')
+    return float(rate if rate is not None else segment.get('digitalAdoption', 0))
+
+
+def region_arrays(regional_data):
+    """Pack every country's regions into zero-padded (countries, regions) arrays
+
+    The returned dict also carries the country keys, region names per country
+    and a mask marking real regions.
+    """
+    countries = [code for code, data in regional_data.items() if data.get('demographicSegments')]
+    regions = [[s.get('name', '') for s in regional_data[code]['demographicSegments']] for code in countries]
+    width = max((len(names) for names in regions), default=0)
+
+    arrays = {key: np.zeros((len(countries), width)) for key in REGION_DEFAULTS}
+    arrays['authGrowthRate'] = np.zeros((len(countries), width))
+    arrays['smartphone'] = np.zeros((len(countries), width))
+    mask = np.zeros((len(countries), width), dtype=bool)
+
+    for c, code in enumerate(countries):
+        for r, segment in enumerate(regional_data[code]['demographicSegments']):
+            for key, default in REGION_DEFAULTS.items():
+                arrays[key][c, r] = js_number(segment.get(key), default)
+            arrays['authGrowthRate'][c, r] = region_growth(segment)
+            arrays['smartphone'][c, r] = smartphone_rate(segment)
+            mask[c, r] = True
+
+    arrays.update({'countries': countries, 'regions': regions, 'mask': mask})
+    return arrays
+
+
+def driver_volumes(arrays):
+    """Monthly demand per region and driver, shape (countries, regions, drivers)"""
+    population = arrays['population'] * 1e6 * arrays['mask']
+    auth = population * arrays['authPct'] / 100 * arrays['authFreq']
+    pension = population * arrays['pensionPct'] / 100 * arrays['authFreq']
+    digital = auth * arrays['smartphone'] / 100
+    return np.stack([auth, pension, digital], axis=-1)
+
+
+def category_weights(categories):
+    """(products, drivers) weight matrix for a list of product categories"""
+    return np.array([CATEGORY_DRIVERS.get(category, CATEGORY_DRIVERS['authentication'])
+                     for category in categories], dtype=float).reshape(len(categories), len(DRIVERS))
+
+
+def category_totals(regional_data, categories=tuple(CATEGORY_DRIVERS)):
+    """Country-level monthly demand per product category
+
+    Returns {country: {category: volume}}.
+    """
+    arrays = region_arrays(regional_data)
+    totals = driver_volumes(arrays).sum(axis=1) @ category_weights(categories).T  # (C, K)
+    return {
+        code: {category: float(totals[c, k]) for k, category in enumerate(categories)}
+        for c, code in enumerate(arrays['countries'])
+    }
+
+
+def monthly_growth(annual_rate):
+    """Convert an annual growth rate (%) into the engine's monthly rate (%)"""
+    return (np.power(1 + np.asarray(annual_rate, dtype=float) / 100, 1 / 12) - 1) * 100
+
+
+def synthesize(config, regional_data):
+    """Region x product volumes for every country with a segment library
+
+    Each product takes its category's regional demand, split between products
+    of the same category in proportion to their configured library volumes.
+    Returns a dict of arrays shaped (countries, regions, products) for
+    volume, (countries, products) for price/cost and (countries, regions) for
+    the monthly growth rate, plus the labels.
+    """
+    libraries = config.get('segmentLibraries', {})
+    regional_data = {code: data for code, data in regional_data.items() if libraries.get(code)}
+    arrays = region_arrays(regional_data)
+    countries = arrays['countries']
+
+    products = [libraries[code] for code in countries]
+    product_arrays = engine.stack_segment_arrays([engine.segment_arrays(p) for p in products])
+    width = product_arrays['price'].shape[-1] if countries else 0
+
+    # Split of each category's demand across the country's products
+    weights = np.zeros((len(countries), width, len(DRIVERS)))
+    for c, segments in enumerate(products):
+        categories = [s.get('category', 'authentication') for s in segments]
+        configured = product_arrays['volume'][c, :len(segments)]
+        category_sum = {}
+        for category, volume in zip(categories, configured):
+            category_sum[category] = category_sum.get(category, 0) + volume
+        shares = np.array([
+            volume / category_sum[category] if category_sum[category] > 0 else 1 / categories.count(category)
+            for category, volume in zip(categories, configured)
+        ])
+        weights[c, :len(segments)] = category_weights(categories) * shares[:, None]
+
+    volume = np.einsum('crd,cpd->crp', driver_volumes(arrays), weights)
+
+    return {
+        'countries': countries,
+        'regions': arrays['regions'],
+        'products': [[s.get('name', f'Segment {i + 1}') for i, s in enumerate(p)] for p in products],
+        'volume': volume,
+        'growth': monthly_growth(arrays['authGrowthRate']) * arrays['mask'],
+        'price': product_arrays['price'],
+        'cost': product_arrays['cost'],
+        'mask': arrays['mask']
+    }
+
+
+def project_regions(config, synthesis, periods=12, daily=False):
+    """Project synthesized volumes through the engine
+
+    Returns region x product x period volume, revenue and COGS of shape
+    (countries, regions, products, periods) plus country totals from
+    engine.finalize_totals() under 'totals'.
+    """
+    countries = synthesis['countries']
+    params_list = [engine.get_base_params(config, code) for code in countries]
+    multipliers = np.array([
+        engine.get_seasonality(config, p.get('seasonality', 'none')) for p in params_list
+    ]).reshape(len(countries), 12)
+    seasonal = engine.seasonality_curve(multipliers, periods, daily)  # (C, T)
+
+    growth = np.broadcast_to(synthesis['growth'][..., None], synthesis['volume'].shape)
+    volume = engine.segment_volumes(synthesis['volume'], growth, seasonal[:, None, :], periods, daily)
+    revenue = volume * synthesis['price'][:, None, :, None]
+    cogs = volume * synthesis['cost'][:, None, :, None]
+
+    totals = engine.finalize_totals(
+        revenue.sum(axis=(1, 2)), cogs.sum(axis=(1, 2)), volume.sum(axis=(1, 2)),
+        engine.stack_base_params(params_list), daily
+    )
+    return {'volume': volume, 'revenue': revenue, 'cogs': cogs, 'totals': totals}
+
+
+def create_regional_volume_sheet(wb, synthesis, projection, countries_config, rates=None):
+    """Write region x product volumes and horizon totals into a RegionalVolumes sheet
+
+    rates is an optional (countries, periods) FX path from fx_rates.rate_paths();
+    without it USD revenue uses each country's scalar exchangeRate.
+    """
+    sheet_name = 'RegionalVolumes'
+    if sheet_name in wb.sheetnames:
+        wb.remove(wb[sheet_name])
+    ws = wb.create_sheet(sheet_name)
+
+    headers = ['Country', 'Region', 'Product', 'Monthly Volume', 'Monthly Growth (%)',
+               'Horizon Volume', 'Horizon Revenue (Local)', 'Horizon Revenue (USD)']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+
+    horizon_volume = projection['volume'].sum(axis=-1)
+    horizon_revenue = projection['revenue'].sum(axis=-1)
+    if rates is not None:
+        horizon_usd = (projection['revenue'] / rates[:, None, None, :]).sum(axis=-1)
+    else:
+        exchange_rates = np.array([countries_config.get(code, {}).get('exchangeRate', 1) or 1
+                                   for code in synthesis['countries']], dtype=float)
+        horizon_usd = horizon_revenue / exchange_rates[:, None, None]
+
+    row = 2
+    for c, code in enumerate(synthesis['countries']):
+        country = countries_config.get(code, {})
+        for r, region in enumerate(synthesis['regions'][c]):
+            for p, product in enumerate(synthesis['products'][c]):
+                values = [country.get('name', code.title()), region, product,
+                          float(synthesis['volume'][c, r, p]), float(synthesis['growth'][c, r]),
+                          float(horizon_volume[c, r, p]), float(horizon_revenue[c, r, p]),
+                          float(horizon_usd[c, r, p])]
+                for col, value in enumerate(values, 1):
+                    cell = ws.cell(row=row, column=col, value=value)
+                    if col in (4, 6, 7):
+                        cell.number_format = '#,##0'
+                    elif col == 5:
+                        cell.number_format = '0.00'
+                    elif col == 8:
+                        cell.number_format = '$#,##0'
+                row += 1
+
+    ws.column_dimensions['A'].width = 14
+    ws.column_dimensions['B'].width = 26
+    ws.column_dimensions['C'].width = 30
+    for col in 'DEFGH':
+        ws.column_dimensions[col].width = 20
+
+    print(f"✅ Created RegionalVolumes sheet ({row - 2} region/product rows)")
+    return ws
+
+
+def enhance_excel_model_with_regional_volumes(periods=12, streaming=False):
+    """Synthesize demographic volumes for all countries and add them to the Enhanced model
+
+    With streaming=True no existing sheet is parsed: RegionalVolumes is
+    rebuilt and the rest of the workbook is copied through unchanged.
+    """
+    file_path = os.path.join(engine.PROJECT_DIR, 'APAC_Revenue_Projections_Enhanced_Model.xlsx')
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        config = engine.load_model_config()
+        synthesis = synthesize(config, load_regional_data())
+        projection = project_regions(config, synthesis, periods)
+        # FX months line up with the workbook's projection, not today
+        start_date = engine.month_start(xlsx_parts.workbook_start_date(file_path))
+        rates = fx_rates.rate_paths(config, synthesis['countries'], start_date, periods)
+
+        partial = PartialWorkbook(file_path, ()) if streaming else None
+        wb = partial.wb if partial else openpyxl.load_workbook(file_path)
+        create_regional_volume_sheet(wb, synthesis, projection, config.get('countries', {}), rates)
+        if partial:
+            partial.save(file_path)
+        else:
+            xlsx_parts.save_workbook(wb, file_path)
+
+        print(f"📄 Regional volumes saved: {file_path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error synthesizing regional volumes: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    enhance_excel_model_with_regional_volumes()
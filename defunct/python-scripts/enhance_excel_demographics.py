@@ -11,10 +11,18 @@ from openpyxl.worksheet.datavalidation import DataValidation
 import json
 import os
 
+import cohort_projection
+import geo_rollups
+import projection_engine
+import segment_query
+import xlsx_parts
+from partial_workbook import PartialWorkbook
+from project_paths import CONFIG_PATH, DEMOGRAPHICS_DIR, ENHANCED_MODEL_FILE, project_path
+
 def load_demographic_data():
     """Load the enhanced demographic data from external files"""
-    config_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/model-config.json'
-    demographics_dir = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/demographics'
+    config_path = CONFIG_PATH
+    demographics_dir = DEMOGRAPHICS_DIR
     
     with open(config_path, 'r') as f:
         config = json.load(f)
@@ -44,6 +52,7 @@ def load_demographic_data():
                         country_data = json.load(f)
                     
                     regional_data[country_key] = {
+                        'country': country_data.get('country', {}),
                         'demographicSegments': country_data.get('demographicSegments', [])
                     }
                     print(f"  ✅ Loaded {len(country_data.get('demographicSegments', []))} segments for {country_data['country']['name']}")
@@ -264,10 +273,10 @@ def enhance_dashboard_with_demographics(wb):
     ws.cell(row=summary_start_row, column=1).font = Font(bold=True, size=12)
     
     insights = [
-        ('Total Segments Available', f'=COUNTA(DemographicSummary.A2:A20)'),
-        ('Avg Auth Rate (%)', f'=AVERAGE(DemographicSummary.D2:D20)'),
-        ('Avg Digital Adoption (%)', f'=AVERAGE(DemographicSummary.E2:E20)'),
-        ('High Economic Tier Countries', f'=COUNTIF(DemographicSummary.F2:F20,">50")')
+        ('Total Segments Available', f'=COUNTA(DemographicSummary!A2:A20)'),
+        ('Avg Auth Rate (%)', f'=AVERAGE(DemographicSummary!D2:D20)'),
+        ('Avg Digital Adoption (%)', f'=AVERAGE(DemographicSummary!E2:E20)'),
+        ('High Economic Tier Countries', f'=COUNTIF(DemographicSummary!F2:F20,">50")')
     ]
     
     row = summary_start_row + 1
@@ -279,10 +288,14 @@ def enhance_dashboard_with_demographics(wb):
     
     print("✅ Enhanced Dashboard with demographic analysis section")
 
-def enhance_excel_model_with_demographics():
-    """Main function to enhance the Excel model with comprehensive demographic data"""
+def enhance_excel_model_with_demographics(streaming=False):
+    """Main function to enhance the Excel model with comprehensive demographic data
+
+    With streaming=True only the Dashboard is parsed; the demographic sheets
+    are rebuilt and every other sheet is copied through unchanged.
+    """
     
-    file_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/APAC_Revenue_Projections_Enhanced_Model.xlsx'
+    file_path = project_path(ENHANCED_MODEL_FILE)
     
     if not os.path.exists(file_path):
         print("❌ Excel file not found")
@@ -293,15 +306,30 @@ def enhance_excel_model_with_demographics():
         regional_data, countries = load_demographic_data()
         
         # Open workbook
-        wb = openpyxl.load_workbook(file_path)
+        partial = PartialWorkbook(file_path, ('Dashboard',)) if streaming else None
+        wb = partial.wb if partial else openpyxl.load_workbook(file_path)
         
         # Create demographic sheets
         create_demographic_summary_sheet(wb, regional_data, countries)
         create_country_demographic_sheets(wb, regional_data, countries)
+        cohorts = cohort_projection.cohort_volumes(
+            regional_data, years=20,
+            country_age_groups=cohort_projection.load_country_age_groups(regional_data)
+        )
+        cohort_projection.add_cohort_volumes_to_demographic_sheets(wb, cohorts, countries)
         enhance_dashboard_with_demographics(wb)
+        segment_query.create_segment_filter_sheet(wb, segment_query.SegmentIndex(regional_data))
+        segment_query.add_dashboard_filter_results(wb)
+        start_date = projection_engine.month_start(xlsx_parts.workbook_start_date(file_path))
+        hierarchy = geo_rollups.GeoHierarchy(projection_engine.load_model_config(), regional_data,
+                                             start_date=start_date)
+        geo_rollups.create_geo_rollup_sheet(wb, hierarchy)
         
         # Save enhanced workbook
-        wb.save(file_path)
+        if partial:
+            partial.save(file_path)
+        else:
+            xlsx_parts.save_workbook(wb, file_path)
         
         print(f"\n🎉 Excel model successfully enhanced with comprehensive demographic data!")
         print(f"📄 Enhanced file: {file_path}")
@@ -311,7 +339,10 @@ def enhance_excel_model_with_demographics():
         print(f"   • Enhanced demographic fields: digital adoption, economic tiers, urbanization")
         print(f"   • Growth rate calculations based on demographic data")
         print(f"   • Revenue potential calculations with demographic adjustments")
+        print(f"   • Cohort-weighted authentication volumes from age-group projections")
         print(f"   • Dashboard integration with demographic analysis")
+        print(f"   • Segment filters and preset summaries driven by the Dashboard inputs")
+        print(f"   • Region, country, sub-region and APAC rollups by month")
         
         return True
         
@@ -8,26 +8,52 @@ Enhance the Excel revenue projection model with advanced features:
 - Demographics integration
 """
 
-import pandas as pd
 import json
 from openpyxl import load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.chart import LineChart, Reference, BarChart
 from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
-import math
+
+from project_paths import CONFIG_PATH, project_path
+import projection_engine
+import projection_cache
+import demographic_volumes
+import fx_rates
+import xlsx_parts
+from chart_data import write_chart_series
+from partial_workbook import PartialWorkbook
+from create_excel_model import (BASE_PARAMETERS, SEASONALITY_NAME, SEGMENT_LIBRARY_HEADERS,
+                                SEGMENT_LIBRARY_ROWS, segment_library_arrays)
+
+# First column of the static calendar block in the enhanced Projections sheet
+# (after the 21 header columns)
+CALENDAR_COLUMN = 22
+
+# Sheets the enhancer reads or edits in place; with streaming=True only these
+# are parsed and the rest of the Master model is copied through on save
+ENHANCED_SHEETS = ('Dashboard', 'Projections', 'SegmentLibrary', 'Charts', 'FXRates', 'Parameters')
 
 class AdvancedExcelModel:
-    def __init__(self, filename):
-        self.wb = load_workbook(filename)
+    def __init__(self, filename, start_date=None, streaming=False, fx_scenario=None):
+        if streaming:
+            self.partial = PartialWorkbook(filename, ENHANCED_SHEETS)
+            self.wb = self.partial.wb
+        else:
+            self.partial = None
+            self.wb = load_workbook(filename)
         self.load_config_data()
         
+        # Keep the master model's projection start unless one is given
+        self.start_date = projection_engine.month_start(start_date or self.master_start_date())
+        # None keeps the master model's FXRates path where it still lines up
+        self.fx_scenario = fx_scenario
+        
         # Enhanced styles
         self.create_named_styles()
         
     def load_config_data(self):
         """Load configuration data from model-config.json"""
-        config_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/model-config.json'
+        config_path = CONFIG_PATH
         try:
             with open(config_path, 'r') as f:
                 self.config = json.load(f)
@@ -49,6 +75,55 @@ class AdvancedExcelModel:
             }
         }
     
+    def master_start_date(self):
+        """PeriodStart of the first projection month in the loaded workbook, if present"""
+        if 'Projections' not in self.wb.sheetnames:
+            return None
+        ws = self.wb['Projections']
+        for col in range(1, ws.max_column + 1):
+            if ws.cell(row=1, column=col).value in ('PeriodStart', 'Period_Start'):
+                value = ws.cell(row=2, column=col).value
+                return value.date() if hasattr(value, 'date') else None
+        return None
+
+    def fx_rates_start(self):
+        """PeriodStart of the first FXRates row, if the sheet exists"""
+        if 'FXRates' not in self.wb.sheetnames:
+            return None
+        value = self.wb['FXRates']['A2'].value
+        return value.date() if hasattr(value, 'date') else None
+
+    def segment_library_rows(self):
+        """SegmentLibrary rows as they stand in the workbook"""
+        ws = self.wb['SegmentLibrary']
+        return [list(row) for row in ws.iter_rows(min_row=2, max_col=len(SEGMENT_LIBRARY_HEADERS),
+                                                    values_only=True) if row[0] is not None]
+
+    def named_values(self, name):
+        """Cell values behind a workbook defined name, or None if it is not defined"""
+        defined = self.wb.defined_names.get(name)
+        if defined is None:
+            return None
+        sheet, cells = next(defined.destinations)
+        block = self.wb[sheet][cells.replace('$', '')]
+        if not isinstance(block, tuple):
+            return [block.value]
+        return [cell.value for row in block for cell in (row if isinstance(row, tuple) else (row,))]
+
+    def base_params(self):
+        """Base params as the workbook's Parameters sheet states them"""
+        params = dict(projection_engine.DEFAULT_BASE_PARAMS)
+        for key, _, name in BASE_PARAMETERS:
+            values = self.named_values(name)
+            if values and values[0] is not None:
+                params[key] = values[0]
+        return params
+
+    def seasonality_multipliers(self):
+        """Values of the workbook's Seasonality name (flat if the workbook predates it)"""
+        values = self.named_values(SEASONALITY_NAME)
+        return [float(v or 0) for v in values] if values else [1.0] * 12
+
     def create_named_styles(self):
         """Create named styles for consistent formatting"""
         # Header style
@@ -131,11 +206,33 @@ class AdvancedExcelModel:
             'Growth_Factor', 'Cumulative_Revenue'
         ]
         
+        calendar_headers = ['Period_Start', 'Year', 'Quarter', 'Month_Of_Year']
+        
         # Update headers
         for col, header in enumerate(headers, 1):
             cell = ws.cell(row=1, column=col, value=header)
             cell.font = Font(bold=True, color='FFFFFF')
             cell.fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+        for col, header in enumerate(calendar_headers, CALENDAR_COLUMN):
+            cell = ws.cell(row=1, column=col, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+        
+        calendar = projection_engine.period_calendar(max_months, self.start_date)
+        
+        # USD columns convert with the monthly FX path, row for row; rebuild it
+        # if the master model predates the FXRates sheet, starts elsewhere or
+        # another FX scenario was asked for
+        if self.fx_scenario is not None or self.fx_rates_start() != self.start_date:
+            if self.fx_scenario is None and 'FXRates' in self.wb.sheetnames:
+                print(f"⚠️  FXRates starts {self.fx_rates_start()}, not {self.start_date}; "
+                      f"rebuilding it with the base FX scenario")
+            index = self.wb.sheetnames.index('FXRates') if 'FXRates' in self.wb.sheetnames else None
+            fx_rates.create_fx_rates_sheet(self.wb, fx_rates.fx_rate_rows(
+                self.config, list(self.config['countries'].keys()), self.start_date, max_months,
+                scenario=fx_rates.get_fx_scenario(self.config, self.fx_scenario or 'base')
+            ), index)
+        fx_countries = [cell.value for cell in self.wb['FXRates'][1][1:] if cell.value]
         
         # Enhanced formulas for each row
         for month in range(1, max_months + 1):
@@ -144,33 +241,44 @@ class AdvancedExcelModel:
             # Month number
             ws.cell(row=row, column=1, value=month)
             
-            # Period label with better formatting
-            period_formula = '''=IF(Dashboard!B4="1M",
-                TEXT(DATE(YEAR(TODAY()),MONTH(TODAY()),DAY(TODAY())+A{0}-1),"mmm dd"),
-                TEXT(DATE(YEAR(TODAY()),MONTH(TODAY())+A{0}-1,1),"yyyy mmm"))'''.format(row)
+            # Period label from the static calendar (no TODAY())
+            period = calendar[month - 1]
+            period_formula = f'=IF(Dashboard!B4="1M","{period["dayLabel"]}","{period["monthLabel"]}")'
             ws.cell(row=row, column=2, value=period_formula)
             
+            # Calendar attributes as values
+            for offset, value in enumerate([period['periodStart'], period['year'],
+                                            period['quarter'], period['month']]):
+                ws.cell(row=row, column=CALENDAR_COLUMN + offset, value=value)
+            ws.cell(row=row, column=CALENDAR_COLUMN).number_format = 'yyyy-mm-dd'
+            
             # Country
             ws.cell(row=row, column=3, value='=Dashboard!$B$3')
+            fx_rate = fx_rates.fx_rate_reference(row, f'C{row}', fx_countries)
             
             # Is daily mode
             ws.cell(row=row, column=4, value='=Dashboard!$B$4="1M"')
             
             # Seasonality factor
-            seasonality_formula = f'''=IF(Parameters!B7="none",1,
-                IF(Parameters!B7="retail",INDEX(Parameters!C14:C25,MOD(A{row}-1,12)+1),
-                IF(Parameters!B7="summer",INDEX(Parameters!D14:D25,MOD(A{row}-1,12)+1),1)))'''
+            seasonality_formula = f'=INDEX({SEASONALITY_NAME},MOD(A{row}-1,12)+1)'
             ws.cell(row=row, column=15, value=seasonality_formula)
             
             # Growth factor (compound growth)
             growth_formula = f'=1+AVERAGEIF(SegmentLibrary!A:A,C{row},SegmentLibrary!H:H)/100'
             ws.cell(row=row, column=16, value=growth_formula)
             
+            # Selected country's segments, each on its own growth curve
+            library = lambda col: f'SegmentLibrary!${col}$2:${col}${SEGMENT_LIBRARY_ROWS}'
+            segment_volume = f'''({library("A")}=C{row})*
+                {library("G")}*
+                POWER(1+{library("H")}/100,IF(D{row},A{row}/30,A{row}-1))'''
+            
+            # Start revenue stream compounding at the base growth rate
+            start_revenue = f'StartRevenue*POWER(1+GrowthRate/100,IF(D{row},A{row}/30,A{row}-1))*IF(D{row},1/30,1)'
+            
             # Transaction volume with better calculation
             volume_formula = f'''=SUMPRODUCT(
-                (SegmentLibrary!A:A=C{row})*
-                SegmentLibrary!G:G*
-                POWER(P{row},IF(D{row},A{row}/30,A{row}-1))*
+                {segment_volume}*
                 O{row}*
                 IF(D{row},1/30,1)
             )'''
@@ -178,46 +286,43 @@ class AdvancedExcelModel:
             
             # Revenue calculation
             revenue_formula = f'''=SUMPRODUCT(
-                (SegmentLibrary!A:A=C{row})*
-                SegmentLibrary!G:G*
-                POWER(P{row},IF(D{row},A{row}/30,A{row}-1))*
-                SegmentLibrary!E:E*
+                {segment_volume}*
+                {library("E")}*
                 O{row}*
                 IF(D{row},1/30,1)
-            )'''
+            )+{start_revenue}'''
             ws.cell(row=row, column=5, value=revenue_formula)
             
             # Revenue USD
-            ws.cell(row=row, column=6, value=f'=E{row}/Dashboard!$B$5')
+            ws.cell(row=row, column=6, value=f'=E{row}/{fx_rate}')
             
             # COGS calculation
             cogs_formula = f'''=SUMPRODUCT(
-                (SegmentLibrary!A:A=C{row})*
-                SegmentLibrary!G:G*
-                POWER(P{row},IF(D{row},A{row}/30,A{row}-1))*
-                SegmentLibrary!F:F*
+                {segment_volume}*
+                {library("F")}*
                 O{row}*
                 IF(D{row},1/30,1)
-            )'''
+            )+{start_revenue}*CostPercentage/100'''
             ws.cell(row=row, column=7, value=cogs_formula)
             
             # COGS USD
-            ws.cell(row=row, column=8, value=f'=G{row}/Dashboard!$B$5')
+            ws.cell(row=row, column=8, value=f'=G{row}/{fx_rate}')
             
             # Operating expenses
-            opex_formula = f'''=IF(Parameters!B6="fixed",
-                Parameters!B5*IF(D{row},1/30,1),
-                E{row}*Parameters!B7/100)'''
+            opex_formula = f'''=IF(OR(OperatingExpenseType="fixed",OperatingExpenseType="hybrid"),
+                OperatingExpenses*IF(D{row},1/30,1),0)+
+                IF(OR(OperatingExpenseType="percentage",OperatingExpenseType="hybrid"),
+                E{row}*OperatingExpensePercentage/100,0)'''
             ws.cell(row=row, column=9, value=opex_formula)
             
             # OpEx USD
-            ws.cell(row=row, column=10, value=f'=I{row}/Dashboard!$B$5')
+            ws.cell(row=row, column=10, value=f'=I{row}/{fx_rate}')
             
             # Net Profit
             ws.cell(row=row, column=11, value=f'=E{row}-G{row}-I{row}')
             
             # Net Profit USD
-            ws.cell(row=row, column=12, value=f'=K{row}/Dashboard!$B$5')
+            ws.cell(row=row, column=12, value=f'=K{row}/{fx_rate}')
             
             # Profit Margin
             ws.cell(row=row, column=13, value=f'=IF(E{row}>0,K{row}/E{row},0)')
@@ -314,6 +419,10 @@ class AdvancedExcelModel:
         # Load actual segment data from config if available
         row = 2
         
+        # Monthly volumes derived from the demographic data where available;
+        # the literals below remain the fallback for countries without it
+        demand = demographic_volumes.category_totals(demographic_volumes.load_regional_data())
+        
         for country_code, country_data in self.config['countries'].items():
             # Default segments for each country
             segments = [
@@ -360,6 +469,9 @@ class AdvancedExcelModel:
             ]
             
             for segment in segments:
+                if demand.get(country_code, {}).get(segment['category']):
+                    segment['volume'] = int(demand[country_code][segment['category']])
+                
                 ws.cell(row=row, column=1, value=country_code)
                 ws.cell(row=row, column=2, value=segment['name'])
                 ws.cell(row=row, column=3, value=segment['category'])
@@ -528,7 +640,7 @@ class AdvancedExcelModel:
                 current_row += 1
             current_row += 1
 
-    def enhance_charts(self):
+    def enhance_charts(self, country=None, periods=12, daily=False):
         """Enhance the charts sheet with better visualizations"""
         ws = self.wb['Charts']
         
@@ -536,6 +648,24 @@ class AdvancedExcelModel:
         for row in ws.iter_rows():
             for cell in row:
                 cell.value = None
+        ws._charts = []
+        
+        # Write cached series from the projection engine instead of
+        # =Projections!.. links, which stay blank until a recalculation. They
+        # are projected from the workbook's own SegmentLibrary rows and
+        # seasonality so the chart matches the Projections sheet.
+        country = country or self.wb['Dashboard']['B3'].value or self.config.get('defaultCountry', 'india')
+        if daily:
+            periods = periods * projection_engine.DAYS_PER_MONTH
+        arrays = segment_library_arrays(self.segment_library_rows(), country)
+        result = projection_cache.project(arrays, self.base_params(), self.seasonality_multipliers(),
+                                         periods, daily=daily)
+        labels = projection_engine.period_labels(periods, self.start_date, daily=daily)
+        last_row = write_chart_series(ws, labels, {
+            'Revenue': result['revenue'],
+            'Volume': result['volume']
+        })
+        cats = Reference(ws, min_col=1, min_row=2, max_row=last_row)
         
         # Revenue Trend Chart
         chart1 = LineChart()
@@ -546,19 +676,10 @@ class AdvancedExcelModel:
         chart1.width = 15
         chart1.height = 8
         
-        # Data for first 12 months
-        data1 = Reference(ws, min_col=1, min_row=1, max_row=13, max_col=1)
-        cats1 = Reference(ws, min_col=1, min_row=2, max_row=13)
-        
-        # Add revenue data from Projections sheet
-        ws['A1'] = 'Revenue'
-        for i in range(12):
-            ws[f'A{i+2}'] = f'=Projections!E{i+2}'
-            ws[f'B{i+2}'] = f'=Projections!B{i+2}'
-        
+        data1 = Reference(ws, min_col=2, min_row=1, max_row=last_row, max_col=2)
         chart1.add_data(data1, titles_from_data=True)
-        chart1.set_categories(cats1)
-        ws.add_chart(chart1, "D1")
+        chart1.set_categories(cats)
+        ws.add_chart(chart1, "E1")
         
         # Volume Chart
         chart2 = BarChart()
@@ -569,24 +690,19 @@ class AdvancedExcelModel:
         chart2.width = 15
         chart2.height = 8
         
-        # Volume data
-        ws['A15'] = 'Volume'
-        for i in range(12):
-            ws[f'A{i+16}'] = f'=Projections!N{i+2}'
-            ws[f'B{i+16}'] = f'=Projections!B{i+2}'
-        
-        data2 = Reference(ws, min_col=1, min_row=15, max_row=27, max_col=1)
-        cats2 = Reference(ws, min_col=2, min_row=16, max_row=27)
-        
+        data2 = Reference(ws, min_col=3, min_row=1, max_row=last_row, max_col=3)
         chart2.add_data(data2, titles_from_data=True)
-        chart2.set_categories(cats2)
-        ws.add_chart(chart2, "D20")
+        chart2.set_categories(cats)
+        ws.add_chart(chart2, "E20")
 
     def save_enhanced_model(self, filename):
         """Save the enhanced model"""
         try:
-            filepath = f'/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/{filename}'
-            self.wb.save(filepath)
+            filepath = project_path(filename)
+            if self.partial:
+                self.partial.save(filepath)
+            else:
+                xlsx_parts.save_workbook(self.wb, filepath)
             print(f"Enhanced Excel model saved: {filepath}")
             return filepath
         except Exception as e:
@@ -619,7 +735,7 @@ def main():
     original_file = 'APAC_Revenue_Projections_Master_Model.xlsx'
     enhanced_file = 'APAC_Revenue_Projections_Enhanced_Model.xlsx'
     
-    model = AdvancedExcelModel(original_file)
+    model = AdvancedExcelModel(project_path(original_file))
     model.create_enhanced_model()
     filepath = model.save_enhanced_model(enhanced_file)
     
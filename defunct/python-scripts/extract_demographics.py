@@ -8,12 +8,28 @@ import json
 import os
 from pathlib import Path
 
+from project_paths import CONFIG_PATH, DEMOGRAPHICS_DIR
+
+# Sub-regional group of each country, written to index.json for the
+# region -> country -> sub-region -> APAC rollups
+SUBREGIONS = {
+    'india': 'South Asia',
+    'indonesia': 'Southeast Asia',
+    'philippines': 'Southeast Asia',
+    'singapore': 'Southeast Asia',
+    'thailand': 'Southeast Asia',
+    'japan': 'East Asia',
+    'south_korea': 'East Asia',
+    'australia': 'Oceania'
+}
+DEFAULT_SUBREGION = 'Other APAC'
+
 def extract_demographic_data():
     """Extract demographic data from model-config.json and create individual country files"""
     
     # Load the current model config
-    config_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/model-config.json'
-    demographics_dir = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/demographics'
+    config_path = CONFIG_PATH
+    demographics_dir = DEMOGRAPHICS_DIR
     
     # Ensure demographics directory exists
     os.makedirs(demographics_dir, exist_ok=True)
@@ -83,7 +99,7 @@ def extract_demographic_data():
 def create_demographics_index():
     """Create an index file listing all available demographic data files"""
     
-    demographics_dir = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/demographics'
+    demographics_dir = DEMOGRAPHICS_DIR
     index_file = os.path.join(demographics_dir, 'index.json')
     
     # Get list of demographic files
@@ -100,6 +116,7 @@ def create_demographics_index():
             demographic_files.append({
                 "countryKey": country_key,
                 "countryName": data['country']['name'],
+                "subRegion": SUBREGIONS.get(country_key, DEFAULT_SUBREGION),
                 "fileName": file,
                 "totalSegments": data['metadata']['totalSegments'],
                 "totalPopulation": data['summary']['totalPopulation'],
@@ -133,7 +150,7 @@ def create_demographics_index():
 def update_model_config():
     """Update model-config.json to reference external demographic files"""
     
-    config_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/model-config.json'
+    config_path = CONFIG_PATH
     
     with open(config_path, 'r') as f:
         config = json.load(f)
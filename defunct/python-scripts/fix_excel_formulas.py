@@ -2,16 +2,144 @@
 """
 Fix Excel Formula Errors - APAC Revenue Projections Model
 Corrects #VALUE! errors in projection calculations
+
+By default the fix is a zip-level patch: only the worksheet parts of the
+target sheets are rewritten (formula text inside <f> elements) and every
+other part - demographic sheets, charts, styles - is copied byte for byte.
+The old openpyxl rebuild of Dashboard and Projections is kept behind
+fix_excel_model(rebuild=True).
 """
 
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 import os
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+from project_paths import ENHANCED_MODEL_FILE, project_path
+import xlsx_parts
+
+# Sheets whose formulas are patched when none are named
+PATCH_SHEETS = ('Dashboard', 'Projections')
+
+FORMULA_PATTERN = re.compile(rb'(<f(?:\s[^>]*)?>)(.*?)(</f>)', re.DOTALL)
+CALC_PR_PATTERN = re.compile(rb'<calcPr\b[^>]*/>')
+CALC_PR_SUCCESSORS = (b'<oleSize', b'<customWorkbookViews', b'<pivotCaches', b'<smartTagPr', b'<smartTagTypes',
+                      b'<webPublishing', b'<fileRecoveryPr', b'<webPublishObjects', b'<extLst', b'</workbook>')
+STRING_LITERAL = re.compile(r'("[^"]*"|&quot;.*?&quot;)')
+CELL_REFERENCE = r'\$?[A-Z]{1,3}\$?[0-9]+(?::\$?[A-Z]{1,3}\$?[0-9]+)?'
+
+
+def sheet_reference_pattern(sheet_names):
+    """Regex for LibreOffice-style Sheet.A1 references to any of the given sheets"""
+    names = []
+    for name in sorted(sheet_names, key=len, reverse=True):
+        quoted = "'" + escape(name.replace("'", "''"), {"'": '&apos;'}) + "'"
+        names.append(re.escape(quoted))
+        if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+            names.append(re.escape(name))
+    return re.compile(r"(?<![\w.!'])(%s)\.(%s)(?![\w(])" % ('|'.join(names), CELL_REFERENCE))
+
+
+def fix_formula_text(formula, pattern):
+    """Replace Sheet.A1 with Sheet!A1 in one (XML-escaped) formula; returns (text, count)
+
+    String literals are left alone.
+    """
+    pieces = STRING_LITERAL.split(formula)
+    fixed = 0
+    for i in range(0, len(pieces), 2):
+        pieces[i], count = pattern.subn(r'\1!\2', pieces[i])
+        fixed += count
+    return ''.join(pieces), fixed
+
+
+def patch_sheet_xml(xml, pattern):
+    """Fix every formula in a worksheet part; returns (xml, fixed reference count)"""
+    fixed = 0
+
+    def patch(match):
+        nonlocal fixed
+        formula, count = fix_formula_text(match.group(2).decode('utf-8'), pattern)
+        fixed += count
+        return match.group(1) + formula.encode('utf-8') + match.group(3)
+
+    return FORMULA_PATTERN.sub(patch, xml), fixed
+
+
+def force_recalculation(workbook_xml):
+    """Ask Excel to recalculate on open so cached values of patched cells refresh"""
+    match = CALC_PR_PATTERN.search(workbook_xml)
+    if match is None:
+        # calcPr must precede these elements in the workbook schema
+        position = min(i for i in (workbook_xml.find(tag) for tag in CALC_PR_SUCCESSORS) if i >= 0)
+        return workbook_xml[:position] + b'<calcPr fullCalcOnLoad="1"/>' + workbook_xml[position:]
+    calc_pr = re.sub(rb'\s+fullCalcOnLoad="[^"]*"', b'', match.group(0))
+    calc_pr = calc_pr.replace(b'<calcPr', b'<calcPr fullCalcOnLoad="1"', 1)
+    return workbook_xml[:match.start()] + calc_pr + workbook_xml[match.end():]
 
-def fix_excel_model():
+
+def patch_workbook_formulas(file_path, sheets=PATCH_SHEETS, output_path=None):
+    """Patch formula references in the given sheets without loading the workbook
+
+    Returns {sheet: fixed reference count}; the file is only rewritten when
+    something was fixed.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        parts = xlsx_parts.sheet_parts(archive)
+        pattern = sheet_reference_pattern(parts)
+        patched, counts = {}, {}
+        for sheet in sheets or parts:
+            if sheet not in parts:
+                continue
+            xml, fixed = patch_sheet_xml(archive.read(parts[sheet]), pattern)
+            counts[sheet] = fixed
+            if fixed:
+                patched[parts[sheet]] = xml
+
+    if not patched:
+        return counts
+    patched['xl/workbook.xml'] = force_recalculation
+
+    output_path = output_path or file_path
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.xlsx')
+    os.close(fd)
+    try:
+        xlsx_parts.rewrite_parts(file_path, temp_path, patched)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return counts
+
+
+def fix_excel_model(rebuild=False):
     """Fix the Excel model formulas and references"""
-    file_path = '/Users/adambradley/Projects/Mastercard/ProductManager/financialprojections/APAC_Revenue_Projections_Enhanced_Model.xlsx'
+    file_path = project_path(ENHANCED_MODEL_FILE)
+
+    if not rebuild:
+        if not os.path.exists(file_path):
+            print("❌ Excel file not found")
+            return False
+        try:
+            counts = patch_workbook_formulas(file_path)
+        except Exception as e:
+            print(f"❌ Error patching Excel model: {str(e)}")
+            return False
+        for sheet, fixed in counts.items():
+            print(f"   {sheet}: {fixed} references fixed")
+        print(f"✅ Fixed Excel model formulas successfully!")
+        print(f"📄 File saved: {file_path}")
+        return True
+
+    return rebuild_excel_model(file_path)
+
+
+def rebuild_excel_model(file_path):
+    """Rebuild Dashboard and Projections with openpyxl (round-trips every sheet)"""
+    import openpyxl
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
     
     if not os.path.exists(file_path):
         print("❌ Excel file not found")
@@ -84,27 +212,27 @@ def fix_excel_model():
             ws_proj[f'B{row}'] = f'2025 {["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"][month-1 if month <= 12 else (month-1)%12]}'
             
             # Country
-            ws_proj[f'C{row}'] = '=Dashboard.B2'
+            ws_proj[f'C{row}'] = '=Dashboard!B2'
             
             # Revenue calculation - compound growth
             base_revenue = 1000000  # 1M base revenue for demonstration
-            growth_factor = f'(1+Dashboard.B5/100)'
-            ws_proj[f'D{row}'] = f'=Dashboard.B4+{base_revenue}*POWER({growth_factor},{month-1})'
+            growth_factor = f'(1+Dashboard!B5/100)'
+            ws_proj[f'D{row}'] = f'=Dashboard!B4+{base_revenue}*POWER({growth_factor},{month-1})'
             
             # Revenue USD
-            ws_proj[f'E{row}'] = f'=D{row}/Dashboard.B9'
+            ws_proj[f'E{row}'] = f'=D{row}/Dashboard!B9'
             
             # COGS Local
-            ws_proj[f'F{row}'] = f'=D{row}*Dashboard.B7/100'
+            ws_proj[f'F{row}'] = f'=D{row}*Dashboard!B7/100'
             
             # COGS USD  
-            ws_proj[f'G{row}'] = f'=F{row}/Dashboard.B9'
+            ws_proj[f'G{row}'] = f'=F{row}/Dashboard!B9'
             
             # Net Profit Local
-            ws_proj[f'H{row}'] = f'=D{row}-F{row}-Dashboard.B8'
+            ws_proj[f'H{row}'] = f'=D{row}-F{row}-Dashboard!B8'
             
             # Net Profit USD
-            ws_proj[f'I{row}'] = f'=H{row}/Dashboard.B9'
+            ws_proj[f'I{row}'] = f'=H{row}/Dashboard!B9'
             
             # Profit Margin
             ws_proj[f'J{row}'] = f'=IF(D{row}>0,H{row}/D{row}*100,0)'
@@ -127,7 +255,7 @@ def fix_excel_model():
                 ws.column_dimensions[column_letter].width = adjusted_width
         
         # Save the corrected workbook
-        wb.save(file_path)
+        xlsx_parts.save_workbook(wb, file_path)
         print(f"✅ Fixed Excel model formulas successfully!")
         print(f"📄 File saved: {file_path}")
         return True
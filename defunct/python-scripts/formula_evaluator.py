@@ -0,0 +1,1081 @@
+#!/usr/bin/env python3
+"""
+Headless Formula Evaluator - APAC Revenue Projections Model
+Computes every formula in a generated workbook without Excel, reports errors
+(#VALUE!, #NAME?, #REF!, ...) and evaluation time per sheet, and checks the
+Projections sheet against the Python projection engine. cli.py build and
+enhance run it on their output and fail on errors, mismatches or sheets
+slower than --max-sheet-seconds.
+
+Defined names, array formulas (evaluated once and spilled over their range)
+and the Excel 365 functions the dynamic formula mode writes (LET, LAMBDA,
+SEQUENCE, MMULT, TRANSPOSE) are supported.
+"""
+
+import math
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+import openpyxl
+from openpyxl.formula.tokenizer import Tokenizer, Token
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+
+import projection_engine as engine
+from create_excel_model import BASE_PARAMETERS
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+REFERENCE_PATTERN = re.compile(
+    r"^(?:(?P<sheet>'[^']+'|[A-Za-z0-9_]+)!)?"
+    r"(?P<start>\$?[A-Z]{1,3}\$?\d*|\$?\d+)"
+    r"(?::(?P<end>\$?[A-Z]{1,3}\$?\d*|\$?\d+))?$"
+)
+CELL_PATTERN = re.compile(r'^\$?([A-Z]{1,3})?\$?(\d+)?$')
+
+
+class ExcelError:
+    """An Excel error value such as #VALUE! carried through evaluation"""
+
+    def __init__(self, code, detail=''):
+        self.code = code
+        self.detail = detail
+
+    def __repr__(self):
+        return self.code
+
+    def __eq__(self, other):
+        return isinstance(other, ExcelError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+
+class FormulaError(Exception):
+    """Raised inside evaluation to abort a cell with an Excel error"""
+
+    def __init__(self, code, detail=''):
+        super().__init__(f'{code} {detail}'.strip())
+        self.error = ExcelError(code, detail)
+
+
+class Lambda:
+    """A LAMBDA value: parameter names, body node and the scopes it closes over"""
+
+    def __init__(self, params, body, scopes):
+        self.params = params
+        self.body = body
+        self.scopes = scopes
+
+
+class Range:
+    """A rectangular block of evaluated cell values"""
+
+    def __init__(self, values):
+        self.values = values  # 2D numpy object array
+
+    def scalar(self):
+        """Implicit intersection for single cells"""
+        if self.values.size == 1:
+            return self.values.flat[0]
+        raise FormulaError('#VALUE!', 'range used where a single value is expected')
+
+
+def to_serial(value):
+    """Convert a date/datetime into an Excel serial number"""
+    if isinstance(value, datetime):
+        delta = value - EXCEL_EPOCH
+    else:
+        delta = datetime(value.year, value.month, value.day) - EXCEL_EPOCH
+    return delta.days + delta.seconds / 86400
+
+
+def from_serial(serial):
+    """Convert an Excel serial number into a datetime"""
+    return EXCEL_EPOCH + timedelta(days=float(serial))
+
+
+# --- Scalar coercion -------------------------------------------------------
+
+def to_number(value):
+    if isinstance(value, ExcelError):
+        raise FormulaError(value.code)
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            raise FormulaError('#VALUE!', f'cannot convert {value!r} to a number')
+    raise FormulaError('#VALUE!', f'unsupported value {value!r}')
+
+
+def to_text(value):
+    if isinstance(value, ExcelError):
+        raise FormulaError(value.code)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def to_bool(value):
+    if isinstance(value, ExcelError):
+        raise FormulaError(value.code)
+    if isinstance(value, str):
+        if value.upper() in ('TRUE', 'FALSE'):
+            return value.upper() == 'TRUE'
+        raise FormulaError('#VALUE!', f'cannot convert {value!r} to a boolean')
+    return bool(to_number(value))
+
+
+def scalar_of(value):
+    if isinstance(value, np.ndarray) and value.size == 1:
+        return value.flat[0]
+    return value.scalar() if isinstance(value, Range) else value
+
+
+def as_array(value):
+    """Any evaluated value as a 2D object array"""
+    if isinstance(value, Range):
+        return value.values
+    if isinstance(value, np.ndarray):
+        return value if value.ndim == 2 else value.reshape(1, -1)
+    array = np.empty((1, 1), dtype=object)
+    array[0, 0] = value
+    return array
+
+
+def flatten(args):
+    """Flatten function arguments into a list of cell values"""
+    values = []
+    for arg in args:
+        if isinstance(arg, (Range, np.ndarray)):
+            values.extend(as_array(arg).ravel().tolist())
+        else:
+            values.append(arg)
+    return values
+
+
+def numbers_in(args):
+    """Numeric values for SUM/AVERAGE-style functions (text and blanks skipped)"""
+    numbers = []
+    for value in flatten(args):
+        if isinstance(value, ExcelError):
+            raise FormulaError(value.code)
+        if isinstance(value, bool) or value is None or isinstance(value, str):
+            continue
+        numbers.append(float(value))
+    return numbers
+
+
+# --- Elementwise operators -------------------------------------------------
+
+def compare_values(op, left, right):
+    for value in (left, right):
+        if isinstance(value, ExcelError):
+            return value
+    left = '' if left is None and isinstance(right, str) else left
+    right = '' if right is None and isinstance(left, str) else right
+    if isinstance(left, str) and isinstance(right, str):
+        left, right = left.lower(), right.lower()
+    elif isinstance(left, str) or isinstance(right, str):
+        # Excel orders all text after numbers
+        if op in ('=', '<>'):
+            return op == '<>'
+        left_rank = 1 if isinstance(left, str) else 0
+        right_rank = 1 if isinstance(right, str) else 0
+        left, right = left_rank, right_rank
+    else:
+        left, right = to_number(left), to_number(right)
+    return {
+        '=': left == right, '<>': left != right, '<': left < right,
+        '>': left > right, '<=': left <= right, '>=': left >= right
+    }[op]
+
+
+def binary_scalar(op, left, right):
+    try:
+        if op in ('=', '<>', '<', '>', '<=', '>='):
+            return compare_values(op, left, right)
+        if op == '&':
+            return to_text(left) + to_text(right)
+        a, b = to_number(left), to_number(right)
+        if op == '+':
+            return a + b
+        if op == '-':
+            return a - b
+        if op == '*':
+            return a * b
+        if op == '/':
+            if b == 0:
+                return ExcelError('#DIV/0!')
+            return a / b
+        if op == '^':
+            try:
+                result = math.pow(a, b)
+            except (ValueError, OverflowError):
+                return ExcelError('#NUM!')
+            return result
+    except FormulaError as e:
+        return e.error
+    return ExcelError('#VALUE!', f'unknown operator {op}')
+
+
+BINARY_UFUNC = {}
+
+
+def apply_binary(op, left, right):
+    """Apply an operator with Excel array broadcasting"""
+    if not isinstance(left, (Range, np.ndarray)) and not isinstance(right, (Range, np.ndarray)):
+        return binary_scalar(op, left, right)
+    if op not in BINARY_UFUNC:
+        BINARY_UFUNC[op] = np.frompyfunc(lambda a, b: binary_scalar(op, a, b), 2, 1)
+    left_array, right_array = as_array(left), as_array(right)
+    try:
+        return BINARY_UFUNC[op](left_array, right_array)
+    except ValueError:
+        raise FormulaError('#VALUE!', 'array sizes do not match')
+
+
+def elementwise(func, *args):
+    """Apply a scalar function over array arguments with Excel broadcasting"""
+    args = [as_array(a) if isinstance(a, (Range, np.ndarray)) else a for a in args]
+    if all(not isinstance(a, np.ndarray) or a.size == 1 for a in args):
+        return func(*(a.flat[0] if isinstance(a, np.ndarray) else a for a in args))
+    try:
+        return np.frompyfunc(func, len(args), 1)(*args)
+    except ValueError:
+        raise FormulaError('#VALUE!', 'array sizes do not match')
+
+
+def apply_unary(func, value):
+    if isinstance(value, (Range, np.ndarray)):
+        return np.frompyfunc(func, 1, 1)(as_array(value))
+    return func(value)
+
+
+# --- Parser ----------------------------------------------------------------
+
+class Parser:
+    """Recursive-descent parser over openpyxl's formula tokens"""
+
+    COMPARISON = ('=', '<>', '<', '>', '<=', '>=')
+
+    def __init__(self, formula):
+        tokens = Tokenizer(formula).items
+        self.tokens = [t for t in tokens if t.type != Token.WSPACE]
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def is_infix(self, *ops):
+        token = self.peek()
+        return token is not None and token.type == Token.OP_IN and token.value in ops
+
+    def parse(self):
+        node = self.expression()
+        if self.peek() is not None:
+            raise FormulaError('#VALUE!', f'unexpected token {self.peek().value!r}')
+        return node
+
+    def expression(self):
+        node = self.concat()
+        while self.is_infix(*self.COMPARISON):
+            op = self.take().value
+            node = ('binary', op, node, self.concat())
+        return node
+
+    def concat(self):
+        node = self.additive()
+        while self.is_infix('&'):
+            self.take()
+            node = ('binary', '&', node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.is_infix('+', '-'):
+            op = self.take().value
+            node = ('binary', op, node, self.multiplicative())
+        return node
+
+    def multiplicative(self):
+        node = self.power()
+        while self.is_infix('*', '/'):
+            op = self.take().value
+            node = ('binary', op, node, self.power())
+        return node
+
+    def power(self):
+        node = self.unary()
+        while self.is_infix('^'):
+            self.take()
+            node = ('binary', '^', node, self.unary())
+        return node
+
+    def unary(self):
+        token = self.peek()
+        if token is not None and token.type == Token.OP_PRE:
+            self.take()
+            operand = self.unary()
+            return ('negate', operand) if token.value == '-' else operand
+        node = self.primary()
+        while self.peek() is not None and self.peek().type == Token.OP_POST:
+            self.take()
+            node = ('percent', node)
+        return node
+
+    def primary(self):
+        token = self.take()
+        if token is None:
+            raise FormulaError('#VALUE!', 'unexpected end of formula')
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ('value', float(token.value))
+            if token.subtype == Token.TEXT:
+                return ('value', token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ('value', token.value.upper() == 'TRUE')
+            if token.subtype == Token.ERROR:
+                return ('value', ExcelError(token.value))
+            return ('ref', token.value)
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            name = token.value[:-1].upper()
+            if name.startswith('_XLFN.'):
+                name = name[len('_XLFN.'):]
+            args = []
+            if self.peek() is not None and self.peek().type == Token.FUNC and \
+                    self.peek().subtype == Token.CLOSE:
+                self.take()
+                return ('call', name, args)
+            while True:
+                token = self.peek()
+                if token is not None and token.type == Token.SEP:
+                    args.append(('value', None))
+                else:
+                    args.append(self.expression())
+                token = self.take()
+                if token is None:
+                    raise FormulaError('#VALUE!', f'unterminated call to {name}')
+                if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                    return ('call', name, args)
+                if token.type != Token.SEP:
+                    raise FormulaError('#VALUE!', f'unexpected token {token.value!r} in {name}')
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.expression()
+            closing = self.take()
+            if closing is None or closing.type != Token.PAREN:
+                raise FormulaError('#VALUE!', 'unbalanced parentheses')
+            return node
+        raise FormulaError('#VALUE!', f'unexpected token {token.value!r}')
+
+
+# --- Excel functions -------------------------------------------------------
+
+def text_pattern(text):
+    """Case-insensitive matcher for criteria text with * and ? wildcards"""
+    pattern = re.compile(''.join('.*' if ch == '*' else '.' if ch == '?' else re.escape(ch) for ch in text),
+                         re.IGNORECASE | re.DOTALL)
+    return lambda value: isinstance(value, str) and pattern.fullmatch(value) is not None
+
+
+def parse_criteria(criteria):
+    """Turn a COUNTIF/SUMIF criteria value into a predicate"""
+    if isinstance(criteria, str):
+        for op in ('<=', '>=', '<>', '<', '>', '='):
+            if criteria.startswith(op):
+                operand = criteria[len(op):]
+                try:
+                    operand = float(operand)
+                except ValueError:
+                    pass
+                if isinstance(operand, str) and op in ('=', '<>'):
+                    matches = text_pattern(operand)
+                    return matches if op == '=' else lambda value: not matches(value)
+                if op == '<>':
+                    return lambda value: compare_values(op, value, operand) is True
+                # Numeric criteria only ever match numeric cells and vice versa
+                numeric = isinstance(operand, float)
+                return lambda value: value is not None and \
+                    isinstance(value, str) != numeric and compare_values(op, value, operand) is True
+        return text_pattern(criteria)
+    return lambda value: value is not None and not isinstance(value, str) and \
+        compare_values('=', value, criteria) is True
+
+
+def excel_text(value, fmt):
+    """Subset of TEXT(): date formats built from y/m/d and simple number formats"""
+    if re.search(r'[ymd]', fmt, re.IGNORECASE):
+        dt = from_serial(to_number(value))
+        out = fmt
+        for pattern, replacement in (
+            ('yyyy', dt.strftime('%Y')), ('yy', dt.strftime('%y')),
+            ('mmmm', dt.strftime('%B')), ('mmm', dt.strftime('%b')),
+            ('dd', dt.strftime('%d')),
+        ):
+            out = re.sub(pattern, replacement, out, flags=re.IGNORECASE)
+        return out
+    number = to_number(value)
+    decimals = len(fmt.split('.')[1]) if '.' in fmt else 0
+    text = f'{number:,.{decimals}f}' if ',' in fmt else f'{number:.{decimals}f}'
+    return text + ('%' if fmt.endswith('%') else '')
+
+
+def excel_date(year, month, day):
+    year, month, day = int(to_number(year)), int(to_number(month)), int(to_number(day))
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return to_serial(date(year, month, 1) + timedelta(days=day - 1))
+
+
+def fn_sumproduct(args):
+    arrays = [as_array(a) for a in args]
+    shape = arrays[0].shape
+    if any(a.shape != shape for a in arrays):
+        raise FormulaError('#VALUE!', 'SUMPRODUCT arrays have different sizes')
+    total = np.ones(shape)
+    for array in arrays:
+        for value in array.ravel():
+            if isinstance(value, ExcelError):
+                raise FormulaError(value.code)
+        numeric = np.frompyfunc(
+            lambda v: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else 0.0, 1, 1
+        )(array).astype(float)
+        total = total * numeric
+    return float(total.sum())
+
+
+def fn_index(args):
+    if len(args) > 1 and isinstance(args[1], (Range, np.ndarray)) and as_array(args[1]).size > 1:
+        # An array of row numbers picks one value per element
+        pick = np.frompyfunc(lambda row: fn_index([args[0], row] + list(args[2:])), 1, 1)
+        return pick(as_array(args[1]))
+    array = as_array(args[0])
+    row = int(to_number(scalar_of(args[1]))) if len(args) > 1 else 1
+    col = int(to_number(scalar_of(args[2]))) if len(args) > 2 else 1
+    if array.shape[0] == 1 and len(args) == 2:
+        row, col = 1, row
+    if row < 0 or col < 0 or row > array.shape[0] or col > array.shape[1]:
+        raise FormulaError('#REF!', 'INDEX out of range')
+    if row == 0 or col == 0:
+        return Range(array[:, col - 1:col] if row == 0 else array[row - 1:row, :])
+    return array[row - 1, col - 1]
+
+
+def fn_match(args):
+    lookup = scalar_of(args[0])
+    values = as_array(args[1]).ravel().tolist()
+    match_type = int(to_number(scalar_of(args[2]))) if len(args) > 2 else 1
+    if match_type == 0:
+        for position, value in enumerate(values, 1):
+            if value is not None and compare_values('=', value, lookup):
+                return float(position)
+        raise FormulaError('#N/A', f'MATCH: {lookup!r} not found')
+    op = '<=' if match_type > 0 else '>='
+    found = None
+    for position, value in enumerate(values, 1):
+        if value is None or isinstance(value, str) != isinstance(lookup, str):
+            continue
+        if not compare_values(op, value, lookup):
+            break
+        found = position
+    if found is None:
+        raise FormulaError('#N/A', f'MATCH: {lookup!r} not found')
+    return float(found)
+
+
+def fn_vlookup(args):
+    lookup = scalar_of(args[0])
+    table = as_array(args[1])
+    col = int(to_number(scalar_of(args[2])))
+    exact = len(args) < 4 or not to_bool(scalar_of(args[3]))
+    if col < 1 or col > table.shape[1]:
+        raise FormulaError('#REF!', 'VLOOKUP column out of range')
+    if exact:
+        for row in table:
+            if row[0] is not None and compare_values('=', row[0], lookup) is True:
+                return row[col - 1]
+        raise FormulaError('#N/A', f'{lookup!r} not found')
+    match = None
+    for row in table:
+        if row[0] is not None and compare_values('<=', row[0], lookup) is True:
+            match = row
+    if match is None:
+        raise FormulaError('#N/A', f'{lookup!r} not found')
+    return match[col - 1]
+
+
+def fn_conditional(args, mode):
+    values = as_array(args[0]).ravel()
+    predicate = parse_criteria(scalar_of(args[1]))
+    targets = as_array(args[2]).ravel() if len(args) > 2 else values
+    if len(targets) != len(values):
+        targets = np.resize(targets, len(values))
+    selected = [
+        t for v, t in zip(values, targets)
+        if predicate(v)
+    ]
+    if mode == 'count':
+        return float(len(selected))
+    numbers = [float(t) for t in selected if isinstance(t, (int, float)) and not isinstance(t, bool)]
+    if mode == 'sum':
+        return float(sum(numbers))
+    if not numbers:
+        raise FormulaError('#DIV/0!', 'AVERAGEIF matched no numeric cells')
+    return float(sum(numbers) / len(numbers))
+
+
+def fn_conditional_multi(args, mode):
+    """SUMIFS(sum_range, range1, criteria1, ...) and COUNTIFS(range1, criteria1, ...)"""
+    targets = as_array(args[0]).ravel() if mode == 'sum' else None
+    pairs = args[1:] if mode == 'sum' else args
+    if not pairs or len(pairs) % 2:
+        raise FormulaError('#VALUE!', 'criteria ranges and criteria must come in pairs')
+    ranges = [as_array(r).ravel() for r in pairs[0::2]]
+    size = len(targets) if targets is not None else len(ranges[0])
+    if any(len(values) != size for values in ranges):
+        raise FormulaError('#VALUE!', 'criteria ranges have different sizes')
+    selected = np.ones(size, dtype=bool)
+    for values, criteria in zip(ranges, pairs[1::2]):
+        predicate = parse_criteria(scalar_of(criteria))
+        selected &= np.array([predicate(v) for v in values], dtype=bool)
+    if mode == 'count':
+        return float(selected.sum())
+    return float(sum(float(t) for t in targets[selected]
+                     if isinstance(t, (int, float)) and not isinstance(t, bool)))
+
+
+def fn_average(args):
+    numbers = numbers_in(args)
+    if not numbers:
+        raise FormulaError('#DIV/0!', 'AVERAGE of no numbers')
+    return sum(numbers) / len(numbers)
+
+
+def fn_mod(args):
+    def mod(number, divisor):
+        number, divisor = to_number(number), to_number(divisor)
+        if divisor == 0:
+            raise FormulaError('#DIV/0!', 'MOD by zero')
+        return number - divisor * math.floor(number / divisor)
+    return elementwise(mod, args[0], args[1])
+
+
+def fn_round(args):
+    """ROUND halves away from zero on the shortest decimal form, as Excel does"""
+    number = to_number(scalar_of(args[0]))
+    digits = int(to_number(scalar_of(args[1]))) if len(args) > 1 else 0
+    try:
+        return float(Decimal(repr(number)).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        return number
+
+
+def fn_sequence(args):
+    rows = int(to_number(scalar_of(args[0])))
+    cols = int(to_number(scalar_of(args[1]))) if len(args) > 1 and args[1] is not None else 1
+    start = to_number(scalar_of(args[2])) if len(args) > 2 and args[2] is not None else 1.0
+    step = to_number(scalar_of(args[3])) if len(args) > 3 and args[3] is not None else 1.0
+    if rows < 1 or cols < 1:
+        raise FormulaError('#CALC!', 'SEQUENCE needs at least one row and column')
+    values = start + step * np.arange(rows * cols, dtype=float).reshape(rows, cols)
+    return values.astype(object)
+
+
+def fn_mmult(args):
+    numeric = np.frompyfunc(to_number, 1, 1)
+    left, right = (numeric(as_array(a)).astype(float) for a in args[:2])
+    if left.shape[1] != right.shape[0]:
+        raise FormulaError('#VALUE!', 'MMULT arrays do not conform')
+    return (left @ right).astype(object)
+
+
+FUNCTIONS = {
+    'SUM': lambda args: float(sum(numbers_in(args))),
+    'SUMPRODUCT': fn_sumproduct,
+    'AVERAGE': fn_average,
+    'MIN': lambda args: min(numbers_in(args), default=0.0),
+    'MAX': lambda args: max(numbers_in(args), default=0.0),
+    'COUNT': lambda args: float(len(numbers_in(args))),
+    'COUNTA': lambda args: float(sum(1 for v in flatten(args) if v is not None and v != '')),
+    'COUNTIF': lambda args: fn_conditional(args, 'count'),
+    'SUMIF': lambda args: fn_conditional(args, 'sum'),
+    'AVERAGEIF': lambda args: fn_conditional(args, 'average'),
+    'COUNTIFS': lambda args: fn_conditional_multi(args, 'count'),
+    'SUMIFS': lambda args: fn_conditional_multi(args, 'sum'),
+    'POWER': lambda args: apply_binary('^', args[0], args[1]),
+    'MOD': fn_mod,
+    'ABS': lambda args: apply_unary(lambda v: abs(to_number(v)), args[0]),
+    'ROUND': fn_round,
+    'INDEX': fn_index,
+    'MATCH': fn_match,
+    'VLOOKUP': fn_vlookup,
+    'AND': lambda args: all(to_bool(v) for v in flatten(args) if v is not None),
+    'OR': lambda args: any(to_bool(v) for v in flatten(args) if v is not None),
+    'NOT': lambda args: not to_bool(scalar_of(args[0])),
+    'TODAY': lambda args: float(to_serial(date.today())),
+    'DATE': lambda args: excel_date(*(scalar_of(a) for a in args)),
+    'YEAR': lambda args: float(from_serial(to_number(scalar_of(args[0]))).year),
+    'MONTH': lambda args: float(from_serial(to_number(scalar_of(args[0]))).month),
+    'DAY': lambda args: float(from_serial(to_number(scalar_of(args[0]))).day),
+    'TEXT': lambda args: elementwise(lambda v, fmt: excel_text(v, to_text(fmt)), args[0], args[1]),
+    'SEQUENCE': fn_sequence,
+    'MMULT': fn_mmult,
+    'TRANSPOSE': lambda args: as_array(args[0]).T,
+}
+
+
+# --- Workbook evaluation ---------------------------------------------------
+
+class WorkbookEvaluator:
+    """Evaluates every formula of an openpyxl workbook loaded with formulas"""
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.cache = {}
+        self.in_progress = set()
+        self.parsed = {}
+        self.scopes = []  # LET/LAMBDA variables, innermost last
+        self.names = {name.upper(): defined.attr_text for name, defined in wb.defined_names.items()}
+        self.bounds = {ws.title: (ws.max_row, ws.max_column) for ws in wb.worksheets}
+        self.raw = {}
+        self.spills = {}  # cell -> anchor of the array formula covering it
+        for ws in wb.worksheets:
+            cells = {}
+            for row in ws.iter_rows():
+                for cell in row:
+                    if cell.value is not None:
+                        cells[(cell.row, cell.column)] = cell.value
+            self.raw[ws.title] = cells
+            for (row, col), raw in cells.items():
+                if hasattr(raw, 'text'):
+                    for key in self.array_cells(ws.title, raw):
+                        self.spills.setdefault(key, (ws.title, row, col))
+
+    @staticmethod
+    def array_cells(sheet, formula):
+        min_col, min_row, max_col, max_row = range_boundaries(formula.ref)
+        return [(sheet, r, c) for r in range(min_row, max_row + 1) for c in range(min_col, max_col + 1)]
+
+    def cell_value(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key in self.cache:
+            return self.cache[key]
+        raw = self.raw.get(sheet, {}).get((row, col))
+        anchor = self.spills.get(key)
+        if anchor is not None and anchor != key:
+            self.cell_value(*anchor)
+            return self.cache.get(key)
+        if (isinstance(raw, str) and raw.startswith('=')) or hasattr(raw, 'text'):
+            if key in self.in_progress:
+                return ExcelError('#REF!', 'circular reference')
+            self.in_progress.add(key)
+            try:
+                if hasattr(raw, 'text'):  # ArrayFormula
+                    return self.evaluate_array(raw, sheet)
+                value = self.evaluate_formula(raw, sheet)
+            finally:
+                self.in_progress.discard(key)
+        elif isinstance(raw, (datetime, date)):
+            value = float(to_serial(raw))
+        elif isinstance(raw, int) and not isinstance(raw, bool):
+            value = float(raw)
+        else:
+            value = raw
+        self.cache[key] = value
+        return value
+
+    def parse(self, formula):
+        if formula not in self.parsed:
+            self.parsed[formula] = Parser(formula).parse()
+        return self.parsed[formula]
+
+    def evaluate_formula(self, formula, sheet):
+        try:
+            value = self.evaluate(self.parse(formula), sheet)
+            if isinstance(value, (Range, np.ndarray)):
+                value = as_array(value)[0, 0]
+            return value
+        except FormulaError as e:
+            return e.error
+        except RecursionError:
+            return ExcelError('#REF!', 'reference chain too deep')
+
+    def evaluate_array(self, formula, sheet):
+        """Evaluate an array formula once and spill it over its range
+
+        Single rows or columns broadcast across the range as in Excel; cells
+        beyond the result's size get #N/A. Returns the anchor's value.
+        """
+        try:
+            values = as_array(self.evaluate(self.parse(formula.text), sheet))
+        except FormulaError as e:
+            values = as_array(e.error)
+        except RecursionError:
+            values = as_array(ExcelError('#REF!', 'reference chain too deep'))
+        min_col, min_row, _, _ = range_boundaries(formula.ref)
+        for key in self.array_cells(sheet, formula):
+            r = 0 if values.shape[0] == 1 else key[1] - min_row
+            c = 0 if values.shape[1] == 1 else key[2] - min_col
+            inside = r < values.shape[0] and c < values.shape[1]
+            self.cache[key] = values[r, c] if inside else ExcelError('#N/A', 'outside the array result')
+        return self.cache[(sheet, min_row, min_col)]
+
+    def resolve(self, reference, sheet):
+        match = REFERENCE_PATTERN.match(reference)
+        if not match:
+            raise FormulaError('#NAME?', f'unrecognised reference {reference!r}')
+        target = match.group('sheet') or sheet
+        target = target.strip("'")
+        if target not in self.raw:
+            raise FormulaError('#REF!', f'unknown sheet {target!r}')
+        max_row, max_col = self.bounds[target]
+
+        def split(part, is_end):
+            col_text, row_text = CELL_PATTERN.match(part).groups()
+            col = column_index_from_string(col_text) if col_text else (max_col if is_end else 1)
+            row = int(row_text) if row_text else (max_row if is_end else 1)
+            return row, col
+
+        start = match.group('start')
+        end = match.group('end') or start
+        (r1, c1), (r2, c2) = split(start, False), split(end, True)
+        if match.group('end') is None and CELL_PATTERN.match(start).groups()[1] is None:
+            raise FormulaError('#NAME?', f'unrecognised reference {reference!r}')
+        r1, r2 = sorted((r1, r2))
+        c1, c2 = sorted((c1, c2))
+        r2, c2 = max(r1, min(r2, max_row)), max(c1, min(c2, max_col))
+        values = np.empty((r2 - r1 + 1, c2 - c1 + 1), dtype=object)
+        for r in range(r1, r2 + 1):
+            for c in range(c1, c2 + 1):
+                values[r - r1, c - c1] = self.cell_value(target, r, c)
+        return Range(values)
+
+    def variable(self, name):
+        """Innermost LET/LAMBDA binding of name (with or without _xlpm.), else None"""
+        name = name.upper()
+        if name.startswith('_XLPM.'):
+            name = name[len('_XLPM.'):]
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def reference(self, text, sheet):
+        """A LET/LAMBDA variable, a defined name or a cell/range reference"""
+        value = self.variable(text)
+        if value is not None:
+            return value
+        if text.upper() in self.names:
+            return self.resolve(self.names[text.upper()], sheet)
+        return self.resolve(text, sheet)
+
+    def evaluate(self, node, sheet):
+        kind = node[0]
+        if kind == 'value':
+            return node[1]
+        if kind == 'ref':
+            return self.reference(node[1], sheet)
+        if kind == 'negate':
+            return apply_unary(lambda v: binary_scalar('-', 0.0, v), self.operand(node[1], sheet))
+        if kind == 'percent':
+            return apply_unary(lambda v: binary_scalar('/', v, 100.0), self.operand(node[1], sheet))
+        if kind == 'binary':
+            left = self.operand(node[2], sheet)
+            right = self.operand(node[3], sheet)
+            return apply_binary(node[1], left, right)
+        if kind == 'call':
+            return self.call(node[1], node[2], sheet)
+        raise FormulaError('#VALUE!', f'unknown node {kind}')
+
+    def operand(self, node, sheet):
+        """Evaluate an operator operand; single-cell ranges collapse to scalars"""
+        value = self.evaluate(node, sheet)
+        if isinstance(value, Range):
+            return value.values[0, 0] if value.values.size == 1 else value.values
+        if isinstance(value, ExcelError):
+            raise FormulaError(value.code, value.detail)
+        if isinstance(value, Lambda):
+            raise FormulaError('#CALC!', 'LAMBDA used as a value')
+        return value
+
+    @staticmethod
+    def parameter(node):
+        """Variable name of a LET/LAMBDA parameter node"""
+        if node[0] != 'ref':
+            raise FormulaError('#NAME?', 'LET/LAMBDA parameter is not a name')
+        name = node[1].upper()
+        return name[len('_XLPM.'):] if name.startswith('_XLPM.') else name
+
+    def call(self, name, arg_nodes, sheet):
+        if name == 'IF':
+            condition = self.evaluate(arg_nodes[0], sheet)
+            if isinstance(condition, (Range, np.ndarray)) and as_array(condition).size > 1:
+                branches = [self.operand(n, sheet) for n in arg_nodes[1:3]]
+                while len(branches) < 2:
+                    branches.append(False)
+                pick = np.frompyfunc(lambda c, a, b: a if to_bool(c) else b, 3, 1)
+                return pick(as_array(condition), as_array(branches[0]), as_array(branches[1]))
+            if to_bool(scalar_of(condition)):
+                return self.evaluate(arg_nodes[1], sheet) if len(arg_nodes) > 1 else True
+            return self.evaluate(arg_nodes[2], sheet) if len(arg_nodes) > 2 else False
+        if name == 'IFERROR':
+            try:
+                value = self.evaluate(arg_nodes[0], sheet)
+            except FormulaError:
+                return self.evaluate(arg_nodes[1], sheet)
+            if isinstance(value, Range) and value.values.size == 1:
+                value = value.values[0, 0]
+            return self.evaluate(arg_nodes[1], sheet) if isinstance(value, ExcelError) else value
+        if name == 'LET':
+            if len(arg_nodes) < 3 or len(arg_nodes) % 2 == 0:
+                raise FormulaError('#VALUE!', 'LET needs name/value pairs and a calculation')
+            scope = {}
+            self.scopes.append(scope)
+            try:
+                for name_node, value_node in zip(arg_nodes[:-1:2], arg_nodes[1:-1:2]):
+                    scope[self.parameter(name_node)] = self.evaluate(value_node, sheet)
+                return self.evaluate(arg_nodes[-1], sheet)
+            finally:
+                self.scopes.pop()
+        if name == 'LAMBDA':
+            return Lambda([self.parameter(n) for n in arg_nodes[:-1]], arg_nodes[-1], list(self.scopes))
+        function = self.variable(name)
+        if isinstance(function, Lambda):
+            if len(arg_nodes) != len(function.params):
+                raise FormulaError('#VALUE!', f'{name} expects {len(function.params)} arguments')
+            args = dict(zip(function.params, (self.evaluate(n, sheet) for n in arg_nodes)))
+            outer, self.scopes = self.scopes, function.scopes + [args]
+            try:
+                return self.evaluate(function.body, sheet)
+            finally:
+                self.scopes = outer
+        if name not in FUNCTIONS:
+            raise FormulaError('#NAME?', f'unsupported function {name}')
+        args = [self.evaluate(n, sheet) for n in arg_nodes]
+        for arg in args:
+            if isinstance(arg, ExcelError):
+                raise FormulaError(arg.code, arg.detail)
+        return FUNCTIONS[name](args)
+
+    def evaluate_all(self):
+        """Evaluate every formula cell; returns per-sheet reports
+
+        An array formula counts once and reports the first error in its range.
+        """
+        reports = {}
+        for ws in self.wb.worksheets:
+            started = time.perf_counter()
+            formulas = 0
+            errors = []
+            for (row, col), raw in sorted(self.raw[ws.title].items()):
+                if not (isinstance(raw, str) and raw.startswith('=')) and not hasattr(raw, 'text'):
+                    continue
+                formulas += 1
+                cell, value = (row, col), self.cell_value(ws.title, row, col)
+                if hasattr(raw, 'text'):
+                    for key in self.array_cells(ws.title, raw):
+                        if isinstance(self.cache.get(key), ExcelError):
+                            cell, value = key[1:], self.cache[key]
+                            break
+                if isinstance(value, ExcelError):
+                    errors.append({
+                        'cell': f'{get_column_letter(cell[1])}{cell[0]}',
+                        'error': value.code,
+                        'detail': value.detail,
+                        'formula': raw if isinstance(raw, str) else raw.text
+                    })
+            reports[ws.title] = {
+                'formulas': formulas,
+                'errors': errors,
+                'seconds': time.perf_counter() - started
+            }
+        return reports
+
+
+SEGMENT_FIELDS = {
+    'PricePerTransaction': 'price',
+    'CostPerTransaction': 'cost',
+    'MonthlyVolume': 'volume',
+    'VolumeGrowth': 'volumeGrowth'
+}
+
+PROJECTION_COLUMNS = {
+    'Revenue_Local': 'revenue',
+    'COGS_Local': 'cogs',
+    'OpEx_Local': 'operatingExpenses',
+    'NetProfit_Local': 'netProfit',
+    'TransactionVolume': 'volume'
+}
+
+
+def sheet_table(evaluator, sheet):
+    """{header: column} of row 1 and the data rows below it, including spilled rows"""
+    cells = evaluator.raw.get(sheet, {})
+    headers = {cells[(1, col)]: col for (row, col) in cells if row == 1}
+    rows = {row for (row, col) in cells if row > 1}
+    rows.update(row for (name, row, col) in evaluator.spills if name == sheet and row > 1)
+    return headers, sorted(rows)
+
+
+def workbook_inputs(evaluator, country):
+    """(segment arrays, base params, seasonality multipliers) as the workbook states them
+
+    Segments are the country's SegmentLibrary rows, base params the
+    Parameters sheet values behind their defined names and seasonality the
+    Seasonality name, so the engine runs on exactly what the formulas read.
+    """
+    headers, rows = sheet_table(evaluator, 'SegmentLibrary')
+    segments = []
+    if 'Country' in headers:
+        for row in rows:
+            if evaluator.cell_value('SegmentLibrary', row, headers['Country']) != country:
+                continue
+            segments.append({
+                field: evaluator.cell_value('SegmentLibrary', row, headers[header])
+                for header, field in SEGMENT_FIELDS.items() if header in headers
+            })
+
+    params = dict(engine.DEFAULT_BASE_PARAMS)
+    for key, _, name in BASE_PARAMETERS:
+        if name.upper() in evaluator.names:
+            value = scalar_of(evaluator.resolve(evaluator.names[name.upper()], 'Parameters'))
+            if value is not None and not isinstance(value, ExcelError):
+                params[key] = value
+
+    multipliers = np.ones(12)
+    if 'SEASONALITY' in evaluator.names:
+        values = evaluator.resolve(evaluator.names['SEASONALITY'], 'Parameters').values.ravel()
+        multipliers = np.array([to_number(v) for v in values], dtype=float)
+    return engine.segment_arrays(segments), params, multipliers
+
+
+def compare_with_engine(evaluator, config, country=None, tolerance=1e-6):
+    """Compare evaluated Projections columns against the projection engine
+
+    The engine is fed the segments, parameters and seasonality parsed from
+    the workbook itself (workbook_inputs()); config only supplies the
+    country when the Dashboard has none. Returns one entry per recognised
+    column with the number of rows outside the relative tolerance and the
+    worst relative difference.
+    """
+    if 'Projections' not in evaluator.raw:
+        return []
+    headers, rows = sheet_table(evaluator, 'Projections')
+    month_column = 1
+    month_rows = [row for row in rows
+                  if isinstance(evaluator.cell_value('Projections', row, month_column), float)]
+    if not month_rows:
+        return []
+
+    if country is None and 'Dashboard' in evaluator.raw:
+        country = evaluator.cell_value('Dashboard', 3, 2)
+    if not isinstance(country, str):
+        country = config.get('defaultCountry', 'india')
+    arrays, params, multipliers = workbook_inputs(evaluator, country)
+    result = engine.project(arrays, params, multipliers, len(month_rows))
+
+    comparisons = []
+    for header, key in PROJECTION_COLUMNS.items():
+        if header not in headers:
+            continue
+        expected = result[key]
+        mismatches = 0
+        errors = 0
+        worst = 0.0
+        for i, row in enumerate(month_rows):
+            actual = evaluator.cell_value('Projections', row, headers[header])
+            if isinstance(actual, ExcelError) or isinstance(actual, str) or actual is None:
+                errors += 1
+                continue
+            difference = abs(float(actual) - expected[i]) / max(abs(expected[i]), 1.0)
+            worst = max(worst, difference)
+            if difference > tolerance:
+                mismatches += 1
+        comparisons.append({
+            'column': header,
+            'rows': len(month_rows),
+            'errors': errors,
+            'mismatches': mismatches,
+            'maxRelativeDifference': worst
+        })
+    return comparisons
+
+
+def verify_workbook(file_path, config=None, tolerance=1e-6, max_sheet_seconds=None):
+    """Evaluate a generated workbook and return (passed, sheet_reports, comparisons)"""
+    config = config or engine.load_model_config()
+    wb = openpyxl.load_workbook(file_path)
+    evaluator = WorkbookEvaluator(wb)
+    reports = evaluator.evaluate_all()
+    comparisons = compare_with_engine(evaluator, config, tolerance=tolerance)
+
+    passed = all(not r['errors'] for r in reports.values())
+    passed = passed and all(not c['errors'] and not c['mismatches'] for c in comparisons)
+    if max_sheet_seconds is not None:
+        passed = passed and all(r['seconds'] <= max_sheet_seconds for r in reports.values())
+    return passed, reports, comparisons
+
+
+def print_report(reports, comparisons, max_errors=5, max_sheet_seconds=None):
+    """Print the per-sheet evaluation summary"""
+    for sheet, report in reports.items():
+        slow = max_sheet_seconds is not None and report['seconds'] > max_sheet_seconds
+        status = '✅' if not report['errors'] and not slow else '❌'
+        print(f"{status} {sheet}: {report['formulas']} formulas, {len(report['errors'])} errors, "
+              f"{report['seconds'] * 1000:.1f} ms" + (f" (limit {max_sheet_seconds:g} s)" if slow else ''))
+        for error in report['errors'][:max_errors]:
+            print(f"     {error['cell']}: {error['error']} {error['detail']} <- {error['formula'][:80]}")
+        if len(report['errors']) > max_errors:
+            print(f"     ... {len(report['errors']) - max_errors} more")
+    for comparison in comparisons:
+        status = '✅' if not comparison['errors'] and not comparison['mismatches'] else '❌'
+        print(f"{status} Projections.{comparison['column']} vs engine: "
+              f"{comparison['mismatches']} mismatches, {comparison['errors']} errors, "
+              f"max rel diff {comparison['maxRelativeDifference']:.2e}")
+
+
+def verify_files(paths, max_sheet_seconds=None):
+    """Verify and report each workbook; True only if every one passed"""
+    all_passed = True
+    for path in paths:
+        print(f"\n📄 Verifying {path}")
+        passed, reports, comparisons = verify_workbook(path, max_sheet_seconds=max_sheet_seconds)
+        print_report(reports, comparisons, max_sheet_seconds=max_sheet_seconds)
+        all_passed = all_passed and passed
+    if not all_passed:
+        print("❌ Workbook verification failed")
+    return all_passed
+
+
+def main(argv=None):
+    """[WORKBOOK.xlsx ...] [--max-sheet-seconds N]"""
+    args = list(sys.argv[1:] if argv is None else argv)
+    max_sheet_seconds = None
+    if '--max-sheet-seconds' in args:
+        i = args.index('--max-sheet-seconds')
+        max_sheet_seconds = float(args[i + 1])
+        del args[i:i + 2]
+    paths = args or [f'{engine.PROJECT_DIR}/APAC_Revenue_Projections_Enhanced_Model.xlsx']
+    return verify_files(paths, max_sheet_seconds)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
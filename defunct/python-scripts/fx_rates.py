@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+FX rate paths - APAC Revenue Projections Model
+Loads monthly local-currency-per-USD rate paths from local CSV/JSON files
+and aligns them to the projection calendar as (countries, months) arrays,
+so whole (country x month) result blocks convert to USD in one broadcast.
+
+Accepted files (in FX_DIR or passed explicitly):
+  CSV  - columns currency, month (YYYY-MM), rate
+  JSON - {"INR": {"2025-01": 83.2, ...}, ...} or {"rates": {...}}
+Months without a quote take the nearest earlier quote (the first quote
+before the path starts); currencies without a path use the scalar
+exchangeRate from model-config.json.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+import projection_engine as engine
+
+FX_DIR = os.path.join(engine.PROJECT_DIR, 'fx')
+FX_FILES = ('fx_rates.json', 'fx_rates.csv')
+
+# Annual drift (%) of the local-per-USD rate by currency ('*' = all); a
+# positive drift is a strengthening dollar
+DEFAULT_FX_SCENARIOS = {
+    'base': {},
+    'usdStrong': {'*': 5.0},
+    'usdWeak': {'*': -5.0}
+}
+
+_table_cache = {}
+_path_cache = {}
+
+
+def month_key(value):
+    """Normalize '2025-01', '2025-01-15' or a date to 'YYYY-MM'"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m')
+    return str(value).strip()[:7]
+
+
+def read_rate_file(path):
+    """{currency: {month: rate}} from one CSV or JSON file"""
+    table = {}
+    if path.endswith('.csv'):
+        with open(path, 'r', newline='') as f:
+            for record in csv.DictReader(f):
+                currency = record['currency'].strip().upper()
+                table.setdefault(currency, {})[month_key(record['month'])] = float(record['rate'])
+    else:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for currency, series in data.get('rates', data).items():
+            table[currency.upper()] = {month_key(month): float(rate) for month, rate in series.items()}
+    return table
+
+
+def load_rate_table(paths=None):
+    """Merged rate table from the given files (default: FX_DIR/fx_rates.*)
+
+    Parsed files are cached by path and modification time.
+    """
+    if paths is None:
+        paths = [os.path.join(FX_DIR, name) for name in FX_FILES]
+    elif isinstance(paths, str):
+        paths = [paths]
+
+    table = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        key = (path, os.path.getmtime(path))
+        if key not in _table_cache:
+            _table_cache[key] = read_rate_file(path)
+        for currency, series in _table_cache[key].items():
+            table.setdefault(currency, {}).update(series)
+    return table
+
+
+def align_path(series, months, fallback):
+    """Rates for each month key, carried forward/backward from the nearest quote"""
+    if not series:
+        return np.full(len(months), float(fallback))
+    quoted = sorted(series)
+    values = np.array([series[m] for m in quoted], dtype=float)
+    position = np.searchsorted(quoted, months, side='right') - 1
+    return values[np.clip(position, 0, len(quoted) - 1)]
+
+
+def currencies_for(config, countries):
+    """Currency code of each country (the country key if none is configured)"""
+    country_config = config.get('countries', {})
+    return [country_config.get(code, {}).get('currency', code).upper() for code in countries]
+
+
+def rate_paths(config, countries, start_date=None, periods=120, table=None):
+    """Aligned local-per-USD rates, shape (countries, periods)
+
+    Results are cached per (countries, start month, periods, table contents).
+    """
+    table = load_rate_table() if table is None else table
+    calendar = engine.period_calendar(periods, engine.month_start(start_date))
+    months = [month_key(period['periodStart']) for period in calendar]
+    country_config = config.get('countries', {})
+    currencies = currencies_for(config, countries)
+    fallbacks = [country_config.get(code, {}).get('exchangeRate', 1) or 1 for code in countries]
+
+    key = (tuple(countries), months[0] if months else None, periods,
+           json.dumps({c: table.get(c) for c in currencies}, sort_keys=True), tuple(fallbacks))
+    if key not in _path_cache:
+        _path_cache[key] = np.array([
+            align_path(table.get(currency), months, fallback)
+            for currency, fallback in zip(currencies, fallbacks)
+        ]).reshape(len(countries), periods)
+        _path_cache[key].setflags(write=False)
+    return _path_cache[key]
+
+
+def fx_scenarios(config):
+    """{name: drift definition}, the defaults plus config['fxScenarios']"""
+    scenarios = dict(DEFAULT_FX_SCENARIOS)
+    scenarios.update(config.get('fxScenarios', {}))
+    return scenarios
+
+
+def get_fx_scenario(config, name):
+    """Drift definition for an FX scenario name (ValueError if unknown)"""
+    scenarios = fx_scenarios(config)
+    if name not in scenarios:
+        raise ValueError(f"Unknown FX scenario: {name} (expected one of {', '.join(sorted(scenarios))})")
+    return scenarios[name]
+
+
+def apply_fx_scenario(rates, currencies, scenario):
+    """Compound each currency's annual drift (%) month by month onto rates (..., C, T)"""
+    drift = np.array([scenario.get(currency, scenario.get('*', 0.0)) for currency in currencies], dtype=float)
+    t = np.arange(rates.shape[-1])
+    return rates * np.power(1 + drift[:, None] / 100, t / 12)
+
+
+def fx_rate_rows(config, countries, start_date=None, periods=120, table=None, scenario=None):
+    """Header plus one row per projection month for the FXRates sheet"""
+    rates = rate_paths(config, countries, start_date, periods, table)
+    if scenario:
+        rates = apply_fx_scenario(rates, currencies_for(config, countries), scenario)
+    calendar = engine.period_calendar(periods, engine.month_start(start_date))
+    headers = ['PeriodStart'] + list(countries)
+    rows = [[period['periodStart']] + rates[:, i].tolist() for i, period in enumerate(calendar)]
+    return [headers] + rows
+
+
+def fx_rate_reference(row, country_ref, countries):
+    """Formula fragment looking up the rate for country_ref in FXRates row `row`"""
+    last = get_column_letter(len(countries) + 1)
+    return f'INDEX(FXRates!$B{row}:${last}{row},MATCH({country_ref},FXRates!$B$1:${last}$1,0))'
+
+
+def create_fx_rates_sheet(wb, rows, index=None):
+    """Write FXRates (row r = projection month r - 1) from fx_rate_rows()"""
+    if 'FXRates' in wb.sheetnames:
+        wb.remove(wb['FXRates'])
+    ws = wb.create_sheet('FXRates', index)
+
+    for row, values in enumerate(rows, 1):
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=row, column=col, value=value)
+            if row == 1:
+                cell.font = Font(bold=True, color='FFFFFF')
+                cell.fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+            elif col == 1:
+                cell.number_format = 'yyyy-mm-dd'
+            else:
+                cell.number_format = '#,##0.0000'
+
+    ws.column_dimensions['A'].width = 14
+    return ws
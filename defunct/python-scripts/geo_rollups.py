@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Geographic hierarchy rollups - APAC Revenue Projections Model
+Arranges the demographic regions of every country under their country,
+sub-regional group (subRegion in demographics/index.json) and APAC, in an
+order that makes every subtree a contiguous block of leaves. Population and
+revenue potential get prefix sums over the leaves; projected volume and
+revenue get a summed-area table over leaves x months. Any subtree x month
+range total is then four lookups, so summary sheets at every level come out
+of one table and always add up. Revenue is converted to USD with the
+monthly FX paths so it can be summed across countries.
+"""
+
+import json
+import os
+
+import numpy as np
+from openpyxl.styles import Alignment, Font, PatternFill
+
+import demographic_volumes
+import fx_rates
+import projection_engine as engine
+from extract_demographics import DEFAULT_SUBREGION, SUBREGIONS
+from segment_query import SegmentIndex
+
+LEVELS = ('apac', 'subregion', 'country', 'region')
+STATIC_MEASURES = ('population', 'revenuePotential')
+TIME_MEASURES = ('volume', 'revenue')
+
+ROLLUP_HEADERS = ['Level', 'Name', 'Parent', 'Regions', 'Population (M)', 'Revenue Potential (Monthly)',
+                  'Volume (Month 1)', 'Revenue USD (Month 1)', 'Volume (Year 1)', 'Revenue USD (Year 1)',
+                  'Revenue USD (Horizon)']
+
+
+def load_subregions(demographics_dir=demographic_volumes.DEMOGRAPHICS_DIR):
+    """{country: sub-regional group} from demographics/index.json"""
+    try:
+        with open(os.path.join(demographics_dir, 'index.json'), 'r') as f:
+            index_data = json.load(f)
+    except FileNotFoundError:
+        index_data = {}
+    groups = dict(SUBREGIONS)
+    for country_info in index_data.get('countries', []):
+        if country_info.get('subRegion'):
+            groups[country_info['countryKey']] = country_info['subRegion']
+    return groups
+
+
+def prefix_sums(values):
+    """Cumulative sums along every axis with a leading zero on each"""
+    table = np.zeros(tuple(n + 1 for n in values.shape))
+    table[tuple(slice(1, None) for _ in values.shape)] = values
+    for axis in range(values.ndim):
+        np.cumsum(table, axis=axis, out=table)
+    return table
+
+
+class GeoHierarchy:
+    """Region -> country -> sub-region -> APAC tree with prefix-summed measures"""
+
+    def __init__(self, config, regional_data, subregions=None, periods=24, start_date=None):
+        start_date = engine.month_start(start_date)
+        synthesis = demographic_volumes.synthesize(config, regional_data)
+        projection = demographic_volumes.project_regions(config, synthesis, periods)
+        rates = fx_rates.rate_paths(config, synthesis['countries'], start_date, periods)
+        mask = synthesis['mask']
+        countries = synthesis['countries']
+        subregions = subregions or load_subregions()
+
+        # Static per-region measures, in the synthesis' flattened region order
+        index = SegmentIndex({code: regional_data[code] for code in countries})
+        flat = {
+            'population': index.fields['population'],
+            'revenuePotential': index.revenue,
+            'volume': projection['volume'].sum(axis=2)[mask],
+            'revenue': (projection['revenue'].sum(axis=2) / rates[:, None, :])[mask]
+        }
+        offsets = np.concatenate([[0], np.cumsum(mask.sum(axis=1))])
+
+        # Depth-first layout: each subtree owns leaves [start, stop)
+        groups = {}
+        for code in countries:
+            groups.setdefault(subregions.get(code, DEFAULT_SUBREGION), []).append(code)
+        self.nodes = []
+        self.periods = periods
+        self.start_date = start_date
+        order = []
+        apac = self.add_node('APAC', 'APAC', 'apac', None, 0)
+        for group in sorted(groups):
+            group_node = self.add_node(group, group, 'subregion', apac, len(order))
+            for code in sorted(groups[group], key=lambda c: config['countries'].get(c, {}).get('name', c)):
+                c = countries.index(code)
+                name = config['countries'].get(code, {}).get('name', code.title())
+                country_node = self.add_node(code, name, 'country', group_node, len(order))
+                for r, region in enumerate(synthesis['regions'][c]):
+                    self.add_node(f'{code}/{region}', region, 'region', country_node, len(order))
+                    order.append(offsets[c] + r)
+                    self.close_node(len(self.nodes) - 1, len(order))
+                self.close_node(country_node, len(order))
+            self.close_node(group_node, len(order))
+        self.close_node(apac, len(order))
+        self.index = {node['key']: i for i, node in enumerate(self.nodes)}
+
+        order = np.array(order, dtype=int)
+        self.prefix = {measure: prefix_sums(flat[measure][order]) for measure in STATIC_MEASURES + TIME_MEASURES}
+
+    def add_node(self, key, name, level, parent, start):
+        self.nodes.append({'key': key, 'name': name, 'level': level, 'parent': parent, 'start': start,
+                           'stop': start})
+        return len(self.nodes) - 1
+
+    def close_node(self, node, stop):
+        self.nodes[node]['stop'] = stop
+
+    def total(self, measure, key='APAC', start=0, stop=None):
+        """Sum of a measure over a subtree (and months [start, stop) for time measures)"""
+        node = self.nodes[self.index[key]]
+        table = self.prefix[measure]
+        a, b = node['start'], node['stop']
+        if measure in STATIC_MEASURES:
+            return float(table[b] - table[a])
+        stop = self.periods if stop is None else min(stop, self.periods)
+        return float(table[b, stop] - table[a, stop] - table[b, start] + table[a, start])
+
+    def series(self, measure, key='APAC'):
+        """Monthly values of a time measure for a subtree"""
+        node = self.nodes[self.index[key]]
+        table = self.prefix[measure]
+        return np.diff(table[node['stop']] - table[node['start']])
+
+    def children(self, key):
+        parent = self.index[key]
+        return [node['key'] for node in self.nodes if node['parent'] == parent]
+
+    def rollup_rows(self, levels=LEVELS):
+        """ROLLUP_HEADERS rows for every node at the given levels, tree order"""
+        year = min(12, self.periods)
+        rows = []
+        for node in self.nodes:
+            if node['level'] not in levels:
+                continue
+            key = node['key']
+            parent = self.nodes[node['parent']]['name'] if node['parent'] is not None else ''
+            rows.append([
+                node['level'], node['name'], parent, node['stop'] - node['start'],
+                round(self.total('population', key), 2), int(self.total('revenuePotential', key)),
+                int(self.total('volume', key, 0, 1)), int(self.total('revenue', key, 0, 1)),
+                int(self.total('volume', key, 0, year)), int(self.total('revenue', key, 0, year)),
+                int(self.total('revenue', key))
+            ])
+        return rows
+
+
+def create_geo_rollup_sheet(wb, hierarchy):
+    """GeoRollups sheet: one row per node, then monthly USD revenue above region level"""
+    if 'GeoRollups' in wb.sheetnames:
+        wb.remove(wb['GeoRollups'])
+    ws = wb.create_sheet('GeoRollups')
+
+    def header_row(row, headers):
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=row, column=col, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+            cell.alignment = Alignment(horizontal='center')
+
+    header_row(1, ROLLUP_HEADERS)
+    indent = {level: depth for depth, level in enumerate(LEVELS)}
+    row = 2
+    for values in hierarchy.rollup_rows():
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=row, column=col, value=value)
+            if col >= 6:
+                cell.number_format = '$#,##0' if 'USD' in ROLLUP_HEADERS[col - 1] else '#,##0'
+        ws.cell(row=row, column=2).alignment = Alignment(indent=indent[values[0]])
+        if values[0] != 'region':
+            for col in range(1, len(values) + 1):
+                ws.cell(row=row, column=col).font = Font(bold=True)
+        row += 1
+
+    # Monthly USD revenue by APAC, sub-region and country
+    row += 1
+    labels = engine.period_labels(hierarchy.periods, hierarchy.start_date)
+    header_row(row, ['Level', 'Name'] + list(labels))
+    for node in hierarchy.nodes:
+        if node['level'] == 'region':
+            continue
+        row += 1
+        ws.cell(row=row, column=1, value=node['level'])
+        ws.cell(row=row, column=2, value=node['name'])
+        for col, value in enumerate(hierarchy.series('revenue', node['key']), 3):
+            ws.cell(row=row, column=col, value=float(value)).number_format = '$#,##0'
+
+    ws.column_dimensions['A'].width = 12
+    ws.column_dimensions['B'].width = 30
+    ws.column_dimensions['C'].width = 18
+    for col in 'DEFGHIJK':
+        ws.column_dimensions[col].width = 18
+
+    print(f"✅ Created GeoRollups sheet ({len(hierarchy.nodes)} nodes, {hierarchy.periods} months)")
+    return ws
+
+
+def main():
+    """Print the APAC -> sub-region -> country rollup"""
+    config = engine.load_model_config()
+    hierarchy = GeoHierarchy(config, demographic_volumes.load_regional_data())
+    for values in hierarchy.rollup_rows(levels=('apac', 'subregion', 'country')):
+        indent = '  ' * LEVELS.index(values[0])
+        print(f"   {indent}{values[1]:<{24 - len(indent)}} {values[3]:>4} regions  {values[4]:>9,.1f}M  "
+              f"${values[9]:>15,} revenue (year 1)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Goal Seek / Break-even Solver - APAC Revenue Projections Model
+Replaces trial-and-error pricing in the Parameters and SegmentLibrary sheets:
+finds break-even months, the price each segment needs for a target profit
+margin, and the volume each country needs for a revenue target.
+"""
+
+import os
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+
+import projection_engine as engine
+import xlsx_parts
+
+
+def solve_increasing(residual, low, high, tolerance=1e-10, max_iterations=100, max_expansions=60):
+    """Batched bisection for residual functions that increase with x
+
+    residual maps an (N,) array of candidates to (N,) residuals. The upper
+    bracket is doubled until it changes sign; problems that never bracket a
+    root come back as NaN, and problems already satisfied at the lower bound
+    return the lower bound.
+    """
+    low = np.asarray(low, dtype=float).copy()
+    high = np.asarray(high, dtype=float).copy()
+
+    f_high = residual(high)
+    for _ in range(max_expansions):
+        open_bracket = f_high < 0
+        if not open_bracket.any():
+            break
+        high = np.where(open_bracket, high * 2, high)
+        f_high = residual(high)
+
+    satisfied = residual(low) >= 0
+    bracketed = f_high >= 0
+    floor = low.copy()
+    for _ in range(max_iterations):
+        mid = (low + high) / 2
+        below = residual(mid) < 0
+        low = np.where(below, mid, low)
+        high = np.where(below, high, mid)
+        if np.all(high - low <= tolerance * np.maximum(1.0, np.abs(high))):
+            break
+
+    root = np.where(bracketed, (low + high) / 2, np.nan)
+    return np.where(satisfied, floor, root)
+
+
+def break_even_months(net_profit, active=None):
+    """First month with positive net profit and with non-negative cumulative profit
+
+    Both are 1-based and 0 when the horizon never breaks even. active masks
+    the periods inside each row's horizon.
+    """
+    monthly = net_profit > 0
+    cumulative = np.cumsum(net_profit, axis=-1) >= 0
+    if active is not None:
+        monthly = monthly & active
+        cumulative = cumulative & active
+    monthly_month = np.where(monthly.any(axis=-1), monthly.argmax(axis=-1) + 1, 0)
+    cumulative_month = np.where(cumulative.any(axis=-1), cumulative.argmax(axis=-1) + 1, 0)
+    return monthly_month, cumulative_month
+
+
+class ProjectionSolver:
+    """Goal seek over every country's segment library at once
+
+    The per-segment volume grids are projected once and cached; every solver
+    iteration only rescales those cached grids, so each residual evaluation is
+    a single vectorized pass over all (country, segment) problems. Countries
+    share the longest horizon; periods past a country's own projectionMonths
+    are masked out of its horizon sums.
+    """
+
+    def __init__(self, config, countries=None, periods=None):
+        self.config = config
+        self.countries = countries or [
+            code for code in config.get('countries', {})
+            if config.get('segmentLibraries', {}).get(code)
+        ]
+        self.segments = [config['segmentLibraries'][code] for code in self.countries]
+
+        params_list = [engine.get_base_params(config, code) for code in self.countries]
+        if periods is None:
+            self.horizons = np.array([int(p.get('projectionMonths', 12)) for p in params_list], dtype=int)
+            periods = int(self.horizons.max()) if len(self.horizons) else 12
+        else:
+            self.horizons = np.full(len(params_list), periods, dtype=int)
+        self.periods = periods
+        self.active = np.arange(periods) < self.horizons[:, None]  # (C, T)
+
+        self.arrays = engine.stack_segment_arrays([engine.segment_arrays(s) for s in self.segments])
+        self.base_params = engine.stack_base_params(params_list)
+        multipliers = np.array([
+            engine.get_seasonality(self.config, p.get('seasonality', 'none')) for p in params_list
+        ]).reshape(len(params_list), 12)
+
+        self.result = engine.project(self.arrays, self.base_params, multipliers, periods,
+                                     by_segment=True)
+        self.segment_revenue = self.result['segmentRevenue'].sum(axis=-2)  # (C, T)
+        self.segment_cogs = self.result['segmentCogs'].sum(axis=-2)
+        self.segment_volume = self.result['segmentVolume'].sum(axis=-2)
+
+    def _params_for(self, country_index):
+        """Base params gathered for a flat list of problems"""
+        return {key: value[country_index] for key, value in self.base_params.items()}
+
+    def _horizon_sum(self, values, country_index):
+        """Sum (..., T) values over each problem's own horizon"""
+        return np.where(self.active[country_index], values, 0.0).sum(axis=-1)
+
+    def break_even(self):
+        """Break-even months for every country"""
+        net_profit = self.result['netProfit']
+        monthly, cumulative = break_even_months(net_profit, self.active)
+        total = self._horizon_sum(net_profit, np.arange(len(self.countries)))
+        return [
+            {
+                'country': code,
+                'monthlyBreakEven': int(monthly[i]),
+                'cumulativeBreakEven': int(cumulative[i]),
+                'totalNetProfit': float(total[i])
+            }
+            for i, code in enumerate(self.countries)
+        ]
+
+    def required_prices(self, target_margin):
+        """Price per segment that brings its country's ProfitMargin to target_margin (%)
+
+        Each segment is solved with all other segments held at current prices.
+        """
+        country_index, segment_index = np.nonzero(self.arrays['volume'] > 0)
+        grid = self.result['segmentVolume'][country_index, segment_index]  # (N, T)
+        current = self.arrays['price'][country_index, segment_index]
+        other_revenue = self.segment_revenue[country_index] - grid * current[:, None]
+        cogs = self.segment_cogs[country_index]
+        volume = self.segment_volume[country_index]
+        params = self._params_for(country_index)
+
+        def residual(price):
+            revenue = other_revenue + grid * price[:, None]
+            totals = engine.finalize_totals(revenue, cogs, volume, params)
+            total_revenue = self._horizon_sum(totals['revenue'], country_index)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                margin = np.where(total_revenue > 0,
+                                  self._horizon_sum(totals['netProfit'], country_index) / total_revenue * 100,
+                                  -np.inf)
+            return margin - target_margin
+
+        required = solve_increasing(residual, np.zeros_like(current), np.maximum(current, 1e-6))
+
+        solutions = []
+        for n, (c, s) in enumerate(zip(country_index, segment_index)):
+            segment = self.segments[c][s]
+            solutions.append({
+                'country': self.countries[c],
+                'segment': segment.get('name', f'Segment {s + 1}'),
+                'currentPrice': float(current[n]),
+                'requiredPrice': float(required[n]),
+                'targetMargin': target_margin
+            })
+        return solutions
+
+    def required_volumes(self, revenue_targets):
+        """Uniform volume multiplier per country that reaches its total revenue target
+
+        revenue_targets maps country code to a local-currency target over the
+        projection horizon.
+        """
+        country_index = np.array([i for i, code in enumerate(self.countries) if code in revenue_targets],
+                                 dtype=int)
+        targets = np.array([revenue_targets[self.countries[i]] for i in country_index], dtype=float)
+        revenue = self.segment_revenue[country_index]
+        cogs = self.segment_cogs[country_index]
+        volume = self.segment_volume[country_index]
+        params = self._params_for(country_index)
+
+        def residual(multiplier):
+            scale = multiplier[:, None]
+            totals = engine.finalize_totals(revenue * scale, cogs * scale, volume * scale, params)
+            return self._horizon_sum(totals['revenue'], country_index) - targets
+
+        multipliers = solve_increasing(residual, np.zeros(len(targets)), np.ones(len(targets)))
+        current_revenue = self._horizon_sum(self.result['revenue'][country_index], country_index)
+
+        solutions = []
+        for n, c in enumerate(country_index):
+            base_volume = float(self.arrays['volume'][c].sum())
+            solutions.append({
+                'country': self.countries[c],
+                'targetRevenue': float(targets[n]),
+                'currentRevenue': float(current_revenue[n]),
+                'volumeMultiplier': float(multipliers[n]),
+                'currentMonthlyVolume': base_volume,
+                'requiredMonthlyVolume': base_volume * float(multipliers[n])
+            })
+        return solutions
+
+
+def create_solutions_sheet(wb, break_even, prices, volumes):
+    """Write the solver results into a GoalSeek sheet"""
+    sheet_name = 'GoalSeek'
+    if sheet_name in wb.sheetnames:
+        wb.remove(wb[sheet_name])
+    ws = wb.create_sheet(sheet_name)
+
+    ws['A1'] = 'Goal Seek & Break-even Solutions'
+    ws['A1'].font = Font(size=16, bold=True)
+
+    def write_table(start_row, title, headers, rows, formats):
+        ws.cell(row=start_row, column=1, value=title).font = Font(size=12, bold=True)
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=start_row + 1, column=col, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+            cell.alignment = Alignment(horizontal='center')
+        for row, values in enumerate(rows, start_row + 2):
+            for col, value in enumerate(values, 1):
+                if isinstance(value, float) and np.isnan(value):
+                    value = 'Unreachable'
+                cell = ws.cell(row=row, column=col, value=value)
+                if formats.get(col):
+                    cell.number_format = formats[col]
+        return start_row + len(rows) + 3
+
+    row = write_table(
+        3, 'Break-even',
+        ['Country', 'Monthly Break-even Month', 'Cumulative Break-even Month', 'Total Net Profit'],
+        [[b['country'], b['monthlyBreakEven'] or 'Never', b['cumulativeBreakEven'] or 'Never',
+          b['totalNetProfit']] for b in break_even],
+        {4: '#,##0'}
+    )
+    row = write_table(
+        row, 'Required Price for Target Profit Margin',
+        ['Country', 'Segment', 'Target Margin (%)', 'Current Price', 'Required Price', 'Price Change (%)'],
+        [[p['country'], p['segment'], p['targetMargin'], p['currentPrice'], p['requiredPrice'],
+          (p['requiredPrice'] / p['currentPrice'] - 1) * 100 if p['currentPrice'] else float('nan')]
+         for p in prices],
+        {4: '#,##0.0000', 5: '#,##0.0000', 6: '0.0'}
+    )
+    write_table(
+        row, 'Required Volume for Revenue Target',
+        ['Country', 'Target Revenue', 'Current Revenue', 'Volume Multiplier',
+         'Current Monthly Volume', 'Required Monthly Volume'],
+        [[v['country'], v['targetRevenue'], v['currentRevenue'], v['volumeMultiplier'],
+          v['currentMonthlyVolume'], v['requiredMonthlyVolume']] for v in volumes],
+        {2: '#,##0', 3: '#,##0', 4: '0.000', 5: '#,##0', 6: '#,##0'}
+    )
+
+    ws.column_dimensions['A'].width = 16
+    ws.column_dimensions['B'].width = 28
+    for col in 'CDEF':
+        ws.column_dimensions[col].width = 22
+
+    print(f"✅ Created GoalSeek sheet ({len(prices)} segment prices, {len(volumes)} volume targets)")
+    return ws
+
+
+def enhance_excel_model_with_goal_seek(target_margin=30.0, revenue_growth_target=1.25):
+    """Solve break-even, target-margin prices and revenue-target volumes for all countries"""
+    file_path = os.path.join(engine.PROJECT_DIR, 'APAC_Revenue_Projections_Enhanced_Model.xlsx')
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        solver = ProjectionSolver(engine.load_model_config())
+        revenue_targets = {
+            code: float(solver.result['revenue'][i].sum()) * revenue_growth_target
+            for i, code in enumerate(solver.countries)
+        }
+
+        wb = openpyxl.load_workbook(file_path)
+        create_solutions_sheet(
+            wb,
+            solver.break_even(),
+            solver.required_prices(target_margin),
+            solver.required_volumes(revenue_targets)
+        )
+        xlsx_parts.save_workbook(wb, file_path)
+
+        print(f"📄 Goal seek solutions saved: {file_path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error running goal seek: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    enhance_excel_model_with_goal_seek()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Structural diff for saved models and generated workbooks - APAC Revenue Projections Model
+Compares two saved web-tool models (baseParams, segments, projection arrays)
+or two .xlsx workbooks (sheets, rows, cells) at the data level.
+
+Workbook diffs work top-down and skip identical regions: sheet parts whose
+CRC in the zip directory match are skipped without being parsed, and within
+a changed sheet rows are hashed in blocks so only differing blocks are
+compared cell by cell.
+"""
+
+import hashlib
+import sys
+import zipfile
+
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+import projection_engine as engine
+import xlsx_parts
+
+BLOCK_ROWS = 256
+MAX_CELL_DIFFS = 200
+
+# Relative tolerance for numeric cells; float reprs differ in the last digit
+# between openpyxl and the template writer
+REL_TOLERANCE = 1e-12
+SEGMENT_FIELDS = ('name', 'type', 'pricePerTransaction', 'costPerTransaction', 'monthlyVolume', 'volumeGrowth',
+                  'price', 'cost', 'volume', 'category')
+
+
+# --- Saved models ------------------------------------------------------------
+
+def diff_dicts(a, b):
+    """{key: (old, new)} for keys whose values differ"""
+    return {key: (a.get(key), b.get(key)) for key in sorted(set(a) | set(b)) if a.get(key) != b.get(key)}
+
+
+def segment_key(segment):
+    """Match segments by id, falling back to name"""
+    return segment.get('id', segment.get('name'))
+
+
+def diff_segments(old, new):
+    """Added, removed and changed segments between two segment lists"""
+    old_by_key = {segment_key(s): s for s in old}
+    new_by_key = {segment_key(s): s for s in new}
+    # Re-created segments get fresh ids in the web tool; pair leftovers by name
+    unmatched_old = {s.get('name'): k for k, s in old_by_key.items() if k not in new_by_key}
+    renamed = {
+        k: unmatched_old[s.get('name')] for k, s in new_by_key.items()
+        if k not in old_by_key and s.get('name') in unmatched_old
+    }
+
+    added = [new_by_key[k] for k in new_by_key if k not in old_by_key and k not in renamed]
+    removed = [old_by_key[k] for k in old_by_key if k not in new_by_key and k not in renamed.values()]
+    changed = []
+    for key, segment in new_by_key.items():
+        previous = old_by_key.get(key) or old_by_key.get(renamed.get(key))
+        if previous is None:
+            continue
+        fields = {f: (previous.get(f), segment.get(f)) for f in SEGMENT_FIELDS if previous.get(f) != segment.get(f)}
+        if fields:
+            changed.append({'name': segment.get('name'), 'fields': fields})
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def diff_projections(old_result, new_result, tolerance=1e-9):
+    """Per-metric comparison of two projection results"""
+    report = {}
+    for key in old_result:
+        a, b = np.asarray(old_result[key], dtype=float), np.asarray(new_result.get(key, []), dtype=float)
+        if a.shape != b.shape:
+            report[key] = {'shape': (a.shape, b.shape)}
+            continue
+        delta = np.abs(a - b)
+        differing = np.nonzero(delta > tolerance * np.maximum(1.0, np.abs(a)))[0]
+        if differing.size:
+            report[key] = {
+                'firstPeriod': int(differing[0]) + 1,
+                'periods': int(differing.size),
+                'maxAbsDiff': float(delta.max()),
+                'totalOld': float(a.sum()),
+                'totalNew': float(b.sum())
+            }
+    return report
+
+
+def diff_models(old, new, config=None):
+    """Data-level diff of two saved web-tool models"""
+    from model_import import project_models
+
+    config = config or engine.load_model_config()
+    old_result, new_result = project_models([old, new], config)
+    return {
+        'models': (f"{old.get('name')} v{old.get('version')}", f"{new.get('name')} v{new.get('version')}"),
+        'baseParams': diff_dicts(old['data'].get('baseParams', {}), new['data'].get('baseParams', {})),
+        'segments': diff_segments(old['data'].get('segments', []), new['data'].get('segments', [])),
+        'projection': diff_projections(old_result, new_result)
+    }
+
+
+def pair_models(old_models, new_models):
+    """Pair models across two exports by id, then by baseModelId/parentVersionId chain"""
+    by_id = {m.get('id'): m for m in old_models}
+    pairs = []
+    for model in new_models:
+        previous = by_id.get(model.get('id')) or by_id.get(model.get('parentVersionId')) or \
+            by_id.get(model.get('baseModelId'))
+        if previous is not None:
+            pairs.append((previous, model))
+    return pairs
+
+
+# --- Workbooks -----------------------------------------------------------------
+
+def sheet_parts(path):
+    """{sheet title: (part name, crc)} for every worksheet in an .xlsx"""
+    with zipfile.ZipFile(path) as archive:
+        crcs = {info.filename: info.CRC for info in archive.infolist()}
+        parts = xlsx_parts.sheet_parts(archive)
+    shared = crcs.get('xl/sharedStrings.xml')
+    return {title: (part, crcs.get(part)) for title, part in parts.items()}, shared
+
+
+def block_hashes(rows, block_rows=BLOCK_ROWS):
+    """Digest of every block of block_rows rows"""
+    return [
+        hashlib.blake2b(repr(rows[start:start + block_rows]).encode('utf-8'), digest_size=16).digest()
+        for start in range(0, len(rows), block_rows)
+    ]
+
+
+def values_equal(a, b):
+    """Cell equality with REL_TOLERANCE for numbers"""
+    if hasattr(a, 'ref') and hasattr(b, 'ref'):  # ArrayFormula
+        return (a.ref, a.text) == (b.ref, b.text)
+    if isinstance(a, float) or isinstance(b, float):
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            return abs(a - b) <= REL_TOLERANCE * max(abs(a), abs(b))
+    return a == b
+
+
+def sheet_rows(ws):
+    """All rows of a worksheet as tuples of values, trailing empty cells dropped"""
+    rows = []
+    for row in ws.iter_rows(values_only=True):
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        rows.append(tuple(row))
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def diff_rows(old_rows, new_rows, block_rows=BLOCK_ROWS, max_cells=MAX_CELL_DIFFS):
+    """Cell-level differences, comparing only blocks whose hashes differ"""
+    old_hashes = block_hashes(old_rows, block_rows)
+    new_hashes = block_hashes(new_rows, block_rows)
+    cells = []
+    blocks = max(len(old_hashes), len(new_hashes))
+    skipped = 0
+    for block in range(blocks):
+        if block < len(old_hashes) and block < len(new_hashes) and old_hashes[block] == new_hashes[block]:
+            skipped += 1
+            continue
+        start = block * block_rows
+        for r in range(start, min(start + block_rows, max(len(old_rows), len(new_rows)))):
+            old_row = old_rows[r] if r < len(old_rows) else ()
+            new_row = new_rows[r] if r < len(new_rows) else ()
+            if old_row == new_row:
+                continue
+            for c in range(max(len(old_row), len(new_row))):
+                old_value = old_row[c] if c < len(old_row) else None
+                new_value = new_row[c] if c < len(new_row) else None
+                if not values_equal(old_value, new_value):
+                    cells.append((f'{get_column_letter(c + 1)}{r + 1}', old_value, new_value))
+                    if len(cells) >= max_cells:
+                        return cells, skipped, True
+    return cells, skipped, False
+
+
+def diff_workbooks(old_path, new_path, block_rows=BLOCK_ROWS, max_cells=MAX_CELL_DIFFS):
+    """Sheet- and cell-level diff of two workbooks (formulas compared as text)"""
+    old_parts, old_shared = sheet_parts(old_path)
+    new_parts, new_shared = sheet_parts(new_path)
+    same_strings = old_shared == new_shared
+
+    report = {
+        'added': [s for s in new_parts if s not in old_parts],
+        'removed': [s for s in old_parts if s not in new_parts],
+        'identical': [],
+        'changed': {}
+    }
+    common = [s for s in new_parts if s in old_parts]
+    candidates = [s for s in common if not (same_strings and old_parts[s][1] == new_parts[s][1])]
+    report['identical'] = [s for s in common if s not in candidates]
+    if not candidates:
+        return report
+
+    old_wb = load_workbook(old_path, read_only=True)
+    new_wb = load_workbook(new_path, read_only=True)
+    try:
+        for sheet in candidates:
+            cells, skipped, truncated = diff_rows(sheet_rows(old_wb[sheet]), sheet_rows(new_wb[sheet]),
+                                                  block_rows, max_cells)
+            if cells:
+                report['changed'][sheet] = {'cells': cells, 'identicalBlocks': skipped, 'truncated': truncated}
+            else:
+                report['identical'].append(sheet)
+    finally:
+        old_wb.close()
+        new_wb.close()
+    return report
+
+
+# --- Reporting -------------------------------------------------------------------
+
+def print_model_diff(report):
+    """Print a saved-model diff"""
+    print(f"📋 {report['models'][0]}  →  {report['models'][1]}")
+    for key, (old, new) in report['baseParams'].items():
+        print(f"   baseParams.{key}: {old} → {new}")
+    segments = report['segments']
+    for segment in segments['added']:
+        print(f"   + segment {segment.get('name')}")
+    for segment in segments['removed']:
+        print(f"   - segment {segment.get('name')}")
+    for segment in segments['changed']:
+        fields = ', '.join(f"{f}: {old} → {new}" for f, (old, new) in segment['fields'].items())
+        print(f"   ~ segment {segment['name']}: {fields}")
+    for metric, detail in report['projection'].items():
+        if 'shape' in detail:
+            print(f"   {metric}: horizon {detail['shape'][0]} → {detail['shape'][1]}")
+        else:
+            print(f"   {metric}: {detail['periods']} periods differ from month {detail['firstPeriod']}, "
+                  f"total {detail['totalOld']:,.0f} → {detail['totalNew']:,.0f}")
+
+
+def print_workbook_diff(report):
+    """Print a workbook diff"""
+    for sheet in report['added']:
+        print(f"   + sheet {sheet}")
+    for sheet in report['removed']:
+        print(f"   - sheet {sheet}")
+    print(f"   = {len(report['identical'])} identical sheets")
+    for sheet, detail in report['changed'].items():
+        more = ' (truncated)' if detail['truncated'] else ''
+        print(f"   ~ {sheet}: {len(detail['cells'])} cells differ{more}, "
+              f"{detail['identicalBlocks']} row blocks identical")
+        for ref, old, new in detail['cells'][:20]:
+            print(f"       {ref}: {old!r} → {new!r}")
+
+
+def main(argv=None):
+    """Diff two workbooks (.xlsx) or two saved-model exports (.json)"""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2:
+        print("Usage: model_diff.py OLD NEW  (both .xlsx or both revenue_models_*.json)")
+        return
+
+    old_path, new_path = args
+    if old_path.endswith('.xlsx'):
+        print_workbook_diff(diff_workbooks(old_path, new_path))
+        return
+
+    from model_import import iter_saved_models
+    old_models = [model for _, model in iter_saved_models([old_path])]
+    new_models = [model for _, model in iter_saved_models([new_path])]
+    pairs = pair_models(old_models, new_models)
+    if not pairs and len(old_models) == len(new_models) == 1:
+        pairs = [(old_models[0], new_models[0])]
+    config = engine.load_model_config()
+    for old, new in pairs:
+        print_model_diff(diff_models(old, new, config))
+    print(f"✅ Compared {len(pairs)} model pairs")
+
+
+if __name__ == "__main__":
+    main()
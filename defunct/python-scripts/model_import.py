@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Bulk import of saved web-tool models - APAC Revenue Projections Model
+Streams revenue_models_*.json exports from the browser tool, maps each saved
+model's baseParams and segments onto the projection engine, projects every
+model in one batched pass and writes one workbook per model in parallel.
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.chart import LineChart, Reference
+from openpyxl.styles import Font, PatternFill
+
+import projection_cache
+import projection_engine as engine
+import xlsx_parts
+
+EXPORT_PATTERN = 'revenue_models_*.json'
+OUTPUT_DIR = os.path.join(engine.PROJECT_DIR, 'model_exports')
+
+# Models are projected in batches of this many to bound peak memory
+BATCH_SIZE = 256
+
+PROJECTION_COLUMNS = [
+    ('Period', None), ('Volume', '#,##0'), ('Revenue', '#,##0'), ('COGS', '#,##0'),
+    ('GrossProfit', '#,##0'), ('OperatingExpenses', '#,##0'), ('NetProfit', '#,##0'),
+    ('ProfitMargin', '0.0'), ('Revenue_USD', '$#,##0'), ('NetProfit_USD', '$#,##0')
+]
+
+
+def iter_saved_models(paths=None):
+    """Yield (source_file, model) for every model in the given export files
+
+    paths defaults to every revenue_models_*.json in the project directory;
+    files are read one at a time so any number of exports can be processed.
+    """
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(engine.PROJECT_DIR, EXPORT_PATTERN)))
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                export = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ⚠️  Skipping {path}: {e}")
+            continue
+        models = export.get('models', []) if isinstance(export, dict) else export
+        for model in models:
+            if isinstance(model, dict) and isinstance(model.get('data'), dict):
+                yield path, model
+
+
+def model_inputs(model, config):
+    """Engine inputs for one saved model: (segment arrays, base params, multipliers)"""
+    data = model['data']
+    base_params = dict(engine.DEFAULT_BASE_PARAMS)
+    base_params.update(data.get('baseParams', {}))
+    arrays = engine.segment_arrays(data.get('segments', []))
+    multipliers = engine.get_seasonality(config, base_params.get('seasonality', 'none'))
+    return arrays, base_params, multipliers
+
+
+def project_models(models, config):
+    """Project a list of saved models in one batched engine pass
+
+    Returns one dict of (periods,) arrays per model, each cut to that model's
+    own projectionMonths. Results are looked up in the projection cache
+    first; only the misses go through the engine.
+    """
+    inputs = [model_inputs(model, config) for model in models]
+    months = [int(params.get('projectionMonths', 12) or 12) for _, params, _ in inputs]
+    cache = projection_cache.get_cache()
+    keys = [projection_cache.cache_key(arrays, params, multipliers, periods)
+            for (arrays, params, multipliers), periods in zip(inputs, months)]
+    results = [cache.get(key) if cache else None for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        batch = engine.project(
+            engine.stack_segment_arrays([inputs[i][0] for i in missing]),
+            engine.stack_base_params([inputs[i][1] for i in missing]),
+            np.array([inputs[i][2] for i in missing]).reshape(len(missing), 12),
+            max(months[i] for i in missing)
+        )
+        for row, i in enumerate(missing):
+            result = {key: values[row, :months[i]] for key, values in batch.items()}
+            results[i] = cache.put(keys[i], result) if cache else result
+    return results
+
+
+def output_name(model):
+    """File name for a model's workbook: slug of its name plus id and version"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', model.get('name', 'model')).strip('_')[:60] or 'model'
+    suffix = re.sub(r'[^A-Za-z0-9-]+', '', str(model.get('id', '')))[-12:]
+    return f"{slug}_{suffix}_v{model.get('version', 1)}.xlsx" if suffix else f"{slug}_v{model.get('version', 1)}.xlsx"
+
+
+def write_model_workbook(model, result, output_path, start_date=None):
+    """Write one saved model and its projection into its own workbook"""
+    data = model['data']
+    base_params = data.get('baseParams', {})
+    usd_rate = float(base_params.get('usdRate', 1) or 1)
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Summary'
+    ws['A1'] = model.get('name', 'Saved Model')
+    ws['A1'].font = Font(size=16, bold=True)
+    summary = [
+        ('Model ID', model.get('id')), ('Version', model.get('version')),
+        ('Description', model.get('description')), ('Updated', model.get('updatedAt')),
+        ('Segments', len(data.get('segments', [])))
+    ] + [(key, value) for key, value in base_params.items()] + [
+        ('Total Revenue', float(result['revenue'].sum())),
+        ('Total Net Profit', float(result['netProfit'].sum()))
+    ]
+    for row, (label, value) in enumerate(summary, 3):
+        ws.cell(row=row, column=1, value=label).font = Font(bold=True)
+        ws.cell(row=row, column=2, value=value if not isinstance(value, (list, dict)) else json.dumps(value))
+    ws.column_dimensions['A'].width = 26
+    ws.column_dimensions['B'].width = 60
+
+    ws = wb.create_sheet('Segments')
+    headers = ['Name', 'Type', 'PricePerTransaction', 'CostPerTransaction', 'MonthlyVolume', 'VolumeGrowth']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+    for row, segment in enumerate(data.get('segments', []), 2):
+        for col, key in enumerate(['name', 'type', 'pricePerTransaction', 'costPerTransaction',
+                                   'monthlyVolume', 'volumeGrowth'], 1):
+            ws.cell(row=row, column=col, value=segment.get(key))
+    ws.column_dimensions['A'].width = 32
+
+    ws = wb.create_sheet('Projections')
+    for col, (header, _) in enumerate(PROJECTION_COLUMNS, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+    periods = len(result['revenue'])
+    columns = [
+        engine.period_labels(periods, start_date), result['volume'], result['revenue'], result['cogs'],
+        result['grossProfit'], result['operatingExpenses'], result['netProfit'], result['profitMargin'],
+        result['revenue'] / usd_rate, result['netProfit'] / usd_rate
+    ]
+    for col, ((_, number_format), values) in enumerate(zip(PROJECTION_COLUMNS, columns), 1):
+        for row, value in enumerate(values, 2):
+            cell = ws.cell(row=row, column=col, value=value if col == 1 else float(value))
+            if number_format:
+                cell.number_format = number_format
+
+    chart = LineChart()
+    chart.title = 'Revenue and Net Profit'
+    chart.add_data(Reference(ws, min_col=3, min_row=1, max_row=periods + 1), titles_from_data=True)
+    chart.add_data(Reference(ws, min_col=7, min_row=1, max_row=periods + 1), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=1, min_row=2, max_row=periods + 1))
+    ws.add_chart(chart, 'L2')
+
+    xlsx_parts.save_workbook(wb, output_path)
+    return output_path
+
+
+def _write_job(job):
+    """Worker entry point for the process pool"""
+    model, result, output_path = job
+    try:
+        return write_model_workbook(model, result, output_path), None
+    except Exception as e:
+        return output_path, str(e)
+
+
+def build_saved_models(paths=None, output_dir=OUTPUT_DIR, workers=None, config=None):
+    """Generate one workbook per saved model across all export files
+
+    Models are projected in batches of BATCH_SIZE with one engine pass per
+    batch; workbook writing runs in a process pool. Returns the written paths.
+    """
+    config = config or engine.load_model_config()
+    os.makedirs(output_dir, exist_ok=True)
+
+    written, failed = [], []
+    models = iter_saved_models(paths)
+    # Workers save with this process's package settings whatever the start method
+    with ProcessPoolExecutor(max_workers=workers, initializer=xlsx_parts.configure,
+                             initargs=(xlsx_parts.ZIP_LEVEL, xlsx_parts.RECORD_PART_SIZES)) as pool:
+        while True:
+            batch = [model for _, model in islice(models, BATCH_SIZE)]
+            if not batch:
+                break
+            results = project_models(batch, config)
+            jobs = [(model, result, os.path.join(output_dir, output_name(model)))
+                    for model, result in zip(batch, results)]
+            for path, error in pool.map(_write_job, jobs):
+                if error:
+                    failed.append((path, error))
+                else:
+                    written.append(path)
+
+    for path, error in failed:
+        print(f"  ❌ {os.path.basename(path)}: {error}")
+    print(f"✅ Generated {len(written)} workbooks in {output_dir}")
+    return written
+
+
+def main():
+    """Import every saved model export (or the files given on the command line)"""
+    paths = sys.argv[1:] or None
+    build_saved_models(paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Checkpointed Monte Carlo runs - APAC Revenue Projections Model
+Simulates every country's segment library under random, mean-preserving
+lognormal shocks to price, cost, volume and volumeGrowth and reports the
+distribution of monthly and horizon revenue and net profit.
+
+A run is split into fixed-size chunks. Chunk i draws from its own generator
+seeded with (seed, i), so its samples do not depend on which process runs
+it or in what order. Each finished chunk saves its partial aggregates
+(count, sums, sums of squares and quantile sketches) to
+.simulation_runs/<run>/chunk_NNNNN.npz. A restarted run (same inputs, seed
+and chunk size) skips those chunks, and more samples only add chunks. The
+summary merges every chunk: means and standard deviations from the sums and
+percentiles from the merged sketches.
+
+Each country is simulated over its own baseParams.projectionMonths, as
+project_country does, unless a horizon is passed explicitly. Chunks share
+the longest horizon; periods past a country's own are left at zero and are
+not written to the sheet.
+
+    python monte_carlo.py [SAMPLES] [--seed N] [--chunk-size N] [--workers N]
+"""
+
+import hashlib
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+
+import projection_cache
+import projection_engine as engine
+import xlsx_parts
+from project_paths import ENHANCED_MODEL_FILE, project_path
+from sensitivity import SEGMENT_FIELDS
+
+RUNS_DIR = project_path('.simulation_runs')
+DEFAULT_SAMPLES = 10000
+CHUNK_SIZE = 500
+DEFAULT_SEED = 0
+
+# Lognormal sigma of the per-sample, per-segment multiplier on each field
+SHOCKS = {'price': 0.05, 'cost': 0.05, 'volume': 0.15, 'volumeGrowth': 0.25}
+
+METRICS = ('revenue', 'netProfit')
+PERCENTILES = (5, 50, 95)
+
+# Points per quantile sketch: each chunk keeps this many evenly spaced order
+# statistics, each standing for chunk_size / SKETCH_SIZE samples
+SKETCH_SIZE = 128
+
+
+def run_inputs(config, countries, periods, seed, chunk_size, shocks=SHOCKS):
+    """Everything a chunk's result depends on
+
+    periods=None takes each country's horizon from its projectionMonths.
+    """
+    base_params = {code: engine.get_base_params(config, code) for code in countries}
+    horizons = {code: int(periods if periods is not None else base_params[code].get('projectionMonths', 12))
+                for code in countries}
+    return {
+        'countries': list(countries),
+        'segments': {code: engine.segment_arrays(config.get('segmentLibraries', {}).get(code, []))
+                     for code in countries},
+        'baseParams': base_params,
+        'seasonality': {code: engine.get_seasonality(config, base_params[code].get('seasonality', 'none'))
+                        for code in countries},
+        'horizons': horizons,
+        'periods': max(horizons.values(), default=12),
+        'seed': int(seed),
+        'chunkSize': int(chunk_size),
+        'shocks': dict(shocks)
+    }
+
+
+def run_key(inputs):
+    text = json.dumps(projection_cache.canonical(inputs), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def quantile_sketch(values, size=SKETCH_SIZE):
+    """size evenly spaced order statistics along the last axis"""
+    return np.quantile(values, (np.arange(size) + 0.5) / size, axis=-1).transpose(
+        tuple(range(1, values.ndim)) + (0,))
+
+
+def sketch_percentiles(points, weights, percentiles=PERCENTILES):
+    """Weighted percentiles from merged sketch points (..., n) with weights (n,)"""
+    order = np.argsort(points, axis=-1)
+    ordered = np.take_along_axis(points, order, axis=-1)
+    cumulative = np.cumsum(weights[order], axis=-1)
+    centres = (cumulative - weights[order] / 2) / cumulative[..., -1:]
+    flat_points = ordered.reshape(-1, ordered.shape[-1])
+    flat_centres = centres.reshape(-1, centres.shape[-1])
+    result = np.array([[np.interp(p / 100, c, v) for p in percentiles]
+                       for c, v in zip(flat_centres, flat_points)])
+    return result.reshape(points.shape[:-1] + (len(percentiles),))
+
+
+def simulate_chunk(inputs, index):
+    """Aggregates of one chunk: count, sum and sumSquares (countries, metrics,
+    periods + 1) and sketch (countries, metrics, periods + 1, SKETCH_SIZE);
+    the last period slot holds the horizon total and periods past a
+    country's horizon stay zero"""
+    rng = np.random.default_rng([inputs['seed'], index])
+    samples, periods = inputs['chunkSize'], inputs['periods']
+    shape = (len(inputs['countries']), len(METRICS), periods + 1)
+    sums, squares = np.zeros(shape), np.zeros(shape)
+    sketch = np.zeros(shape + (SKETCH_SIZE,))
+
+    for c, code in enumerate(inputs['countries']):
+        arrays = inputs['segments'][code]
+        segments = len(arrays['price'])
+        shocked = {}
+        for field in SEGMENT_FIELDS:
+            sigma = inputs['shocks'].get(field, 0.0)
+            z = rng.standard_normal((samples, segments))
+            shocked[field] = np.asarray(arrays[field], dtype=float) * np.exp(sigma * z - sigma ** 2 / 2)
+        horizon = inputs['horizons'][code]
+        result = engine.project(shocked, inputs['baseParams'][code], inputs['seasonality'][code], horizon)
+        for m, metric in enumerate(METRICS):
+            values = np.zeros((samples, periods + 1))
+            values[:, :horizon] = np.broadcast_to(result[metric], (samples, horizon))
+            values[:, -1] = values[:, :horizon].sum(axis=1)
+            sums[c, m] = values.sum(axis=0)
+            squares[c, m] = (values ** 2).sum(axis=0)
+            sketch[c, m] = quantile_sketch(values.T)
+
+    return {'count': np.array(samples), 'sum': sums, 'sumSquares': squares, 'sketch': sketch}
+
+
+def chunk_path(run_dir, index):
+    return os.path.join(run_dir, f'chunk_{index:05d}.npz')
+
+
+def load_chunk(run_dir, index):
+    """A saved chunk's aggregates, or None if missing or unreadable"""
+    try:
+        with np.load(chunk_path(run_dir, index)) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def run_chunk(job):
+    """Simulate one chunk and checkpoint it (process pool entry point)"""
+    inputs, run_dir, index = job
+    chunk = simulate_chunk(inputs, index)
+    scratch = chunk_path(run_dir, index) + '.tmp.npz'
+    np.savez(scratch, **chunk)
+    os.replace(scratch, chunk_path(run_dir, index))
+    return index
+
+
+def run_simulation(config=None, samples=DEFAULT_SAMPLES, seed=DEFAULT_SEED, chunk_size=CHUNK_SIZE,
+                   periods=None, countries=None, workers=None, runs_dir=RUNS_DIR):
+    """Run (or resume) a chunked simulation and merge every chunk
+
+    samples is rounded up to whole chunks. periods=None simulates each
+    country over its own projectionMonths. Returns a summary dict with
+    countries, horizons, periods (the longest horizon), samples, chunks
+    computed this time, and per (countries, metrics, periods + 1) mean, std
+    and percentiles (..., len(PERCENTILES)).
+    """
+    config = config or engine.load_model_config()
+    countries = countries or [code for code in config.get('countries', {})
+                              if config.get('segmentLibraries', {}).get(code)]
+    inputs = run_inputs(config, countries, periods, seed, chunk_size)
+    run_dir = os.path.join(runs_dir, run_key(inputs))
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'manifest.json'), 'w') as f:
+        json.dump(projection_cache.canonical(inputs), f)
+
+    chunks = math.ceil(samples / chunk_size)
+    missing = [i for i in range(chunks) if load_chunk(run_dir, i) is None]
+    if missing:
+        print(f"🎲 Simulating {len(missing)} of {chunks} chunks ({chunk_size:,} samples each)")
+        jobs = [(inputs, run_dir, i) for i in missing]
+        if workers == 1 or len(missing) == 1:
+            for done, job in enumerate(jobs, 1):
+                run_chunk(job)
+                print(f"   chunk {job[2] + 1}/{chunks} saved ({done}/{len(missing)})")
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for done, index in enumerate(pool.map(run_chunk, jobs), 1):
+                    print(f"   chunk {index + 1}/{chunks} saved ({done}/{len(missing)})")
+    else:
+        print(f"✅ All {chunks} chunks already computed; merging")
+
+    count, sums, squares, points, weights = 0, 0.0, 0.0, [], []
+    for i in range(chunks):
+        chunk = load_chunk(run_dir, i)
+        count += int(chunk['count'])
+        sums = sums + chunk['sum']
+        squares = squares + chunk['sumSquares']
+        points.append(chunk['sketch'])
+        weights.append(np.full(chunk['sketch'].shape[-1], int(chunk['count']) / chunk['sketch'].shape[-1]))
+
+    mean = sums / count
+    std = np.sqrt(np.maximum(squares / count - mean ** 2, 0) * count / max(count - 1, 1))
+    percentiles = sketch_percentiles(np.concatenate(points, axis=-1), np.concatenate(weights))
+    return {'countries': countries, 'horizons': [inputs['horizons'][code] for code in countries],
+            'periods': inputs['periods'], 'samples': count, 'computed': len(missing),
+            'runDir': run_dir, 'mean': mean, 'std': std, 'percentiles': percentiles}
+
+
+def create_monte_carlo_sheet(wb, summary, countries_config, start_date=None):
+    """MonteCarlo sheet: horizon distribution per country, then monthly bands"""
+    if 'MonteCarlo' in wb.sheetnames:
+        wb.remove(wb['MonteCarlo'])
+    ws = wb.create_sheet('MonteCarlo')
+
+    def header_row(row, headers):
+        for col, header in enumerate(headers, 1):
+            cell = ws.cell(row=row, column=col, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+            cell.alignment = Alignment(horizontal='center')
+
+    horizons = sorted(set(summary['horizons']))
+    months = f"{horizons[0]} months" if len(horizons) == 1 else "each country's horizon"
+    ws['A1'] = f"Monte Carlo: {summary['samples']:,} samples over {months} (local currency)"
+    ws['A1'].font = Font(bold=True, size=14)
+    header_row(3, ['Country', 'Metric', 'Months', 'Mean', 'Std Dev'] + [f'P{p}' for p in PERCENTILES])
+    names = [countries_config.get(code, {}).get('name', code.title()) for code in summary['countries']]
+    row = 4
+    for c, name in enumerate(names):
+        for m, metric in enumerate(METRICS):
+            values = [name, metric, summary['horizons'][c], summary['mean'][c, m, -1], summary['std'][c, m, -1]]
+            values += list(summary['percentiles'][c, m, -1])
+            for col, value in enumerate(values, 1):
+                cell = ws.cell(row=row, column=col, value=float(value) if col > 3 else value)
+                if col > 3:
+                    cell.number_format = '#,##0'
+            row += 1
+
+    row += 1
+    labels = engine.period_labels(summary['periods'], start_date)
+    header_row(row, ['Country', 'Metric', 'Statistic'] + list(labels))
+    for c, name in enumerate(names):
+        for m, metric in enumerate(METRICS):
+            stats = [('Mean', summary['mean'][c, m, :-1])]
+            stats += [(f'P{p}', summary['percentiles'][c, m, :-1, k]) for k, p in enumerate(PERCENTILES)]
+            for label, series in stats:
+                row += 1
+                ws.cell(row=row, column=1, value=name)
+                ws.cell(row=row, column=2, value=metric)
+                ws.cell(row=row, column=3, value=label)
+                for col, value in enumerate(series[:summary['horizons'][c]], 4):
+                    ws.cell(row=row, column=col, value=float(value)).number_format = '#,##0'
+
+    ws.column_dimensions['A'].width = 14
+    ws.column_dimensions['B'].width = 12
+    for col in 'DEFGH':
+        ws.column_dimensions[col].width = 18
+
+    print(f"✅ Created MonteCarlo sheet ({len(names)} countries, {summary['samples']:,} samples)")
+    return ws
+
+
+def enhance_excel_model_with_monte_carlo(samples=DEFAULT_SAMPLES, seed=DEFAULT_SEED, chunk_size=CHUNK_SIZE,
+                                         workers=None):
+    """Run or resume the chunked simulation and add the MonteCarlo sheet"""
+    file_path = project_path(ENHANCED_MODEL_FILE)
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        config = engine.load_model_config()
+        summary = run_simulation(config, samples, seed, chunk_size, workers=workers)
+
+        wb = openpyxl.load_workbook(file_path)
+        create_monte_carlo_sheet(wb, summary, config.get('countries', {}))
+        xlsx_parts.save_workbook(wb, file_path)
+
+        print(f"📄 Monte Carlo results saved: {file_path}")
+        print(f"   Checkpoints: {summary['runDir']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error running Monte Carlo simulation: {str(e)}")
+        return False
+
+
+def main():
+    """[SAMPLES] [--seed N] [--chunk-size N] [--workers N]"""
+    options = {'--seed': DEFAULT_SEED, '--chunk-size': CHUNK_SIZE, '--workers': None}
+    samples = DEFAULT_SAMPLES
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg in options:
+            options[arg] = int(next(args))
+        else:
+            samples = int(arg)
+    config = engine.load_model_config()
+    summary = run_simulation(config, samples, options['--seed'], options['--chunk-size'],
+                             workers=options['--workers'])
+    for c, code in enumerate(summary['countries']):
+        name = config['countries'].get(code, {}).get('name', code.title())
+        p5, p50, p95 = summary['percentiles'][c, METRICS.index('netProfit'), -1]
+        print(f"   {name:<14} net profit P5 {p5:>18,.0f}  P50 {p50:>18,.0f}  P95 {p95:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Streaming enhance support - APAC Revenue Projections Model
+Opens an existing workbook with only the sheets an enhancer rewrites parsed
+into openpyxl. Every other sheet is an empty placeholder while the
+enhancer runs, and on save its worksheet part (plus any drawings and charts
+hanging off it) is copied from the source package without being
+decompressed. Memory then follows the size of the enhanced sheets, not the
+size of the source model.
+
+    partial = PartialWorkbook(path, ('Dashboard',))
+    partial.wb['Dashboard']['A1'] = 'Updated'
+    partial.wb.create_sheet('NewSheet')
+    partial.save(path)
+
+Sheets that are deleted from partial.wb are dropped, new sheets are added
+at their position, and the source's cell style ids are kept. If openpyxl
+would renumber them (a source stylesheet with duplicate entries), save()
+raises ValueError and the caller falls back to a full load.
+"""
+
+import html
+import io
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+from openpyxl import load_workbook
+
+from xlsx_parts import compress_part, copy_raw, rewrite_parts, sheet_parts, workbook_parts, write_entry
+
+PLACEHOLDER_SHEET = (b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                     b'<sheetData/></worksheet>')
+WORKSHEET_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+
+WORKBOOK_PART = 'xl/workbook.xml'
+WORKBOOK_RELS = 'xl/_rels/workbook.xml.rels'
+CONTENT_TYPES = '[Content_Types].xml'
+STYLES_PART = 'xl/styles.xml'
+# Excel rebuilds the calculation chain; a stale one makes it repair the file
+CALC_CHAIN_PART = 'xl/calcChain.xml'
+
+RELATIONSHIP_PATTERN = re.compile(rb'<Relationship\b[^>]*>')
+OVERRIDE_PATTERN = re.compile(rb'<Override\b[^>]*PartName="/([^"]+)"[^>]*/>')
+DEFAULT_PATTERN = re.compile(rb'<Default\b[^>]*Extension="([^"]+)"[^>]*/>')
+SHEET_PATTERN = re.compile(rb'<sheet\b[^>]*/>')
+DEFINED_NAME_PATTERN = re.compile(rb'<definedName\b[^>]*>.*?</definedName>|<definedName\b[^>]*/>', re.DOTALL)
+
+
+# --- Package relationships ------------------------------------------------------
+
+def rels_name(part):
+    """Relationships part that belongs to a package part"""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, '_rels', name + '.rels')
+
+
+def resolve_target(part, target):
+    """Package part name of a relationship target relative to part"""
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def relationships(rels_xml, part):
+    """[(element, resolved target)] for the internal relationships of part"""
+    found = []
+    for element in RELATIONSHIP_PATTERN.findall(rels_xml):
+        if b'TargetMode="External"' in element:
+            continue
+        target = re.search(rb'Target="([^"]+)"', element).group(1).decode('utf-8')
+        found.append((element, resolve_target(part, target)))
+    return found
+
+
+def part_tree(names, read, part):
+    """part plus every part reachable from it through relationships (and their .rels)"""
+    tree, pending = [], [part]
+    while pending:
+        name = pending.pop()
+        if name in tree or name not in names:
+            continue
+        tree.append(name)
+        rels = rels_name(name)
+        if rels in names:
+            tree.append(rels)
+            pending.extend(target for _, target in relationships(read(rels), name))
+    return tree
+
+
+def fresh_name(name, taken):
+    """name with its trailing number changed to the first one not in taken"""
+    folder, base = posixpath.split(name)
+    stem, ext = re.fullmatch(r'(.*?)\d*(\.[^.]+)', base).groups()
+    number = 1
+    while posixpath.join(folder, f'{stem}{number}{ext}') in taken:
+        number += 1
+    return posixpath.join(folder, f'{stem}{number}{ext}')
+
+
+# --- Styles -----------------------------------------------------------------------------
+
+def style_signatures(styles_xml):
+    """Resolved (font, fill, border, format, ...) per cell style id, plus the dxfs"""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE
+    from openpyxl.styles.stylesheet import Stylesheet
+    from openpyxl.xml.functions import fromstring
+
+    stylesheet = Stylesheet.from_tree(fromstring(styles_xml))
+    style_names = {ref.xfId: ref.name for ref in stylesheet.cellStyles.cellStyle}
+    signatures = []
+    for style in stylesheet.cell_styles:
+        if style.numFmtId < BUILTIN_FORMATS_MAX_SIZE:
+            number_format = BUILTIN_FORMATS.get(style.numFmtId)
+        else:
+            number_format = stylesheet.number_formats[style.numFmtId - BUILTIN_FORMATS_MAX_SIZE]
+        signatures.append((stylesheet.fonts[style.fontId], stylesheet.fills[style.fillId],
+                           stylesheet.borders[style.borderId], number_format,
+                           stylesheet.alignments[style.alignmentId], stylesheet.protections[style.protectionId],
+                           style_names.get(style.xfId), style.quotePrefix, style.pivotButton))
+    return signatures, list(stylesheet.dxfs)
+
+
+def check_styles(source_xml, new_xml):
+    """Raise ValueError unless new_xml keeps every source style at its id"""
+    old_styles, old_dxfs = style_signatures(source_xml)
+    new_styles, new_dxfs = style_signatures(new_xml)
+    if new_styles[:len(old_styles)] != old_styles or new_dxfs[:len(old_dxfs)] != old_dxfs:
+        raise ValueError("Cell styles would be renumbered; load the workbook in full instead")
+
+
+# --- Package parts ----------------------------------------------------------------------
+
+def content_types_xml(xml, removed, added, new_types):
+    """[Content_Types].xml without removed parts' overrides, with the added ones
+
+    added maps new part names to their name in new_types (the scratch
+    package's [Content_Types].xml), which also supplies missing defaults.
+    """
+    overrides = {match.group(1).decode('utf-8'): match.group(0) for match in OVERRIDE_PATTERN.finditer(new_types)}
+    xml = OVERRIDE_PATTERN.sub(lambda m: b'' if m.group(1).decode('utf-8') in removed else m.group(0), xml)
+
+    extensions = set(DEFAULT_PATTERN.findall(xml))
+    defaults = [match.group(0) for match in DEFAULT_PATTERN.finditer(new_types) if match.group(1) not in extensions]
+    additions = [
+        overrides[old].replace(f'PartName="/{old}"'.encode('utf-8'), f'PartName="/{new}"'.encode('utf-8'))
+        for new, old in added.items() if old in overrides
+    ]
+    return xml.replace(b'</Types>', b''.join(defaults + additions) + b'</Types>')
+
+
+def workbook_rels_xml(xml, removed, sheet_targets):
+    """Workbook relationships without removed parts, plus {rId: part} for new sheets"""
+    kept = [element for element, target in relationships(xml, WORKBOOK_PART) if target not in removed]
+    external = [element for element in RELATIONSHIP_PATTERN.findall(xml) if b'TargetMode="External"' in element]
+    added = [
+        f'<Relationship Type="{WORKSHEET_RELATIONSHIP}" Target="/{target}" Id="{rid}"/>'.encode('utf-8')
+        for rid, target in sheet_targets.items()
+    ]
+    first = RELATIONSHIP_PATTERN.search(xml)
+    start = xml[:first.start()] if first else xml[:xml.index(b'</Relationships>')]
+    return start + b''.join(kept + external + added) + b'</Relationships>'
+
+
+def workbook_xml(xml, sheet_elements, old_titles, new_titles, scratch_xml):
+    """workbook.xml with the new sheet list, active tab and sheet-scoped names"""
+    sheets = b'<sheets>' + b''.join(sheet_elements) + b'</sheets>'
+    xml = re.sub(rb'<sheets>.*?</sheets>|<sheets\s*/>', lambda m: sheets, xml, count=1, flags=re.DOTALL)
+
+    active = re.search(rb'activeTab="\d+"', scratch_xml)
+    if active:
+        xml = re.sub(rb'activeTab="\d+"', lambda m: active.group(0), xml, count=1)
+
+    def scope(match):
+        local = re.search(rb'localSheetId="(\d+)"', match.group(0))
+        if local is None:
+            return match.group(0)
+        title = old_titles[int(local.group(1))]
+        if title not in new_titles:
+            return b''
+        return match.group(0).replace(local.group(0), f'localSheetId="{new_titles.index(title)}"'.encode('utf-8'))
+
+    return DEFINED_NAME_PATTERN.sub(scope, xml)
+
+
+def sheet_element(title, sheet_id, rid, prefix, state):
+    name = escape(title, {'"': '&quot;'})
+    return f'<sheet name="{name}" sheetId="{sheet_id}" state="{state}" {prefix}:id="{rid}"/>'.encode('utf-8')
+
+
+class PartialWorkbook:
+    """An .xlsx with only some sheets loaded; the rest pass through on save"""
+
+    def __init__(self, path, sheets):
+        self.source_path = path
+        with zipfile.ZipFile(path) as source:
+            parts = sheet_parts(source)
+            skipped = {parts[title] for title in parts if title not in sheets}
+            skipped_rels = {rels_name(part) for part in skipped}
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as reduced:
+                for info in source.infolist():
+                    if info.filename in skipped:
+                        write_entry(reduced, info.filename, PLACEHOLDER_SHEET, compress_part(PLACEHOLDER_SHEET, 0))
+                    elif info.filename not in skipped_rels:
+                        copy_raw(source, info, reduced)
+        self.wb = load_workbook(buffer)
+        self.placeholders = {title: self.wb[title] for title in parts if title not in sheets}
+
+    def save(self, output_path, level=None, workers=None):
+        """Write the workbook, copying placeholder sheets from the source package"""
+        scratch, scratch_sheets = workbook_parts(self.wb)
+        scratch = dict(scratch)
+        kept = [title for title, ws in self.placeholders.items() if title in self.wb.sheetnames
+                and self.wb[title] is ws]
+
+        with zipfile.ZipFile(self.source_path) as source:
+            names = set(source.namelist())
+            source_sheets = sheet_parts(source)
+            workbook = source.read(WORKBOOK_PART)
+            elements = {}
+            for element in SHEET_PATTERN.findall(workbook):
+                title = re.search(rb'name="([^"]*)"', element).group(1).decode('utf-8')
+                elements[html.unescape(title)] = element
+            old_titles = list(elements)
+
+            # Parts of sheets that are replaced or dropped, unless a kept sheet shares them
+            keep = set()
+            for title in kept:
+                keep.update(part_tree(names, source.read, source_sheets[title]))
+            removed = set()
+            for title, part in source_sheets.items():
+                if title not in kept:
+                    removed.update(part_tree(names, source.read, part))
+            removed -= keep
+            if CALC_CHAIN_PART in names:
+                removed.add(CALC_CHAIN_PART)
+
+            # New and regenerated sheets, with their drawings and charts renamed clear of kept parts
+            taken = names - removed
+            additions, added_names, sheet_targets = {}, {}, {}
+            rids = {target_rid.decode('utf-8') for target_rid in
+                    re.findall(rb'Id="([^"]+)"', source.read(WORKBOOK_RELS))}
+            sheet_ids = [int(i) for i in re.findall(rb'sheetId="(\d+)"', workbook)]
+            prefix = re.search(rb'\s(\w+):id="', next(iter(elements.values()), b' r:id="')).group(1).decode('utf-8')
+            new_elements = []
+            for title in self.wb.sheetnames:
+                if title in kept:
+                    new_elements.append(elements[title])
+                    continue
+                tree = [name for name in part_tree(scratch, scratch.get, scratch_sheets[title])
+                        if not name.endswith('.rels')]
+                renamed = {}
+                for name in tree:
+                    renamed[name] = fresh_name(name, taken)
+                    taken.add(renamed[name])
+                for old, new in renamed.items():
+                    additions[new] = scratch[old]
+                    added_names[new] = old
+                    if rels_name(old) in scratch:
+                        rels = scratch[rels_name(old)]
+                        for element, target in relationships(rels, old):
+                            target_attr = re.search(rb'Target="[^"]+"', element).group(0)
+                            rels = rels.replace(element, element.replace(
+                                target_attr, f'Target="/{renamed.get(target, target)}"'.encode('utf-8')))
+                        additions[rels_name(new)] = rels
+                        taken.add(rels_name(new))
+
+                rid = next(f'rId{n}' for n in range(1, len(rids) + 2) if f'rId{n}' not in rids)
+                rids.add(rid)
+                sheet_targets[rid] = renamed[scratch_sheets[title]]
+                if title in elements:
+                    sheet_id = int(re.search(rb'sheetId="(\d+)"', elements[title]).group(1))
+                else:
+                    sheet_id = max(sheet_ids, default=0) + 1
+                    sheet_ids.append(sheet_id)
+                new_elements.append(sheet_element(title, sheet_id, rid, prefix, self.wb[title].sheet_state))
+
+            check_styles(source.read(STYLES_PART), scratch[STYLES_PART])
+            replacements = {
+                STYLES_PART: scratch[STYLES_PART],
+                WORKBOOK_PART: workbook_xml(workbook, new_elements, old_titles, self.wb.sheetnames,
+                                            scratch[WORKBOOK_PART]),
+                WORKBOOK_RELS: workbook_rels_xml(source.read(WORKBOOK_RELS), removed, sheet_targets),
+                CONTENT_TYPES: content_types_xml(source.read(CONTENT_TYPES), removed, added_names,
+                                                 scratch[CONTENT_TYPES])
+            }
+
+        # The output is often the source itself, so write beside it and swap in
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.xlsx')
+        os.close(fd)
+        try:
+            rewrite_parts(self.source_path, temp_path, replacements, additions, level, workers, removed)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return output_path
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Project locations - APAC Revenue Projections Model
+Kept free of third-party imports so light commands (e.g. rebuilding the
+demographics index) start without loading numpy or openpyxl.
+
+The project directory is the repository root by default; set
+PROJECTIONS_DIR to point the scripts at another checkout or data folder.
+"""
+
+import os
+
+PROJECT_DIR = os.environ.get('PROJECTIONS_DIR') or \
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_PATH = os.path.join(PROJECT_DIR, 'model-config.json')
+DEMOGRAPHICS_DIR = os.path.join(PROJECT_DIR, 'demographics')
+
+MASTER_MODEL_FILE = 'APAC_Revenue_Projections_Master_Model.xlsx'
+ENHANCED_MODEL_FILE = 'APAC_Revenue_Projections_Enhanced_Model.xlsx'
+
+
+def project_path(*parts):
+    """Absolute path of a file inside the project directory"""
+    return os.path.join(PROJECT_DIR, *parts)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Projection result cache - APAC Revenue Projections Model
+Memoizes projection_engine results keyed by a hash of the canonical inputs
+(base params, segment arrays, seasonality multipliers, scenario, horizon),
+so regenerating the same country/parameter combinations skips the engine.
+
+Results live in an on-disk store (one .npz per key in CACHE_DIR) behind an
+in-memory LRU. The disk store is trimmed to CACHE_MAX_BYTES by evicting the
+least recently used entries; hits refresh an entry's modification time.
+Set PROJECTION_CACHE=0 in the environment to bypass the cache.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+import projection_engine as engine
+
+CACHE_DIR = os.path.join(engine.PROJECT_DIR, '.projection_cache')
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+MEMORY_ENTRIES = 128
+
+# Bump when the engine's output changes so stale entries are never reused
+CACHE_VERSION = 1
+
+
+def canonical(value):
+    """JSON-serializable form of engine inputs (arrays become nested lists)"""
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return canonical(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def cache_key(arrays, base_params, multipliers, periods, scenario=None, daily=False, by_segment=False):
+    """Hex digest identifying one projection"""
+    numeric = {key: base_params.get(key, engine.DEFAULT_BASE_PARAMS[key]) for key in engine.NUMERIC_BASE_PARAMS}
+    numeric['operatingExpenseType'] = base_params.get('operatingExpenseType', 'fixed')
+    payload = {
+        'version': CACHE_VERSION,
+        'baseParams': numeric,
+        'segments': {key: arrays[key] for key in ('price', 'cost', 'volume', 'volumeGrowth')},
+        'seasonality': multipliers,
+        'scenario': scenario or None,
+        'periods': int(periods),
+        'daily': bool(daily),
+        'bySegment': bool(by_segment)
+    }
+    text = json.dumps(canonical(payload), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ProjectionCache:
+    """In-memory LRU in front of a size-bounded on-disk store"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, memory_entries=MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        """Cached result dict for key, or None"""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return dict(self.memory[key])
+
+        path = self.path(key)
+        try:
+            with np.load(path) as stored:
+                result = {name: stored[name] for name in stored.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.remember(key, result)
+        return dict(result)
+
+    def put(self, key, result):
+        """Store a result dict of arrays in memory and on disk"""
+        result = {name: np.array(values, dtype=float) for name, values in result.items()}
+        self.remember(key, result)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temp file and rename so readers never see partial entries
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **result)
+            os.replace(temp_path, self.path(key))
+            self.evict()
+        except OSError as e:
+            print(f"  ⚠️  Projection cache not written: {e}")
+        return dict(result)
+
+    def remember(self, key, result):
+        for values in result.values():
+            values.setflags(write=False)
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """Delete least recently used disk entries until the store fits max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Drop every cached result"""
+        self.memory.clear()
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.npz', '.tmp')):
+                    os.remove(entry.path)
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Shared cache instance (None when PROJECTION_CACHE=0)"""
+    global _default_cache
+    if os.environ.get('PROJECTION_CACHE', '1') == '0':
+        return None
+    if _default_cache is None:
+        _default_cache = ProjectionCache()
+    return _default_cache
+
+
+def project(arrays, base_params, multipliers, periods, daily=False, by_segment=False, scenario=None, cache=None):
+    """engine.project() through the cache; scenario is applied on a miss"""
+    cache = cache or get_cache()
+    if cache is None:
+        arrays, base_params = engine.apply_scenario(arrays, base_params, scenario)
+        return engine.project(arrays, base_params, multipliers, periods, daily, by_segment)
+
+    key = cache_key(arrays, base_params, multipliers, periods, scenario, daily, by_segment)
+    result = cache.get(key)
+    if result is None:
+        arrays, base_params = engine.apply_scenario(arrays, base_params, scenario)
+        result = cache.put(key, engine.project(arrays, base_params, multipliers, periods, daily, by_segment))
+    return result
+
+
+def project_country(config, country, periods=None, scenario=None, daily=False, by_segment=False, cache=None):
+    """Cached counterpart of engine.project_country()"""
+    base_params = engine.get_base_params(config, country)
+    arrays = engine.segment_arrays(config.get('segmentLibraries', {}).get(country, []))
+    if isinstance(scenario, str):
+        scenario = engine.get_scenario(config, scenario)
+    if periods is None:
+        periods = int(base_params.get('projectionMonths', 12))
+    multipliers = engine.get_seasonality(config, base_params.get('seasonality', 'none'))
+    return project(arrays, base_params, multipliers, periods, daily, by_segment, scenario, cache)
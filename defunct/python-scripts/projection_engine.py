@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Vectorized projection engine - the Python counterpart of calculateProjections()
+in the web tool. Every function broadcasts over leading batch dimensions so a
+whole set of countries, scenarios or perturbations is computed in one pass.
+"""
+
+import json
+from datetime import date, timedelta
+
+import numpy as np
+
+from project_paths import PROJECT_DIR, CONFIG_PATH
+
+DAYS_PER_MONTH = 30
+
+DEFAULT_BASE_PARAMS = {
+    'startRevenue': 0,
+    'growthRate': 4,
+    'projectionMonths': 12,
+    'costPercentage': 35,
+    'operatingExpenses': 0,
+    'operatingExpenseType': 'fixed',
+    'operatingExpensePercentage': 15,
+    'seasonality': 'none'
+}
+
+NUMERIC_BASE_PARAMS = ('startRevenue', 'growthRate', 'costPercentage',
+                       'operatingExpenses', 'operatingExpensePercentage')
+
+DEFAULT_SEASONALITY = {
+    'none': {'multipliers': [1.0] * 12}
+}
+
+
+def load_model_config(config_path=CONFIG_PATH):
+    """Load model-config.json, falling back to an empty configuration"""
+    try:
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {
+            'countries': {},
+            'segmentLibraries': {},
+            'scenarioDefinitions': [],
+            'seasonalityFactors': DEFAULT_SEASONALITY
+        }
+
+
+def get_base_params(config, country):
+    """Return the country's default model baseParams merged over the defaults"""
+    params = dict(DEFAULT_BASE_PARAMS)
+    country_data = config.get('countries', {}).get(country, {})
+    params.update(country_data.get('defaultModel', {}).get('baseParams', {}))
+    return params
+
+
+def get_seasonality(config, profile):
+    """Return the 12 monthly multipliers for a seasonality profile"""
+    factors = config.get('seasonalityFactors', DEFAULT_SEASONALITY)
+    multipliers = factors.get(profile, DEFAULT_SEASONALITY['none'])['multipliers']
+    return np.asarray(multipliers, dtype=float)
+
+
+def get_scenario(config, name):
+    """Look up a scenario definition by name (None if it does not exist)"""
+    for scenario in config.get('scenarioDefinitions', []):
+        if scenario.get('name') == name:
+            return scenario
+    return None
+
+
+def segment_arrays(segments):
+    """Convert a segment list into price/cost/volume/volumeGrowth arrays
+
+    Accepts both the model-config.json segment library keys (price, cost,
+    volume) and the web tool's saved-model keys (pricePerTransaction,
+    costPerTransaction, monthlyVolume).
+    """
+    def field(segment, *keys):
+        for key in keys:
+            if key in segment:
+                return float(segment[key] or 0)
+        return 0.0
+
+    return {
+        'price': np.array([field(s, 'price', 'pricePerTransaction') for s in segments], dtype=float),
+        'cost': np.array([field(s, 'cost', 'costPerTransaction') for s in segments], dtype=float),
+        'volume': np.array([field(s, 'volume', 'monthlyVolume') for s in segments], dtype=float),
+        'volumeGrowth': np.array([field(s, 'volumeGrowth') for s in segments], dtype=float)
+    }
+
+
+def stack_segment_arrays(arrays_list):
+    """Stack per-country segment arrays into (countries, max_segments) blocks
+
+    Countries with fewer segments are padded with zero-volume segments, which
+    contribute nothing to any total.
+    """
+    width = max((len(a['price']) for a in arrays_list), default=0)
+    stacked = {}
+    for key in ('price', 'cost', 'volume', 'volumeGrowth'):
+        block = np.zeros((len(arrays_list), width))
+        for i, arrays in enumerate(arrays_list):
+            block[i, :len(arrays[key])] = arrays[key]
+        stacked[key] = block
+    return stacked
+
+
+def stack_base_params(params_list):
+    """Stack per-country base params into arrays for a batched projection"""
+    stacked = {
+        key: np.array([float(p.get(key, DEFAULT_BASE_PARAMS[key]) or 0) for p in params_list])
+        for key in NUMERIC_BASE_PARAMS
+    }
+    stacked['operatingExpenseType'] = np.array(
+        [p.get('operatingExpenseType', 'fixed') for p in params_list])
+    return stacked
+
+
+def apply_scenario(arrays, base_params, scenario):
+    """Apply a scenarioDefinitions entry to segment arrays and base params"""
+    if not scenario:
+        return arrays, base_params
+    arrays = dict(arrays)
+    arrays['price'] = arrays['price'] * scenario.get('priceMultiplier', 1.0)
+    arrays['cost'] = arrays['cost'] * scenario.get('costMultiplier', 1.0)
+    arrays['volumeGrowth'] = arrays['volumeGrowth'] * scenario.get('volumeGrowthMultiplier', 1.0)
+    base_params = dict(base_params)
+    base_params['operatingExpenses'] = base_params.get('operatingExpenses', 0) * \
+        scenario.get('operatingExpenseMultiplier', 1.0)
+    return arrays, base_params
+
+
+def period_labels(periods, start_date=None, daily=False):
+    """Period labels matching the web tool ('2025 Jan' monthly, 'Jan 05' daily)"""
+    start_date = start_date or date.today()
+    if daily:
+        return [(start_date + timedelta(days=i)).strftime('%b %d') for i in range(periods)]
+    labels = []
+    for i in range(periods):
+        month_index = start_date.month - 1 + i
+        labels.append(date(start_date.year + month_index // 12, month_index % 12 + 1, 1).strftime('%Y %b'))
+    return labels
+
+
+def month_start(start_date=None):
+    """First day of the month containing start_date (default: today)"""
+    start_date = start_date or date.today()
+    return date(start_date.year, start_date.month, 1)
+
+
+def period_calendar(periods, start_date=None):
+    """Static calendar attributes for each projection month
+
+    Returns one dict per month with the period start date, the monthly and
+    daily-mode labels, year, quarter and month of year, so workbooks can
+    write them as values instead of deriving them from TODAY().
+    """
+    start_date = start_date or date.today()
+    first = month_start(start_date)
+    monthly = period_labels(periods, first)
+    daily = period_labels(periods, start_date, daily=True)
+    calendar = []
+    for i in range(periods):
+        month_index = first.month - 1 + i
+        period_start = date(first.year + month_index // 12, month_index % 12 + 1, 1)
+        calendar.append({
+            'periodStart': period_start,
+            'monthLabel': monthly[i],
+            'dayLabel': daily[i],
+            'year': period_start.year,
+            'quarter': (period_start.month - 1) // 3 + 1,
+            'month': period_start.month
+        })
+    return calendar
+
+
+def seasonality_curve(multipliers, periods, daily=False):
+    """Expand 12 monthly multipliers (..., 12) into a per-period curve (..., periods)"""
+    t = np.arange(periods)
+    month_index = (t // DAYS_PER_MONTH) % 12 if daily else t % 12
+    return np.asarray(multipliers, dtype=float)[..., month_index]
+
+
+def segment_volumes(volume, growth, seasonal, periods, daily=False):
+    """Projected volume per segment and period, shape (..., segments, periods)
+
+    volume and growth have shape (..., segments); seasonal is the per-period
+    curve from seasonality_curve() with shape (..., periods) or (periods,).
+    """
+    volume = np.asarray(volume, dtype=float)
+    rate = np.asarray(growth, dtype=float) / 100
+    if daily:
+        volume = volume / DAYS_PER_MONTH
+        rate = rate / DAYS_PER_MONTH
+    t = np.arange(periods)
+    seasonal = np.asarray(seasonal, dtype=float)[..., None, :]
+    return volume[..., None] * np.power(1 + rate[..., None], t) * seasonal
+
+
+def finalize_totals(revenue, cogs, volume, base_params, daily=False):
+    """Add the base revenue stream and operating expenses to per-period totals
+
+    revenue, cogs and volume have shape (..., periods). Numeric base params may
+    be scalars or arrays matching the leading batch dimensions.
+    """
+    numeric = {
+        key: np.asarray(base_params.get(key, DEFAULT_BASE_PARAMS[key]), dtype=float)[..., None]
+        for key in NUMERIC_BASE_PARAMS
+    }
+
+    opex_type = np.asarray(base_params.get('operatingExpenseType', 'fixed'))[..., None]
+
+    # Batched params widen the result even when they end up unused (e.g. a
+    # percentage under fixed opex), so every output shares one batch shape
+    shape = np.broadcast_shapes(revenue.shape, cogs.shape, volume.shape, opex_type.shape,
+                                *(value.shape for value in numeric.values()))
+    revenue = np.broadcast_to(revenue, shape)
+    cogs = np.broadcast_to(cogs, shape)
+    volume = np.broadcast_to(volume, shape)
+
+    periods = revenue.shape[-1]
+    t = np.arange(periods)
+    start_revenue = numeric['startRevenue']
+    growth_rate = numeric['growthRate'] / 100
+    if daily:
+        start_revenue = start_revenue / DAYS_PER_MONTH
+        growth_rate = growth_rate / DAYS_PER_MONTH
+    base_revenue = start_revenue * np.power(1 + growth_rate, t)
+    revenue = revenue + base_revenue
+    cogs = cogs + base_revenue * numeric['costPercentage'] / 100
+
+    # operatingExpenseType may itself be an array when countries are stacked
+    fixed = numeric['operatingExpenses']
+    if daily:
+        fixed = fixed / DAYS_PER_MONTH
+    opex = np.where(np.isin(opex_type, ('fixed', 'hybrid')), fixed, 0.0) + \
+        np.where(np.isin(opex_type, ('percentage', 'hybrid')),
+                 revenue * numeric['operatingExpensePercentage'] / 100, 0.0)
+
+    net_profit = revenue - cogs - opex
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(revenue > 0, net_profit / revenue * 100, 0.0)
+
+    return {
+        'volume': volume,
+        'revenue': revenue,
+        'cogs': cogs,
+        'grossProfit': revenue - cogs,
+        'operatingExpenses': opex,
+        'netProfit': net_profit,
+        'profitMargin': margin
+    }
+
+
+def project(arrays, base_params, multipliers, periods, daily=False, by_segment=False):
+    """Run the projection for segment arrays shaped (..., segments)
+
+    Returns a dict of (..., periods) arrays: volume, revenue, cogs, grossProfit,
+    operatingExpenses, netProfit and profitMargin. With by_segment=True the
+    per-segment volume/revenue/cogs grids are included as segmentVolume,
+    segmentRevenue and segmentCogs.
+    """
+    seasonal = seasonality_curve(multipliers, periods, daily)
+    volumes = segment_volumes(arrays['volume'], arrays['volumeGrowth'], seasonal, periods, daily)
+    revenue = volumes * np.asarray(arrays['price'], dtype=float)[..., None]
+    cogs = volumes * np.asarray(arrays['cost'], dtype=float)[..., None]
+
+    result = finalize_totals(revenue.sum(axis=-2), cogs.sum(axis=-2), volumes.sum(axis=-2),
+                             base_params, daily)
+    if by_segment:
+        result['segmentVolume'] = volumes
+        result['segmentRevenue'] = revenue
+        result['segmentCogs'] = cogs
+    return result
+
+
+def project_country(config, country, periods=None, scenario=None, daily=False, by_segment=False):
+    """Project a country's segment library using its default model parameters"""
+    base_params = get_base_params(config, country)
+    arrays = segment_arrays(config.get('segmentLibraries', {}).get(country, []))
+    if isinstance(scenario, str):
+        scenario = get_scenario(config, scenario)
+    arrays, base_params = apply_scenario(arrays, base_params, scenario)
+    if periods is None:
+        periods = int(base_params.get('projectionMonths', 12))
+    multipliers = get_seasonality(config, base_params.get('seasonality', 'none'))
+    return project(arrays, base_params, multipliers, periods, daily, by_segment)
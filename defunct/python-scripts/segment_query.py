@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Demographic segment query engine - APAC Revenue Projections Model
+Indexes the demographic segments (regions) of every country so the
+Dashboard's demographic filters - economic tier, minimum digital adoption,
+minimum urbanization - can be answered for any combination without scanning
+the JSON. Numeric fields have sorted indexes (a range is two binary
+searches); economicTier and country have categorical indexes. A query starts
+from its most selective predicate and checks the others on that candidate
+set only.
+
+The generator uses it to precompute the SegmentFilters sheet: every segment
+with its filter fields, and per-country summaries for the FILTER_PRESETS,
+which the Dashboard's filter inputs read with COUNTIFS/SUMIFS.
+"""
+
+import sys
+
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+from openpyxl.worksheet.datavalidation import DataValidation
+
+import demographic_volumes
+
+RANGE_FIELDS = ('digitalAdoption', 'urbanization', 'authGrowthRate', 'population')
+
+# Same fallbacks as the {Country}_Demographics sheets
+SEGMENT_DEFAULTS = {
+    'population': 0.0,
+    'authPct': 0.0,
+    'authFreq': 1.0,
+    'digitalAdoption': 0.0,
+    'urbanization': 0.0,
+    'authGrowthRate': 3.0
+}
+DEFAULT_TIER = 'medium'
+
+# Revenue potential pricing of create_country_demographic_sheets(): a price
+# per transaction by economic tier, +20% at >= 80% digital adoption and
+# -10% at <= 50%
+TIER_PRICES = {'high': 0.18, 'low': 0.08}
+DEFAULT_PRICE = 0.12
+
+# Common Dashboard filter combinations, precomputed into SegmentFilters.
+# ranges are inclusive (low, high) bounds; None leaves a side open.
+FILTER_PRESETS = {
+    'All Segments': {},
+    'Dashboard Default': {'ranges': {'digitalAdoption': (50, None)}},
+    'Digital Leaders': {'ranges': {'digitalAdoption': (80, None)}},
+    'Emerging Digital': {'tiers': ('low', 'medium'), 'ranges': {'digitalAdoption': (40, 80)}},
+    'Urban High Tier': {'tiers': ('high',), 'ranges': {'urbanization': (60, None)}},
+    'Rural Reach': {'ranges': {'urbanization': (None, 40)}},
+    'Fast Growth': {'ranges': {'authGrowthRate': (10, None)}},
+    'Large Regions': {'ranges': {'population': (20, None)}}
+}
+
+SEGMENT_HEADERS = ['Country', 'Segment', 'Economic Tier', 'Digital Adoption (%)', 'Urbanization (%)',
+                   'Auth Growth (%)', 'Population (M)', 'Monthly Volume', 'Revenue Potential']
+PRESET_HEADERS = ['Preset', 'Country', 'Segments', 'Population (M)', 'Monthly Volume',
+                  'Revenue Potential', 'Avg Digital Adoption (%)']
+PRESET_COLUMN = 11  # K, after the segment table and a spacer column
+
+
+class SegmentIndex:
+    """Sorted and categorical indexes over all countries' demographic segments"""
+
+    def __init__(self, regional_data):
+        countries, names, tiers = [], [], []
+        values = {field: [] for field in SEGMENT_DEFAULTS}
+        for code, data in regional_data.items():
+            for segment in data.get('demographicSegments', []):
+                countries.append(code)
+                names.append(segment.get('name', ''))
+                tiers.append(segment.get('economicTier') or DEFAULT_TIER)
+                for field, default in SEGMENT_DEFAULTS.items():
+                    value = segment.get(field)
+                    values[field].append(float(value) if value is not None else default)
+
+        self.countries = np.array(countries, dtype=object)
+        self.names = np.array(names, dtype=object)
+        self.tiers = np.array(tiers, dtype=object)
+        self.fields = {field: np.array(column, dtype=float) for field, column in values.items()}
+        self.size = len(names)
+
+        self.volume = (self.fields['population'] * 1e6 * self.fields['authPct'] / 100 *
+                       self.fields['authFreq'])
+        adoption = self.fields['digitalAdoption']
+        price = np.array([TIER_PRICES.get(tier, DEFAULT_PRICE) for tier in tiers], dtype=float)
+        price = price * np.where(adoption >= 80, 1.2, np.where(adoption <= 50, 0.9, 1.0))
+        self.revenue = self.volume * price
+
+        self.sorted = {}
+        for field in RANGE_FIELDS:
+            order = np.argsort(self.fields[field], kind='stable')
+            self.sorted[field] = (order, self.fields[field][order])
+        self.by_tier = {tier: np.flatnonzero(self.tiers == tier) for tier in dict.fromkeys(tiers)}
+        self.by_country = {code: np.flatnonzero(self.countries == code) for code in dict.fromkeys(countries)}
+
+    def range_positions(self, field, low=None, high=None):
+        """Positions with low <= field <= high, from the sorted index"""
+        order, values = self.sorted[field]
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        stop = self.size if high is None else np.searchsorted(values, high, side='right')
+        return order[start:stop]
+
+    def query(self, countries=None, tiers=None, ranges=None):
+        """Sorted positions of the segments matching every given filter
+
+        countries and tiers are collections of accepted values (None = any);
+        ranges maps RANGE_FIELDS to inclusive (low, high) bounds.
+        """
+        candidates = []
+        if countries is not None:
+            candidates.append(np.concatenate([self.by_country.get(c, np.empty(0, int)) for c in countries] or
+                                             [np.empty(0, int)]))
+        if tiers is not None:
+            candidates.append(np.concatenate([self.by_tier.get(t, np.empty(0, int)) for t in tiers] or
+                                             [np.empty(0, int)]))
+        for field, (low, high) in (ranges or {}).items():
+            candidates.append(self.range_positions(field, low, high))
+        if not candidates:
+            return np.arange(self.size)
+
+        # Start from the most selective predicate; check the rest on its candidates
+        candidates.sort(key=len)
+        positions = np.sort(candidates[0])
+        keep = np.ones(len(positions), dtype=bool)
+        if countries is not None:
+            keep &= np.isin(self.countries[positions], list(countries))
+        if tiers is not None:
+            keep &= np.isin(self.tiers[positions], list(tiers))
+        for field, (low, high) in (ranges or {}).items():
+            column = self.fields[field][positions]
+            if low is not None:
+                keep &= column >= low
+            if high is not None:
+                keep &= column <= high
+        return positions[keep]
+
+    def preset(self, name, countries=None):
+        """Positions matching one of FILTER_PRESETS"""
+        spec = FILTER_PRESETS[name]
+        return self.query(countries, spec.get('tiers'), spec.get('ranges'))
+
+    def summary(self, positions, multiplier=1.0):
+        """Segments, population, volume and revenue potential for a set of positions"""
+        return {
+            'segments': len(positions),
+            'population': float(self.fields['population'][positions].sum()),
+            'volume': float(self.volume[positions].sum()),
+            'revenue': float(self.revenue[positions].sum()) * multiplier,
+            'digitalAdoption': float(self.fields['digitalAdoption'][positions].mean()) if len(positions) else 0.0
+        }
+
+    def segment_rows(self):
+        """SEGMENT_HEADERS rows for every segment, by country"""
+        return [
+            [self.countries[i], self.names[i], self.tiers[i], self.fields['digitalAdoption'][i],
+             self.fields['urbanization'][i], self.fields['authGrowthRate'][i], self.fields['population'][i],
+             int(self.volume[i]), int(self.revenue[i])]
+            for i in range(self.size)
+        ]
+
+    def preset_rows(self):
+        """PRESET_HEADERS rows: each preset per country plus an 'All' total"""
+        rows = []
+        for name in FILTER_PRESETS:
+            for country in list(self.by_country) + ['All']:
+                summary = self.summary(self.preset(name, None if country == 'All' else (country,)))
+                rows.append([name, country, summary['segments'], round(summary['population'], 2),
+                             int(summary['volume']), int(summary['revenue']),
+                             round(summary['digitalAdoption'], 1)])
+        return rows
+
+
+def filter_criteria():
+    """COUNTIFS/SUMIFS criteria pairs for the Dashboard's demographic filter inputs"""
+    return ('SegmentFilters!$A:$A,$B$3,'
+            'SegmentFilters!$B:$B,IF($B$13="All Segments","*",$B$13),'
+            'SegmentFilters!$C:$C,IF($B$14="All Tiers","*",$B$14),'
+            'SegmentFilters!$D:$D,">="&$B$15,'
+            'SegmentFilters!$E:$E,">="&$B$16')
+
+
+def create_segment_filter_sheet(wb, index):
+    """Write the SegmentFilters sheet: all segments plus precomputed preset summaries"""
+    if 'SegmentFilters' in wb.sheetnames:
+        wb.remove(wb['SegmentFilters'])
+    ws = wb.create_sheet('SegmentFilters')
+
+    headers = list(enumerate(SEGMENT_HEADERS, 1)) + list(enumerate(PRESET_HEADERS, PRESET_COLUMN))
+    for col, header in headers:
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+
+    for row, values in enumerate(index.segment_rows(), 2):
+        for col, value in enumerate(values, 1):
+            ws.cell(row=row, column=col, value=value)
+            if col in (8, 9):
+                ws.cell(row=row, column=col).number_format = '#,##0'
+    for row, values in enumerate(index.preset_rows(), 2):
+        for col, value in enumerate(values, PRESET_COLUMN):
+            ws.cell(row=row, column=col, value=value)
+            if col in (PRESET_COLUMN + 4, PRESET_COLUMN + 5):
+                ws.cell(row=row, column=col).number_format = '#,##0'
+
+    for letter, width in zip('ABCDEFGHI', (14, 28, 14, 20, 17, 16, 15, 16, 18)):
+        ws.column_dimensions[letter].width = width
+    for letter, width in zip('KLMNOPQ', (20, 14, 10, 15, 16, 18, 24)):
+        ws.column_dimensions[letter].width = width
+
+    print(f"✅ Created SegmentFilters sheet ({index.size} segments, {len(FILTER_PRESETS)} presets)")
+    return ws
+
+
+def add_dashboard_filter_results(wb, first_row=25):
+    """Dashboard block that applies the demographic filter inputs via SegmentFilters"""
+    if 'Dashboard' not in wb.sheetnames:
+        return
+    ws = wb['Dashboard']
+
+    ws.cell(row=first_row, column=1, value='Segment Filter Results').font = Font(bold=True, size=12)
+    preset_row = first_row + 1
+    ws.cell(row=preset_row, column=1, value='Filter Preset')
+    ws.cell(row=preset_row, column=2, value='Dashboard Default')
+
+    presets = DataValidation(type="list", formula1=f'"{",".join(FILTER_PRESETS)}"')
+    presets.add(ws.cell(row=preset_row, column=2))
+    ws.add_data_validation(presets)
+    tiers = DataValidation(type="list", formula1='"All Tiers,high,medium,low"')
+    tiers.add(ws['B14'])
+    ws.add_data_validation(tiers)
+
+    preset = f'SegmentFilters!$K:$K,$B${preset_row},SegmentFilters!$L:$L,$B$3'
+    criteria = filter_criteria()
+    results = [
+        ('Preset Segments', f'=SUMIFS(SegmentFilters!$M:$M,{preset})'),
+        ('Preset Revenue Potential', f'=SUMIFS(SegmentFilters!$P:$P,{preset})*$B$17'),
+        ('Filtered Segments', f'=COUNTIFS({criteria})'),
+        ('Filtered Population (M)', f'=SUMIFS(SegmentFilters!$G:$G,{criteria})'),
+        ('Filtered Monthly Volume', f'=SUMIFS(SegmentFilters!$H:$H,{criteria})'),
+        ('Filtered Revenue Potential', f'=SUMIFS(SegmentFilters!$I:$I,{criteria})*$B$17')
+    ]
+    for offset, (label, formula) in enumerate(results, 1):
+        row = preset_row + offset
+        ws.cell(row=row, column=1, value=label).font = Font(italic=True)
+        ws.cell(row=row, column=2, value=formula).number_format = '#,##0'
+    for row in (preset_row, preset_row + 1):
+        ws.cell(row=row, column=1).font = Font(bold=True)
+
+    print("✅ Added segment filter results to the Dashboard")
+
+
+def main(argv=None):
+    """Print preset summaries, or filter segments: [tier] [min adoption] [min urbanization]"""
+    index = SegmentIndex(demographic_volumes.load_regional_data())
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        for name in FILTER_PRESETS:
+            summary = index.summary(index.preset(name))
+            print(f"   {name:<18} {summary['segments']:>4} segments  {summary['population']:>9,.1f}M  "
+                  f"{summary['revenue']:>16,.0f}")
+        return
+
+    tiers = None if args[0] in ('all', 'All Tiers') else (args[0],)
+    ranges = {}
+    if len(args) > 1:
+        ranges['digitalAdoption'] = (float(args[1]), None)
+    if len(args) > 2:
+        ranges['urbanization'] = (float(args[2]), None)
+    for i in index.query(tiers=tiers, ranges=ranges):
+        print(f"   {index.countries[i]:<12} {index.names[i]:<30} {index.tiers[i]:<7} "
+              f"{index.fields['digitalAdoption'][i]:>5.1f}% {index.fields['urbanization'][i]:>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
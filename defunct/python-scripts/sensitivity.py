@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Sensitivity / Tornado Analysis - APAC Revenue Projections Model
+Ranks which inputs move total net profit most by perturbing every segment's
+price, cost, volume and volumeGrowth plus the global cost percentage, operating
+expense percentage and seasonality profile by +/- a fixed percentage.
+"""
+
+import os
+
+import numpy as np
+import openpyxl
+from openpyxl.chart import BarChart, Reference
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+import projection_engine as engine
+import xlsx_parts
+
+SEGMENT_FIELDS = ('price', 'cost', 'volume', 'volumeGrowth')
+
+
+def run_sensitivity(arrays, base_params, multipliers, periods, delta=0.10, daily=False,
+                    segment_names=None):
+    """Evaluate every +/- perturbation in one batched computation
+
+    Segment-level perturbations only change their own segment's contribution,
+    so the perturbed totals are formed as base totals minus the segment's base
+    grid plus its perturbed grid, shaped (fields, 2, segments, periods). Global
+    parameters are evaluated as a small batch of two projections each.
+    Returns (base_net_profit, rows) with rows sorted by descending swing.
+    """
+    seasonal = engine.seasonality_curve(multipliers, periods, daily)
+    base = engine.project(arrays, base_params, multipliers, periods, daily, by_segment=True)
+    base_net_profit = float(base['netProfit'].sum())
+    segment_count = len(arrays['price'])
+    factors = np.array([1 - delta, 1 + delta])
+
+    segment_revenue = base['segmentRevenue'].sum(axis=-2)
+    segment_cogs = base['segmentCogs'].sum(axis=-2)
+    segment_volume = base['segmentVolume'].sum(axis=-2)
+
+    rows = []
+    if segment_count:
+        # (fields, directions, segments): each field row perturbs only itself
+        perturbed = {}
+        for i, field in enumerate(SEGMENT_FIELDS):
+            scale = np.ones((len(SEGMENT_FIELDS), 2, 1))
+            scale[i] = factors[:, None]
+            perturbed[field] = arrays[field][None, None, :] * scale
+
+        volumes = engine.segment_volumes(perturbed['volume'], perturbed['volumeGrowth'],
+                                         seasonal, periods, daily)
+        revenue = volumes * perturbed['price'][..., None]
+        cogs = volumes * perturbed['cost'][..., None]
+
+        batch_revenue = segment_revenue - base['segmentRevenue'] + revenue
+        batch_cogs = segment_cogs - base['segmentCogs'] + cogs
+        batch_volume = segment_volume - base['segmentVolume'] + volumes
+
+        totals = engine.finalize_totals(batch_revenue, batch_cogs, batch_volume, base_params, daily)
+        net = totals['netProfit'].sum(axis=-1)  # (fields, 2, segments)
+
+        for i, field in enumerate(SEGMENT_FIELDS):
+            for s in range(segment_count):
+                rows.append({
+                    'segment': s,
+                    'field': field,
+                    'baseValue': float(arrays[field][s]),
+                    'lowValue': float(perturbed[field][i, 0, s]),
+                    'highValue': float(perturbed[field][i, 1, s]),
+                    'lowNetProfit': float(net[i, 0, s]),
+                    'highNetProfit': float(net[i, 1, s])
+                })
+
+    for field in ('costPercentage', 'operatingExpensePercentage'):
+        base_value = float(base_params.get(field, engine.DEFAULT_BASE_PARAMS[field]))
+        params = dict(base_params)
+        params[field] = base_value * factors
+        totals = engine.finalize_totals(segment_revenue, segment_cogs, segment_volume, params, daily)
+        net = totals['netProfit'].sum(axis=-1)
+        rows.append({
+            'segment': None,
+            'field': field,
+            'baseValue': base_value,
+            'lowValue': base_value * factors[0],
+            'highValue': base_value * factors[1],
+            'lowNetProfit': float(net[0]),
+            'highNetProfit': float(net[1])
+        })
+
+    # Seasonality is perturbed by scaling each month's deviation from 1.0
+    multipliers = np.asarray(multipliers, dtype=float)
+    batch_multipliers = 1 + (multipliers - 1)[None, :] * factors[:, None]
+    totals = engine.project(arrays, base_params, batch_multipliers, periods, daily)
+    net = totals['netProfit'].sum(axis=-1)
+    rows.append({
+        'segment': None,
+        'field': 'seasonality',
+        'baseValue': 1.0,
+        'lowValue': float(factors[0]),
+        'highValue': float(factors[1]),
+        'lowNetProfit': float(net[0]),
+        'highNetProfit': float(net[1])
+    })
+
+    for row in rows:
+        if row['segment'] is None:
+            row['parameter'] = row['field']
+        else:
+            name = segment_names[row['segment']] if segment_names else f"Segment {row['segment'] + 1}"
+            row['parameter'] = f"{name} - {row['field']}"
+
+    swings = np.array([abs(r['highNetProfit'] - r['lowNetProfit']) for r in rows])
+    order = np.argsort(-swings, kind='stable')
+    ranked = []
+    for rank, index in enumerate(order, 1):
+        row = rows[index]
+        row['rank'] = rank
+        row['swing'] = float(swings[index])
+        ranked.append(row)
+    return base_net_profit, ranked
+
+
+def country_sensitivity(config, country, delta=0.10, periods=None):
+    """Run the tornado analysis for a country's segment library"""
+    segments = config.get('segmentLibraries', {}).get(country, [])
+    base_params = engine.get_base_params(config, country)
+    if periods is None:
+        periods = int(base_params.get('projectionMonths', 12))
+    arrays = engine.segment_arrays(segments)
+    multipliers = engine.get_seasonality(config, base_params.get('seasonality', 'none'))
+    names = [segment.get('name', f'Segment {i + 1}') for i, segment in enumerate(segments)]
+    return run_sensitivity(arrays, base_params, multipliers, periods, delta, segment_names=names)
+
+
+def create_tornado_sheet(wb, country_name, base_net_profit, rows, delta, chart_rows=20):
+    """Write the ranked tornado table and a horizontal bar chart"""
+    sheet_name = 'Sensitivity'
+    if sheet_name in wb.sheetnames:
+        wb.remove(wb[sheet_name])
+    ws = wb.create_sheet(sheet_name)
+
+    ws['A1'] = f'Net Profit Sensitivity - {country_name} (+/-{delta * 100:.0f}%)'
+    ws['A1'].font = Font(size=16, bold=True)
+    ws['A2'] = 'Base Net Profit'
+    ws['B2'] = base_net_profit
+    ws['A2'].font = Font(bold=True)
+    ws['B2'].number_format = '#,##0'
+
+    headers = ['Rank', 'Parameter', 'Base Value', 'Low Value', 'High Value',
+               'NetProfit_Low', 'NetProfit_High', 'Low_Change', 'High_Change', 'Swing']
+    header_row = 4
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=header_row, column=col, value=header)
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='667EEA', end_color='667EEA', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+
+    for row, data in enumerate(rows, header_row + 1):
+        ws.cell(row=row, column=1, value=data['rank'])
+        ws.cell(row=row, column=2, value=data['parameter'])
+        ws.cell(row=row, column=3, value=data['baseValue'])
+        ws.cell(row=row, column=4, value=data['lowValue'])
+        ws.cell(row=row, column=5, value=data['highValue'])
+        ws.cell(row=row, column=6, value=data['lowNetProfit']).number_format = '#,##0'
+        ws.cell(row=row, column=7, value=data['highNetProfit']).number_format = '#,##0'
+        ws.cell(row=row, column=8, value=data['lowNetProfit'] - base_net_profit).number_format = '#,##0'
+        ws.cell(row=row, column=9, value=data['highNetProfit'] - base_net_profit).number_format = '#,##0'
+        ws.cell(row=row, column=10, value=data['swing']).number_format = '#,##0'
+
+    ws.column_dimensions['B'].width = 40
+    for col in range(3, len(headers) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 16
+
+    if rows:
+        last_row = header_row + min(chart_rows, len(rows))
+        chart = BarChart()
+        chart.type = 'bar'
+        chart.grouping = 'clustered'
+        chart.overlap = 100
+        chart.title = 'Tornado - Net Profit Change'
+        chart.style = 10
+        chart.y_axis.title = 'Net Profit Change'
+        chart.x_axis.scaling.orientation = 'maxMin'
+        chart.width = 20
+        chart.height = 12
+
+        data = Reference(ws, min_col=8, max_col=9, min_row=header_row, max_row=last_row)
+        cats = Reference(ws, min_col=2, min_row=header_row + 1, max_row=last_row)
+        chart.add_data(data, titles_from_data=True)
+        chart.set_categories(cats)
+        ws.add_chart(chart, 'L4')
+
+    print(f"✅ Created Sensitivity sheet with {len(rows)} ranked parameters")
+    return ws
+
+
+def enhance_excel_model_with_sensitivity(country=None, delta=0.10):
+    """Add the tornado analysis for one country to the Enhanced model"""
+    file_path = os.path.join(engine.PROJECT_DIR, 'APAC_Revenue_Projections_Enhanced_Model.xlsx')
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        config = engine.load_model_config()
+        country = country or config.get('defaultCountry', 'india')
+        country_name = config.get('countries', {}).get(country, {}).get('name', country.title())
+
+        base_net_profit, rows = country_sensitivity(config, country, delta)
+
+        wb = openpyxl.load_workbook(file_path)
+        create_tornado_sheet(wb, country_name, base_net_profit, rows, delta)
+        xlsx_parts.save_workbook(wb, file_path)
+
+        print(f"📄 Sensitivity analysis saved: {file_path}")
+        if rows:
+            print(f"   Top driver: {rows[0]['parameter']} (swing {rows[0]['swing']:,.0f})")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error running sensitivity analysis: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    enhance_excel_model_with_sensitivity()
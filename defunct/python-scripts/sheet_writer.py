@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Direct SpreadsheetML writer - APAC Revenue Projections Model
+Serializes rectangular data (NumPy result arrays or row lists) straight into
+worksheet <sheetData> XML without creating openpyxl Cell objects. Columns are
+rendered whole: numeric columns in one array-to-text pass, text columns
+through a workbook-wide shared string table (so repeated country codes,
+categories and descriptions are stored once), everything else cell by cell.
+Style ids are passed in pre-registered, e.g. from the template manifest.
+"""
+
+import html
+import re
+from datetime import date
+from itertools import zip_longest
+from xml.sax.saxutils import escape
+
+import numpy as np
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+SST_PART = 'xl/sharedStrings.xml'
+SST_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+SST_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+
+SHARED_ITEM_PATTERN = re.compile(rb'<si>.*?</si>|<si\s*/>', re.DOTALL)
+PLAIN_ITEM_PATTERN = re.compile(rb'<si><t(?:\s+xml:space="preserve")?>([^<]*)</t></si>')
+
+
+class SharedStrings:
+    """Shared string table; existing entries keep their indices"""
+
+    def __init__(self, existing_xml=None):
+        self.items = []
+        self.index = {}
+        for item in SHARED_ITEM_PATTERN.findall(existing_xml or b''):
+            plain = PLAIN_ITEM_PATTERN.fullmatch(item)
+            if plain:
+                self.index.setdefault(html.unescape(plain.group(1).decode('utf-8')), len(self.items))
+            self.items.append(item)
+        self.existing = len(self.items)
+
+    def add(self, text):
+        """Index of text, appending it on first use"""
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.items)
+            space = ' xml:space="preserve"' if text != text.strip() else ''
+            self.items.append(f'<si><t{space}>{escape(text)}</t></si>'.encode('utf-8'))
+        return position
+
+    def __len__(self):
+        return len(self.items)
+
+    def xml(self):
+        return (f'<sst xmlns="{SPREADSHEET_NS}" uniqueCount="{len(self.items)}">'.encode('utf-8') +
+                b''.join(self.items) + b'</sst>')
+
+
+def package_parts(archive, strings):
+    """Replacement and new parts that install the shared string table in a package
+
+    Returns (replacements, additions) for xlsx_parts.rewrite_parts(); a
+    package without a sharedStrings part gets one plus its content type and
+    workbook relationship.
+    """
+    if SST_PART in archive.namelist():
+        return {SST_PART: strings.xml()}, {}
+
+    def add_content_type(xml):
+        override = f'<Override PartName="/{SST_PART}" ContentType="{SST_CONTENT_TYPE}"/>'
+        return xml.replace(b'</Types>', override.encode('utf-8') + b'</Types>')
+
+    def add_relationship(xml):
+        ids = set(re.findall(rb'Id="([^"]+)"', xml))
+        rid = next(f'rId{n}' for n in range(len(ids) + 1, len(ids) + 1000) if f'rId{n}'.encode() not in ids)
+        relationship = f'<Relationship Type="{SST_RELATIONSHIP}" Target="sharedStrings.xml" Id="{rid}"/>'
+        return xml.replace(b'</Relationships>', relationship.encode('utf-8') + b'</Relationships>')
+
+    return {'[Content_Types].xml': add_content_type,
+            'xl/_rels/workbook.xml.rels': add_relationship}, {SST_PART: strings.xml()}
+
+
+def cell_xml(ref, value, style, strings=None):
+    """Serialize one cell; formulas are left without a cached value"""
+    style_attr = f' s="{style}"' if style else ''
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, date):
+        return f'<c r="{ref}"{style_attr}><v>{to_excel(value)!r}</v></c>'
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float)):
+        if value != value or value in (float('inf'), float('-inf')):
+            return ''
+        return f'<c r="{ref}"{style_attr}><v>{value!r}</v></c>'
+    if hasattr(value, 'ref') and hasattr(value, 'text'):  # ArrayFormula
+        return f'<c r="{ref}"{style_attr}><f t="array" ref="{value.ref}">{escape(value.text[1:])}</f></c>'
+    text = str(value)
+    if text.startswith('='):
+        return f'<c r="{ref}"{style_attr}><f>{escape(text[1:])}</f></c>'
+    if strings is not None:
+        return f'<c r="{ref}"{style_attr} t="s"><v>{strings.add(text)}</v></c>'
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t>{escape(text)}</t></is></c>'
+
+
+def column_kind(values):
+    """'number', 'string' or 'cell' (mixed, formulas, dates) for one column"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        return 'number'
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (bool, np.bool_)) or isinstance(value, date):
+            return 'cell'
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            current = 'number'
+        elif isinstance(value, str) and not value.startswith('='):
+            current = 'string'
+        else:
+            return 'cell'
+        if kind not in (None, current):
+            return 'cell'
+        kind = current
+    return kind or 'cell'
+
+
+def column_cells(values, letter, first_row, style, strings=None):
+    """Cell XML for one column starting at first_row ('' for empty cells)"""
+    style_attr = f' s="{style}"' if style else ''
+    refs = [f'{letter}{row}' for row in range(first_row, first_row + len(values))]
+    kind = column_kind(values)
+
+    if kind == 'number':
+        if isinstance(values, np.ndarray):
+            array = values
+        else:
+            array = np.array([np.nan if v is None else v for v in values])
+        finite = np.isfinite(array)
+        text = array.astype(str)
+        return [f'<c r="{ref}"{style_attr}><v>{t}</v></c>' if ok else ''
+                for ref, t, ok in zip(refs, text.tolist(), finite.tolist())]
+
+    if kind == 'string' and strings is not None:
+        return [f'<c r="{ref}"{style_attr} t="s"><v>{strings.add(v)}</v></c>' if v is not None else ''
+                for ref, v in zip(refs, values)]
+
+    return [cell_xml(ref, v, style, strings) if v is not None else '' for ref, v in zip(refs, values)]
+
+
+def render_columns(columns, styles, first_row=1, strings=None):
+    """<row> elements for column data (arrays or lists), one style id per column"""
+    height = max((len(column) for column in columns), default=0)
+    rendered = []
+    for col, values in enumerate(columns):
+        values = values if len(values) == height else list(values) + [None] * (height - len(values))
+        style = styles[col] if col < len(styles) else 0
+        rendered.append(column_cells(values, get_column_letter(col + 1), first_row, style, strings))
+    return [
+        f'<row r="{first_row + i}">{"".join(cells)}</row>'
+        for i, cells in enumerate(zip(*rendered))
+    ] if rendered else []
+
+
+def render_sheet_data(rows, styles, strings=None):
+    """Render a <sheetData> element from header + body rows
+
+    styles holds 'header' and 'body' style id lists. With a SharedStrings
+    table, text goes through it instead of inline strings.
+    """
+    if not rows:
+        return b'<sheetData/>'
+    header = render_columns([[value] for value in rows[0]], styles['header'], 1, strings)
+    body = render_columns([list(column) for column in zip_longest(*rows[1:])], styles['body'], 2, strings)
+    return ('<sheetData>' + ''.join(header + body) + '</sheetData>').encode('utf-8')
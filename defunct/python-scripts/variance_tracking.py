@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Actuals vs projection variance - APAC Revenue Projections Model
+Compares the actuals store (actuals_store.py) with the cached per-segment
+projections and keeps a Variance sheet in the Enhanced model up to date.
+
+The stage is incremental: a ledger (actuals/variance.npz) remembers how many
+store rows it has processed, so each run looks up projections only for the
+newly appended rows and rewrites only their sheet rows. A ledger position
+is its sheet row, so restated months overwrite their row in place. The
+year-to-date rollups beside the detail are recomputed from the ledger
+arrays. Changing the segment libraries, seasonality or projection start
+invalidates the ledger and the next run rebuilds it.
+
+    python variance_tracking.py [ACTUALS.csv ...] [--streaming]
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import Alignment, Font, PatternFill
+
+import projection_cache
+import projection_engine as engine
+import xlsx_parts
+from actuals_store import ActualsStore, month_code, month_label
+from partial_workbook import PartialWorkbook
+from project_paths import ENHANCED_MODEL_FILE, project_path
+
+LEDGER_FILE = project_path('actuals', 'variance.npz')
+PROJECTION_MONTHS = 120
+
+DETAIL_HEADERS = ['Country', 'Segment', 'Month', 'Actual Volume', 'Projected Volume', 'Variance',
+                  'Variance %', 'Revenue Variance (Local)']
+YTD_HEADERS = ['Country', 'Year', 'Through', 'Actual YTD', 'Projected YTD', 'Variance', 'Variance %']
+YTD_COLUMN = 10  # J, after the detail table and a spacer column
+
+
+def projection_signature(config, start_date, periods):
+    """Hash of everything the cached projections depend on"""
+    payload = {
+        'segmentLibraries': config.get('segmentLibraries', {}),
+        'baseParams': {code: engine.get_base_params(config, code) for code in config.get('countries', {})},
+        'seasonalityFactors': config.get('seasonalityFactors', {}),
+        'start': start_date.isoformat(),
+        'periods': int(periods)
+    }
+    text = json.dumps(projection_cache.canonical(payload), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class VarianceLedger:
+    """Per (series, month) actual, projected volume and price, in sheet-row order"""
+
+    FIELDS = {'series': np.int32, 'month': np.int32, 'actual': float, 'projected': float, 'price': float}
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self.signature = ''
+        self.watermark = 0
+        self.arrays = {field: np.empty(0, dtype=dtype) for field, dtype in self.FIELDS.items()}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.signature = str(data['signature'])
+                self.watermark = int(data['watermark'])
+                self.arrays = {field: data[field] for field in self.FIELDS}
+        self.positions = {(int(s), int(m)): p for p, (s, m) in
+                          enumerate(zip(self.arrays['series'], self.arrays['month']))}
+
+    def __len__(self):
+        return len(self.arrays['series'])
+
+    def reset(self, signature):
+        self.signature = signature
+        self.watermark = 0
+        self.arrays = {field: np.empty(0, dtype=dtype) for field, dtype in self.FIELDS.items()}
+        self.positions = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        scratch = self.path + '.tmp.npz'
+        np.savez(scratch, signature=self.signature, watermark=self.watermark, **self.arrays)
+        os.replace(scratch, self.path)
+
+    def merge(self, series, month, actual, projected, price):
+        """Insert or overwrite rows; returns the ledger positions touched"""
+        positions = np.empty(len(series), dtype=int)
+        appended = []
+        for i, key in enumerate(zip(series.tolist(), month.tolist())):
+            position = self.positions.get(key)
+            if position is None:
+                position = len(self) + len(appended)
+                self.positions[key] = position
+                appended.append(i)
+            positions[i] = position
+
+        new = {'series': series, 'month': month, 'actual': actual, 'projected': projected, 'price': price}
+        for field, dtype in self.FIELDS.items():
+            values = np.concatenate([self.arrays[field], np.zeros(len(appended), dtype=dtype)])
+            values[positions] = new[field]
+            self.arrays[field] = values
+        return positions
+
+
+def segment_projections(config, country, periods):
+    """({segment name: row}, (segments, periods) volumes, per-segment price) from the cache"""
+    segments = config.get('segmentLibraries', {}).get(country, [])
+    result = projection_cache.project_country(config, country, periods, by_segment=True)
+    names = {segment.get('name'): s for s, segment in enumerate(segments)}
+    price = np.asarray(engine.segment_arrays(segments)['price'], dtype=float)
+    return names, result['segmentVolume'], price
+
+
+def update_ledger(store, config, start_date, periods=PROJECTION_MONTHS, ledger=None):
+    """Fold store rows appended since the last run into the ledger
+
+    Returns (ledger, touched positions, rebuilt) where rebuilt means the
+    projection inputs changed and every row was recomputed.
+    """
+    ledger = ledger or VarianceLedger()
+    signature = projection_signature(config, start_date, periods)
+    rebuilt = ledger.signature != signature
+    if rebuilt:
+        ledger.reset(signature)
+
+    stop = store.rows
+    columns = store.latest(ledger.watermark, stop)
+    series, month, actual = columns['series'], columns['month'], columns['volume']
+    projected = np.full(len(series), np.nan)
+    price = np.zeros(len(series))
+    t = month - month_code(start_date)
+
+    countries = np.array([store.series[s][0] for s in series], dtype=object)
+    for country in dict.fromkeys(countries.tolist()):
+        if country not in config.get('countries', {}):
+            continue
+        names, volumes, prices = segment_projections(config, country, periods)
+        rows = np.flatnonzero(countries == country)
+        segment_rows = np.array([names.get(store.series[series[i]][1], -1) for i in rows], dtype=int)
+        valid = (segment_rows >= 0) & (t[rows] >= 0) & (t[rows] < periods)
+        projected[rows[valid]] = volumes[segment_rows[valid], t[rows[valid]]]
+        price[rows[valid]] = prices[segment_rows[valid]]
+
+    touched = ledger.merge(series, month, actual, projected, price)
+    ledger.watermark = stop
+    return ledger, touched, rebuilt
+
+
+def ytd_rows(ledger, store, countries_config):
+    """YTD_HEADERS rows per country and calendar year, plus an all-country row per year"""
+    arrays = ledger.arrays
+    compared = np.isfinite(arrays['projected'])
+    if not compared.any():
+        return []
+    series = arrays['series'][compared]
+    month = arrays['month'][compared]
+    actual = arrays['actual'][compared]
+    projected = arrays['projected'][compared]
+    country = np.array([store.series[s][0] for s in series], dtype=object)
+    year = month // 12
+
+    rows = []
+    for code in list(dict.fromkeys(country.tolist())) + [None]:
+        in_country = np.ones(len(series), dtype=bool) if code is None else country == code
+        name = 'All Countries' if code is None else countries_config.get(code, {}).get('name', code.title())
+        for y in np.unique(year[in_country]):
+            selected = in_country & (year == y)
+            a, p = float(actual[selected].sum()), float(projected[selected].sum())
+            rows.append([name, int(y), month_label(month[selected].max()), a, p, a - p,
+                         (a - p) / p if p else None])
+    return rows
+
+
+def refresh_variance_sheet(wb, ledger, store, touched, countries_config, rebuilt=False):
+    """Write the touched ledger rows (all when rebuilt) and the YTD rollups"""
+    created = rebuilt or 'Variance' not in wb.sheetnames
+    if created:
+        if 'Variance' in wb.sheetnames:
+            wb.remove(wb['Variance'])
+        ws = wb.create_sheet('Variance')
+    else:
+        ws = wb['Variance']
+
+    def header_row(column, headers):
+        for col, header in enumerate(headers, column):
+            cell = ws.cell(row=1, column=col, value=header)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+            cell.alignment = Alignment(horizontal='center')
+
+    # Sheet rows are ledger positions + 2; catch up on rows the sheet never got
+    written = 0 if created else max(ws.max_row - 1, 0)
+    positions = sorted(set(np.asarray(touched).tolist()) | set(range(min(written, len(ledger)), len(ledger))))
+    arrays = ledger.arrays
+    for p in positions:
+        country, segment = store.series[arrays['series'][p]]
+        actual, projected = float(arrays['actual'][p]), float(arrays['projected'][p])
+        has_projection = np.isfinite(projected)
+        values = [countries_config.get(country, {}).get('name', country.title()), segment,
+                  month_label(arrays['month'][p]), actual,
+                  projected if has_projection else None,
+                  actual - projected if has_projection else None,
+                  (actual - projected) / projected if has_projection and projected else None,
+                  (actual - projected) * float(arrays['price'][p]) if has_projection else None]
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=p + 2, column=col, value=value)
+            if col == 7:
+                cell.number_format = '0.0%'
+            elif col >= 4:
+                cell.number_format = '#,##0'
+
+    # YTD rollups are small; rewrite the whole block
+    previous = 2
+    while ws.cell(row=previous, column=YTD_COLUMN).value is not None:
+        previous += 1
+    rows = ytd_rows(ledger, store, countries_config)
+    for row in range(2, previous):
+        for col in range(YTD_COLUMN, YTD_COLUMN + len(YTD_HEADERS)):
+            ws.cell(row=row, column=col).value = None
+    for r, values in enumerate(rows, 2):
+        for col, value in enumerate(values, YTD_COLUMN):
+            cell = ws.cell(row=r, column=col, value=value)
+            if col == YTD_COLUMN + 6:
+                cell.number_format = '0.0%'
+            elif col >= YTD_COLUMN + 3:
+                cell.number_format = '#,##0'
+            if values[0] == 'All Countries':
+                cell.font = Font(bold=True)
+
+    if created:
+        header_row(1, DETAIL_HEADERS)
+        header_row(YTD_COLUMN, YTD_HEADERS)
+        widths = {'A': 14, 'B': 30, 'C': 10, 'D': 16, 'E': 16, 'F': 16, 'G': 12, 'H': 22,
+                  'J': 16, 'K': 8, 'L': 10, 'M': 16, 'N': 16, 'O': 16, 'P': 12}
+        for col, width in widths.items():
+            ws.column_dimensions[col].width = width
+
+    print(f"✅ Variance sheet: {len(positions):,} rows written, {len(ledger):,} tracked, "
+          f"{len(rows)} YTD rollups")
+    return ws
+
+
+def enhance_excel_model_with_variance(csv_paths=(), streaming=False):
+    """Append actuals from csv_paths to the store and refresh the Variance sheet"""
+    file_path = project_path(ENHANCED_MODEL_FILE)
+
+    if not os.path.exists(file_path):
+        print("❌ Excel file not found")
+        return False
+
+    try:
+        store = ActualsStore()
+        for path in csv_paths:
+            first, count = store.import_csv(path)
+            print(f"✅ Appended {count:,} actuals rows from {path}")
+
+        config = engine.load_model_config()
+        start_date = engine.month_start(xlsx_parts.workbook_start_date(file_path))
+        ledger, touched, rebuilt = update_ledger(store, config, start_date)
+
+        partial = PartialWorkbook(file_path, ('Variance',)) if streaming else None
+        wb = partial.wb if partial else openpyxl.load_workbook(file_path)
+        refresh_variance_sheet(wb, ledger, store, touched, config.get('countries', {}), rebuilt)
+        if partial:
+            partial.save(file_path)
+        else:
+            xlsx_parts.save_workbook(wb, file_path)
+        ledger.save()
+
+        print(f"📄 Variance saved: {file_path}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error updating variance: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    enhance_excel_model_with_variance([a for a in args if a != '--streaming'], '--streaming' in args)
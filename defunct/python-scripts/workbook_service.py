@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local workbook generation service - APAC Revenue Projections Model
+A small asyncio HTTP server that generates workbooks on demand so analysts
+share one warm generator instead of running create_excel_model.py by hand.
+
+    POST /generate   {"countries": ["india", "japan"], "format": "xlsx", ...}
+    GET  /health     worker, cache and coalescing counters
+
+Request fields (all optional): countries, startDate (YYYY-MM), formulaMode
+('classic' | 'dynamic'), fxScenario (workbooks only), scenario (a
+scenarioDefinitions name, json only; workbooks carry every scenario on
+their Scenarios sheet), rollingStart, baseParams (merged over every
+country's defaultModel.baseParams; workbooks write the first country's to
+the Parameters sheet), chartPeriods, format ('xlsx' via the cached
+template, 'xlsx-full' via openpyxl, or 'json' projections). Unknown or
+inapplicable values are rejected with a 400.
+
+Generation runs in a bounded process pool whose workers load the config
+once. Identical concurrent requests share one generation and finished
+results are served from an in-memory LRU.
+
+    python workbook_service.py serve [port]
+    python workbook_service.py request india japan --format json
+"""
+
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import fx_rates
+import projection_engine as engine
+import xlsx_parts
+
+HOST = '127.0.0.1'
+PORT = 8765
+WORKERS = min(4, os.cpu_count() or 1)
+RESULT_CACHE_ENTRIES = 32
+MAX_BODY_BYTES = 1024 * 1024
+OPERATING_EXPENSE_TYPES = ('fixed', 'percentage', 'hybrid')
+
+FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'xlsx-full': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'json': 'application/json'
+}
+
+_worker_config = None
+
+
+# --- Worker side -------------------------------------------------------------
+
+def init_worker(zip_level=None, part_sizes=None):
+    """Load the config and generator modules once per worker process"""
+    global _worker_config
+    xlsx_parts.configure(zip_level, part_sizes)
+    _worker_config = engine.load_model_config()
+    import create_excel_model  # noqa: F401
+    import workbook_template  # noqa: F401
+
+
+def request_config(config, request):
+    """Config restricted to the requested countries with baseParams overrides"""
+    config = json.loads(json.dumps(config))
+    countries = request['countries']
+    config['countries'] = {code: config['countries'][code] for code in countries}
+    config['segmentLibraries'] = {
+        code: segments for code, segments in config.get('segmentLibraries', {}).items() if code in countries
+    }
+    config['defaultCountry'] = countries[0]
+    for country in config['countries'].values():
+        country.setdefault('defaultModel', {}).setdefault('baseParams', {}).update(request['baseParams'])
+    return config
+
+
+def generate(request):
+    """Build one result for a normalized request: (content type, bytes)"""
+    import projection_cache
+    from create_excel_model import ExcelRevenueModel
+
+    config = request_config(_worker_config or engine.load_model_config(), request)
+    if request['format'] == 'json':
+        projections = {}
+        for country in request['countries']:
+            result = projection_cache.project_country(config, country, request['chartPeriods'],
+                                                      scenario=request.get('scenario'))
+            projections[country] = {key: values.tolist() for key, values in result.items()}
+        labels = engine.period_labels(request['chartPeriods'], date.fromisoformat(request['startDate']))
+        body = json.dumps({'request': request, 'periods': labels, 'projections': projections})
+        return FORMATS['json'], body.encode('utf-8')
+
+    model = ExcelRevenueModel(date.fromisoformat(request['startDate']), request['rollingStart'],
+                              request['formulaMode'], request['fxScenario'])
+    model.config = config
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        if request['format'] == 'xlsx':
+            from workbook_template import build_from_template
+            build_from_template(model, path, request['chartPeriods'])
+        else:
+            model.create_complete_model()
+            xlsx_parts.save_workbook(model.wb, path)
+        with open(path, 'rb') as f:
+            return FORMATS['xlsx'], f.read()
+    finally:
+        os.remove(path)
+
+
+# --- Server side ---------------------------------------------------------------
+
+def normalize_base_params(base_params, config):
+    """Validate baseParams overrides against the engine's parameters; raises ValueError"""
+    if not isinstance(base_params, dict):
+        raise ValueError("baseParams must be a JSON object")
+    unknown = [key for key in base_params if key not in engine.DEFAULT_BASE_PARAMS]
+    if unknown:
+        raise ValueError(f"Unknown baseParams: {', '.join(map(str, unknown))}")
+    for key in engine.NUMERIC_BASE_PARAMS + ('projectionMonths',):
+        value = base_params.get(key, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"baseParams.{key} must be a number")
+    if base_params.get('operatingExpenseType', 'fixed') not in OPERATING_EXPENSE_TYPES:
+        raise ValueError(f"baseParams.operatingExpenseType must be one of {', '.join(OPERATING_EXPENSE_TYPES)}")
+    profiles = config.get('seasonalityFactors', engine.DEFAULT_SEASONALITY)
+    profile = base_params.get('seasonality', 'none')
+    if profile != 'none' and profile not in profiles:
+        raise ValueError(f"Unknown seasonality profile: {profile}")
+    return dict(base_params)
+
+
+def normalize_request(payload, config):
+    """Validate a request body and fill in defaults; raises ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    known = list(config.get('countries', {}))
+    countries = payload.get('countries') or known
+    if not isinstance(countries, list) or not all(isinstance(code, str) for code in countries):
+        raise ValueError("countries must be a list of country codes")
+    unknown = [code for code in countries if code not in known]
+    if unknown:
+        raise ValueError(f"Unknown countries: {', '.join(unknown)}")
+    output_format = payload.get('format', 'xlsx')
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown format: {output_format}")
+    formula_mode = payload.get('formulaMode', 'classic')
+    if formula_mode not in ('classic', 'dynamic'):
+        raise ValueError(f"Unknown formula mode: {formula_mode}")
+
+    start = payload.get('startDate')
+    if start is not None and not isinstance(start, str):
+        raise ValueError("startDate must be a YYYY-MM string")
+    start_date = engine.month_start(date.fromisoformat(f'{start[:7]}-01') if start else None)
+    chart_periods = payload.get('chartPeriods', 120)
+    if isinstance(chart_periods, bool) or not isinstance(chart_periods, int) or chart_periods < 1:
+        raise ValueError("chartPeriods must be a positive integer")
+
+    fx_scenario = payload.get('fxScenario', 'base')
+    if not isinstance(fx_scenario, str):
+        raise ValueError("fxScenario must be a string")
+    fx_rates.get_fx_scenario(config, fx_scenario)
+    if output_format == 'json' and fx_scenario != 'base':
+        raise ValueError("fxScenario applies to workbook formats only; json projections are in local currency")
+    scenario = payload.get('scenario')
+    if scenario is not None:
+        if not isinstance(scenario, str) or engine.get_scenario(config, scenario) is None:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        if output_format != 'json':
+            raise ValueError("scenario applies to json output only; workbooks include every scenario "
+                             "on their Scenarios sheet")
+    return {
+        'countries': list(dict.fromkeys(countries)),
+        'format': output_format,
+        'formulaMode': formula_mode,
+        'fxScenario': fx_scenario,
+        'scenario': scenario,
+        'rollingStart': bool(payload.get('rollingStart', False)),
+        'startDate': start_date.isoformat(),
+        'chartPeriods': chart_periods,
+        'baseParams': normalize_base_params(payload.get('baseParams') or {}, config)
+    }
+
+
+def request_key(request):
+    """Hash of a normalized request"""
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class WorkbookService:
+    """Coalescing, caching front end to a process pool of generators"""
+
+    def __init__(self, workers=WORKERS, cache_entries=RESULT_CACHE_ENTRIES):
+        self.config = engine.load_model_config()
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                        initargs=(xlsx_parts.ZIP_LEVEL, xlsx_parts.RECORD_PART_SIZES))
+        self.workers = workers
+        self.cache_entries = cache_entries
+        self.results = OrderedDict()
+        self.inflight = {}
+        self.stats = {'requests': 0, 'generated': 0, 'cacheHits': 0, 'coalesced': 0, 'errors': 0}
+
+    async def result_for(self, request):
+        """(content type, bytes) for a normalized request"""
+        key = request_key(request)
+        self.stats['requests'] += 1
+        if key in self.results:
+            self.results.move_to_end(key)
+            self.stats['cacheHits'] += 1
+            return self.results[key]
+        if key in self.inflight:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, generate, request)
+        self.inflight[key] = future
+        try:
+            result = await future
+        finally:
+            del self.inflight[key]
+        self.stats['generated'] += 1
+        self.results[key] = result
+        while len(self.results) > self.cache_entries:
+            self.results.popitem(last=False)
+        return result
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP/1.1 request on a connection"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1]
+            try:
+                length = int(headers.get('content-length', 0) or 0)
+            except ValueError:
+                length = -1
+            if not 0 <= length <= MAX_BODY_BYTES:
+                error = 'Request body too large' if length > MAX_BODY_BYTES else 'Invalid Content-Length'
+                await self.respond(writer, 400, FORMATS['json'], {'error': error})
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            if method == 'GET' and path == '/health':
+                await self.respond(writer, 200, FORMATS['json'], dict(self.stats, workers=self.workers,
+                                                                      cached=len(self.results),
+                                                                      inflight=len(self.inflight)))
+            elif method == 'POST' and path == '/generate':
+                try:
+                    request = normalize_request(json.loads(body or b'{}'), self.config)
+                except (ValueError, TypeError) as e:
+                    await self.respond(writer, 400, FORMATS['json'], {'error': str(e)})
+                    return
+                try:
+                    content_type, content = await self.result_for(request)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    await self.respond(writer, 500, FORMATS['json'], {'error': str(e)})
+                    return
+                await self.respond(writer, 200, content_type, content)
+            else:
+                await self.respond(writer, 404, FORMATS['json'], {'error': f'No route for {method} {path}'})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, content_type, content):
+        if not isinstance(content, bytes):
+            content = json.dumps(content).encode('utf-8')
+        reason = http.client.responses.get(status, '')
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n'
+                     f'Content-Length: {len(content)}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        writer.write(content)
+        await writer.drain()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✅ Workbook service listening on http://{host}:{port} ({self.workers} workers)")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+# --- Client ------------------------------------------------------------------------
+
+def request_workbook(payload, host=HOST, port=PORT, timeout=300):
+    """POST a generation request; returns (status, content type, body bytes)"""
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request('POST', '/generate', json.dumps(payload), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, response.getheader('Content-Type'), response.read()
+    finally:
+        connection.close()
+
+
+def service_health(host=HOST, port=PORT, timeout=10):
+    """Counters reported by GET /health"""
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request('GET', '/health')
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main():
+    """serve [port] | request COUNTRY... [--format FORMAT] [--out PATH]"""
+    args = sys.argv[1:]
+    if not args or args[0] not in ('serve', 'request'):
+        print(main.__doc__)
+        return
+
+    if args[0] == 'serve':
+        service = WorkbookService()
+        try:
+            asyncio.run(service.serve(port=int(args[1]) if len(args) > 1 else PORT))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
+        return
+
+    options = {'--format': 'xlsx', '--out': None}
+    countries = []
+    rest = iter(args[1:])
+    for arg in rest:
+        if arg in options:
+            options[arg] = next(rest, None)
+        else:
+            countries.append(arg)
+    status, content_type, body = request_workbook({'countries': countries, 'format': options['--format']})
+    if status != 200:
+        print(f"❌ Service returned {status}: {body.decode('utf-8', 'replace')}")
+        return
+    extension = 'json' if content_type == FORMATS['json'] else 'xlsx'
+    output_path = options['--out'] or f"APAC_Revenue_Projections_{'_'.join(countries) or 'All'}.{extension}"
+    with open(output_path, 'wb') as f:
+        f.write(body)
+    print(f"✅ Saved {len(body):,} bytes to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
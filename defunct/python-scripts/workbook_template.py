@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Template-based workbook generation - APAC Revenue Projections Model
+The static parts of the model (fonts, fills, borders, data validations,
+Dashboard/Parameters/Scenarios sheets and chart parts) are built once into a
+cached skeleton .xlsx, exactly as create_complete_model() lays them out. Each
+build copies the skeleton and only rewrites the <sheetData> of the
+data-bearing sheets.
+"""
+
+import hashlib
+import json
+import os
+import re
+import zipfile
+
+from openpyxl.utils import get_column_letter
+
+import projection_engine as engine
+from chart_data import chart_rows
+from sheet_writer import SST_PART, SharedStrings, package_parts, render_sheet_data
+from xlsx_parts import rewrite_parts, sheet_parts
+
+TEMPLATE_VERSION = 5
+TEMPLATE_DIR = os.path.join(engine.PROJECT_DIR, '.template_cache')
+
+# Sheets whose cell data depends on the configuration; everything else is static
+DATA_SHEETS = ('CountryData', 'FXRates', 'SegmentLibrary', 'Projections', 'Charts')
+
+SHEET_DATA_PATTERN = re.compile(rb'<sheetData\s*/>|<sheetData>.*?</sheetData>', re.DOTALL)
+DIMENSION_PATTERN = re.compile(rb'<dimension ref="[^"]*"\s*/>')
+
+
+def skeleton_key(model, chart_periods=120):
+    """Cache key covering every input that shapes the static structure"""
+    payload = json.dumps({
+        'version': TEMPLATE_VERSION,
+        'countries': sorted(model.config.get('countries', {}).keys()),
+        'defaultCountry': model.default_country(),
+        'baseParams': model.base_params(),
+        'seasonality': [float(m) for m in model.seasonality_multipliers()],
+        'chartPeriods': chart_periods,
+        'startDate': model.start_date.isoformat(),
+        'rollingStart': model.rolling_start,
+        'formulaMode': model.formula_mode
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def data_sheet_rows(model, chart_periods=120):
+    """Header and body rows for every data-bearing sheet of an ExcelRevenueModel"""
+    from create_excel_model import COUNTRY_DATA_HEADERS, SEGMENT_LIBRARY_HEADERS, PROJECTION_HEADERS
+
+    labels, series = model.chart_series(periods=chart_periods)
+    chart_headers, chart_body = chart_rows(labels, series)
+    return {
+        'CountryData': [COUNTRY_DATA_HEADERS] + model.country_data_rows(),
+        'FXRates': model.fx_rate_rows(),
+        'SegmentLibrary': [SEGMENT_LIBRARY_HEADERS] + model.segment_library_rows(),
+        'Projections': [PROJECTION_HEADERS] + model.projection_rows(),
+        'Charts': [chart_headers] + chart_body
+    }
+
+
+def build_skeleton(source, path, chart_periods=120):
+    """Build the full model once, record style ids and save it as the skeleton"""
+    from create_excel_model import ExcelRevenueModel
+
+    model = ExcelRevenueModel(source.start_date, source.rolling_start, source.formula_mode)
+    model.config = source.config
+    model.create_complete_model()
+
+    # Style ids for header and body cells of each data column. Reading
+    # style_id registers the style now, so the saved styles.xml matches.
+    styles = {}
+    for sheet in DATA_SHEETS:
+        ws = model.wb[sheet]
+        header_row = [cell.style_id for cell in ws[1]]
+        body_row = [cell.style_id for cell in ws[2]] if ws.max_row >= 2 else header_row
+        styles[sheet] = {'header': header_row, 'body': body_row}
+
+    # Write both files to scratch names and rename into place, the manifest
+    # last, so a concurrent or interrupted build never leaves a torn pair
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    scratch = f'{path}.{os.getpid()}.tmp'
+    model.wb.save(scratch)
+
+    with zipfile.ZipFile(scratch) as archive:
+        parts = sheet_parts(archive)
+    manifest = {
+        'key': skeleton_key(model, chart_periods),
+        'styles': styles,
+        'parts': {sheet: parts[sheet] for sheet in DATA_SHEETS}
+    }
+    with open(scratch + '.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(scratch, path)
+    os.replace(scratch + '.json', path + '.json')
+
+    print(f"✅ Built workbook skeleton: {path}")
+    return manifest
+
+
+def ensure_skeleton(model, chart_periods=120, template_dir=TEMPLATE_DIR):
+    """Return (skeleton_path, manifest), building the skeleton on first use"""
+    key = skeleton_key(model, chart_periods)
+    path = os.path.join(template_dir, f'skeleton-{key}.xlsx')
+    if os.path.exists(path) and os.path.exists(path + '.json'):
+        with open(path + '.json', 'r') as f:
+            return path, json.load(f)
+    return path, build_skeleton(model, path, chart_periods)
+
+
+def inject_sheet_data(part_xml, rows, styles, strings=None):
+    """Swap the sheetData (and dimension) of a skeleton worksheet part"""
+    width = max((len(r) for r in rows), default=1)
+    dimension = f'<dimension ref="A1:{get_column_letter(width)}{max(len(rows), 1)}"/>'.encode('utf-8')
+    part_xml = DIMENSION_PATTERN.sub(lambda m: dimension, part_xml, count=1)
+    sheet_data = render_sheet_data(rows, styles, strings)
+    return SHEET_DATA_PATTERN.sub(lambda m: sheet_data, part_xml, count=1)
+
+
+def assemble_workbook(skeleton_path, manifest, sheets_rows, output_path):
+    """Copy the skeleton to output_path, replacing only the data sheet parts
+
+    Data sheets are serialized by sheet_writer with text in a shared string
+    table; every other skeleton part is copied without recompression.
+    """
+    with zipfile.ZipFile(skeleton_path) as source:
+        existing = source.read(SST_PART) if SST_PART in source.namelist() else None
+        strings = SharedStrings(existing)
+        replacements = {
+            manifest['parts'][sheet]: inject_sheet_data(source.read(manifest['parts'][sheet]), rows,
+                                                        manifest['styles'][sheet], strings)
+            for sheet, rows in sheets_rows.items()
+        }
+        additions = {}
+        if len(strings) > strings.existing:
+            package_replacements, additions = package_parts(source, strings)
+            replacements.update(package_replacements)
+    return rewrite_parts(skeleton_path, output_path, replacements, additions)
+
+
+def build_from_template(model, output_path, chart_periods=120, template_dir=TEMPLATE_DIR):
+    """Generate a workbook for model.config from the cached skeleton"""
+    skeleton_path, manifest = ensure_skeleton(model, chart_periods, template_dir)
+    assemble_workbook(skeleton_path, manifest, data_sheet_rows(model, chart_periods), output_path)
+    print(f"Excel model saved from template: {output_path}")
+    return output_path
+
+
+def main():
+    """Generate the Master model through the template path"""
+    from create_excel_model import ExcelRevenueModel
+
+    model = ExcelRevenueModel()
+    filepath = build_from_template(
+        model, os.path.join(engine.PROJECT_DIR, 'APAC_Revenue_Projections_Master_Model.xlsx')
+    )
+    print(f"\n✅ Excel model created from cached skeleton!")
+    print(f"📄 File location: {filepath}")
+
+
+if __name__ == "__main__":
+    main()
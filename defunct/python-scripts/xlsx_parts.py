@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Low-level .xlsx package helpers - APAC Revenue Projections Model
+Locating worksheet parts inside the zip, copying parts between packages
+without recompressing them, saving workbooks with the parts deflated
+concurrently at a configurable level, and reading a workbook's projection
+start without loading it.
+
+configure() sets the default deflate level (0 = store only, for
+intermediate pipeline files; 1 = fastest; 9 = smallest) and whether every
+save also writes <file>.parts.json listing the raw and compressed size of
+each part. The PROJECTIONS_ZIP_LEVEL and PROJECTIONS_PART_SIZES=1
+environment variables give the initial values.
+"""
+
+import copy
+import datetime
+import html
+import io
+import json
+import os
+import re
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+DATA_DESCRIPTOR_FLAG = 0x08
+
+ZIP_LEVEL = int(os.environ.get('PROJECTIONS_ZIP_LEVEL', 6))
+COMPRESS_WORKERS = min(8, os.cpu_count() or 1)
+RECORD_PART_SIZES = os.environ.get('PROJECTIONS_PART_SIZES') == '1'
+
+
+def configure(zip_level=None, part_sizes=None):
+    """Set the default deflate level and part size recording for later saves"""
+    global ZIP_LEVEL, RECORD_PART_SIZES
+    if zip_level is not None:
+        ZIP_LEVEL = int(zip_level)
+    if part_sizes is not None:
+        RECORD_PART_SIZES = bool(part_sizes)
+
+
+def sheet_parts(archive):
+    """Map sheet titles to their worksheet part names inside an .xlsx"""
+    workbook_xml = archive.read('xl/workbook.xml').decode('utf-8')
+    rels_xml = archive.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+    targets = dict(re.findall(r'<Relationship[^>]*Id="([^"]+)"[^>]*Target="([^"]+)"', rels_xml))
+    targets.update({
+        rid: target for target, rid in
+        re.findall(r'<Relationship[^>]*Target="([^"]+)"[^>]*Id="([^"]+)"', rels_xml)
+    })
+    parts = {}
+    for name, rid in re.findall(r'<sheet[^>]*name="([^"]+)"[^>]*r:id="([^"]+)"', workbook_xml):
+        target = targets[rid].lstrip('/')
+        parts[html.unescape(name)] = target if target.startswith('xl/') else f'xl/{target}'
+    return parts
+
+
+def append_raw(target, entry, payload):
+    """Write a local header and already-compressed payload into target"""
+    # Sizes go in the local header, so no trailing data descriptor is needed
+    entry.flag_bits &= ~DATA_DESCRIPTOR_FLAG
+    entry.header_offset = target.fp.tell()
+    target.fp.write(entry.FileHeader(zip64=False))
+    target.fp.write(payload)
+    target.start_dir = target.fp.tell()
+    target.filelist.append(entry)
+    target.NameToInfo[entry.filename] = entry
+    target._didModify = True
+
+
+def copy_raw(source, info, target):
+    """Copy one entry's compressed bytes from source to target unchanged
+
+    source is a ZipFile opened for reading and target a ZipFile opened for
+    writing; the entry keeps its compression, CRC and timestamps.
+    """
+    source.fp.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(source.fp.read(LOCAL_HEADER.size))
+    source.fp.seek(header[-2] + header[-1], 1)  # file name and extra field
+    append_raw(target, copy.copy(info), source.fp.read(info.compress_size))
+
+
+def compress_part(data, level):
+    """(compress type, payload) for one part; level 0 stores it"""
+    if level == 0:
+        return zipfile.ZIP_STORED, data
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, compressor.compress(data) + compressor.flush()
+
+
+def compress_parts(datas, level=None, workers=None):
+    """Compress many parts concurrently (zlib releases the GIL)"""
+    level = ZIP_LEVEL if level is None else level
+    if level == 0 or len(datas) < 2:
+        return [compress_part(data, level) for data in datas]
+    with ThreadPoolExecutor(max_workers=workers or COMPRESS_WORKERS) as pool:
+        return list(pool.map(lambda data: compress_part(data, level), datas))
+
+
+def write_entry(target, name, data, compressed, date_time=None, external_attr=0o600 << 16):
+    """Append one part with a precomputed (compress type, payload)"""
+    entry = zipfile.ZipInfo(name, date_time or time.localtime()[:6])
+    entry.compress_type, payload = compressed
+    entry.CRC = zlib.crc32(data)
+    entry.file_size = len(data)
+    entry.compress_size = len(payload)
+    entry.external_attr = external_attr
+    append_raw(target, entry, payload)
+
+
+def size_records(parts, compressed, titles=None):
+    """[{part, sheet, size, compressed}] for written parts"""
+    sheet_names = {part: title for title, part in (titles or {}).items()}
+    return [
+        {'part': name, 'sheet': sheet_names.get(name), 'size': len(data), 'compressed': len(payload)}
+        for (name, data), (_, payload) in zip(parts, compressed)
+    ]
+
+
+def record_part_sizes(path, records):
+    """Write <path>.parts.json, largest compressed parts first"""
+    records = sorted(records, key=lambda r: r['compressed'], reverse=True)
+    with open(path + '.parts.json', 'w') as f:
+        json.dump({'file': os.path.basename(path), 'parts': records}, f, indent=2)
+
+
+def write_package(path, parts, level=None, workers=None, titles=None):
+    """Write (name, bytes) parts to a new .xlsx, compressing them concurrently
+
+    Returns the per-part size records.
+    """
+    compressed = compress_parts([data for _, data in parts], level, workers)
+    with zipfile.ZipFile(path, 'w') as target:
+        for (name, data), packed in zip(parts, compressed):
+            write_entry(target, name, data, packed)
+    records = size_records(parts, compressed, titles)
+    if RECORD_PART_SIZES:
+        record_part_sizes(path, records)
+    return records
+
+
+def workbook_parts(wb):
+    """Serialize an openpyxl workbook to ([(part name, bytes)], {sheet title: part})"""
+    from openpyxl.writer.excel import ExcelWriter
+
+    buffer = io.BytesIO()
+    wb.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED, allowZip64=True)).save()
+    with zipfile.ZipFile(buffer) as stored:
+        return [(info.filename, stored.read(info.filename)) for info in stored.infolist()], sheet_parts(stored)
+
+
+def workbook_start_date(file_path):
+    """PeriodStart of the first Projections row, without loading the workbook"""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        if 'Projections' not in wb.sheetnames:
+            return None
+        rows = wb['Projections'].iter_rows(min_row=1, max_row=2, values_only=True)
+        header, first = next(rows, ()), next(rows, ())
+        for name in ('PeriodStart', 'Period_Start'):
+            if name in header and hasattr(first[header.index(name)], 'date'):
+                return first[header.index(name)].date()
+        return None
+    finally:
+        wb.close()
+
+
+def save_workbook(wb, path, level=None, workers=None):
+    """Drop-in for wb.save(path) with concurrent compression at a chosen level
+
+    openpyxl serializes into an in-memory store-only package; the parts are
+    then deflated in a thread pool. Returns the per-part size records.
+    """
+    parts, titles = workbook_parts(wb)
+    return write_package(path, parts, level, workers, titles)
+
+
+def rewrite_parts(source_path, output_path, replacements, additions=None, level=None, workers=None,
+                  removed=()):
+    """Copy a package, replacing the named parts and copying the rest raw
+
+    replacements maps part names to new bytes, or to a callable taking the
+    old bytes and returning new ones; additions (part name -> bytes) are
+    appended and parts named in removed are left out. New parts are
+    compressed concurrently at level.
+    """
+    with zipfile.ZipFile(source_path) as source:
+        infos = [info for info in source.infolist() if info.filename not in removed]
+        new_parts = []
+        for info in infos:
+            replacement = replacements.get(info.filename)
+            if replacement is not None:
+                data = replacement(source.read(info.filename)) if callable(replacement) else replacement
+                new_parts.append((info.filename, data))
+        new_parts.extend((additions or {}).items())
+        compressed = dict(zip([name for name, _ in new_parts],
+                              compress_parts([data for _, data in new_parts], level, workers)))
+        data_by_name = dict(new_parts)
+
+        with zipfile.ZipFile(output_path, 'w') as target:
+            for info in infos:
+                if info.filename in compressed:
+                    write_entry(target, info.filename, data_by_name[info.filename],
+                                compressed[info.filename], info.date_time, info.external_attr)
+                else:
+                    copy_raw(source, info, target)
+            for name, data in (additions or {}).items():
+                write_entry(target, name, data, compressed[name])
+    return output_path
+
+
+def part_sizes(path):
+    """Size records read from an existing package's central directory"""
+    with zipfile.ZipFile(path) as archive:
+        sheet_names = {part: title for title, part in sheet_parts(archive).items()}
+        return [
+            {'part': info.filename, 'sheet': sheet_names.get(info.filename),
+             'size': info.file_size, 'compressed': info.compress_size}
+            for info in archive.infolist()
+        ]
+
+
+def print_part_sizes(records, top=15):
+    """Print the largest parts by compressed size"""
+    total = sum(r['compressed'] for r in records) or 1
+    for record in sorted(records, key=lambda r: r['compressed'], reverse=True)[:top]:
+        label = f"{record['part']} ({record['sheet']})" if record['sheet'] else record['part']
+        print(f"   {record['compressed']:>12,} {record['size']:>12,}  {record['compressed'] / total:6.1%}  {label}")